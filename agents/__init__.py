@@ -0,0 +1,38 @@
+"""
+The agents, imported on first access.
+
+`from agents import coordinator_agent` loads google.adk and builds the
+models only when it runs, so importing a submodule that needs no agent
+(`agents.fingerprint`, ...) stays cheap.
+
+An agent named like its module (`evaluator_agent`, ...) is shadowed by
+that module once anything has imported it; import those from the module
+(`from agents.evaluator_agent import evaluator_agent`).
+"""
+import importlib
+
+_EXPORTS = {
+    "coordinator_agent": "agents.review_coordinator_agent",
+    "parallel_review_team": "agents.review_coordinator_agent",
+    "style_review_agent": "agents.style_review_agent",
+    "correctness_review_agent": "agents.correctness_review_agent",
+    "security_review_agent": "agents.security_review_agent",
+    "performance_review_agent": "agents.performance_review_agent",
+    "evaluator_agent": "agents.evaluator_agent",
+    "patch_generator_agent": "agents.patch_generator_agent",
+    "aggregator_agent": "agents.aggregator_agent",
+    "pr_intake_agent": "agents.pr_intake_agent",
+    "RetryLoop": "agents.retry_loop",
+    "BatchRetryLoop": "agents.batch_retry_loop",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'agents' has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
@@ -2,6 +2,7 @@
 
 from google.adk.agents import Agent
 from google.adk.models.google_llm import Gemini
+from agents.model_cache import cached
 # from google.adk.tools import tool
 from google.genai import types
 
@@ -40,7 +41,7 @@ retry_cfg = types.HttpRetryOptions(
 aggregator_agent = Agent(
     name="aggregator_agent",
     description="Combines multiple review results into one markdown report.",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_cfg),
+    model=cached(Gemini(model="gemini-2.5-flash-lite", retry_options=retry_cfg)),
     instruction=(
         "You combine all review results into a single clear Markdown report.\n\n"
         "Output format must be:\n"
@@ -0,0 +1,201 @@
+import asyncio
+import os
+import re
+from collections import Counter
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from agents.evaluator_agent import evaluator_agent
+from agents.patch_generator_agent import patch_generator_agent
+from agents.retry_loop import BudgetExceeded, BudgetTracker, RetryBudget, RetryLoop
+from services.context_builder import estimate_tokens
+from services.metrics import timed
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("BATCH_PROMPT_TOKENS", "24000"))
+MAX_FILES_PER_PROMPT = int(os.getenv("BATCH_MAX_FILES", "20"))
+REVIEW_CONCURRENCY = int(os.getenv("BATCH_REVIEW_CONCURRENCY", str(os.cpu_count() or 4)))
+
+FILE_HEADER = "### FILE: {}"
+_FILE_HEADER_RE = re.compile(r"^#{2,4} FILE: (.+?)\s*$", re.MULTILINE)
+
+BATCH_NOTES = {
+    "instruct": (
+        "Several files follow, each under a '### FILE: <path>' header with its report "
+        "and evaluation. For each file, reply with the same '### FILE: <path>' header "
+        "followed by that file's improvement_instructions."
+    ),
+    "patch": (
+        "Several files follow, each under a '### FILE: <path>' header with its "
+        "original_code and improvement_instructions. For each file, reply with the same "
+        "'### FILE: <path>' header followed by the reply that file's section asks for."
+    ),
+}
+STATE_AGENTS = {"instruct": evaluator_agent, "patch": patch_generator_agent}
+
+
+# --------------------------------------------------
+# PACKING
+# --------------------------------------------------
+
+def pack(
+    items: Sequence[Tuple[str, str]],
+    budget: int = PROMPT_TOKEN_BUDGET,
+    max_files: int = MAX_FILES_PER_PROMPT,
+) -> List[List[Tuple[str, str]]]:
+    """
+    Groups (key, prompt body) pairs into requests of at most `budget`
+    estimated tokens and `max_files` files, keeping their order. A body that
+    is over budget on its own is split out into a request of its own.
+    """
+    batches, current, size = [], [], 0
+    for key, text in items:
+        cost = estimate_tokens(text)
+        if cost >= budget:
+            batches.append([(key, text)])
+            continue
+        if current and (size + cost > budget or len(current) >= max_files):
+            batches.append(current)
+            current, size = [], 0
+        current.append((key, text))
+        size += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def multi_file_prompt(state: str, batch: Sequence[Tuple[str, str]]) -> str:
+    sections = [f"{FILE_HEADER.format(key)}\n{text}" for key, text in batch]
+    return BATCH_NOTES[state] + "\n\n" + "\n\n".join(sections)
+
+
+def split_reply(text: str) -> Dict[str, str]:
+    """Per-file bodies of a reply laid out under '### FILE: <path>' headers."""
+    matches = list(_FILE_HEADER_RE.finditer(text))
+    replies = {}
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        replies[match.group(1).strip("`* ")] = text[match.end():end].strip()
+    return replies
+
+
+# --------------------------------------------------
+# BATCHED LOOP
+# --------------------------------------------------
+
+class BatchRetryLoop:
+    """
+    Runs one RetryLoop per file in lockstep and packs the model calls.
+
+    All files are reviewed and scored, then every file that needs another
+    pass gets its improvement instructions from shared evaluator requests,
+    then its patch from shared patch generator requests. Token and wall
+    clock budgets cover the whole batch; the iteration limit is per file.
+    Files missing from a batched reply are retried on their own.
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[str],
+        budget: Optional[RetryBudget] = None,
+        history_keys: Optional[Sequence[str]] = None,
+        prompt_budget: int = PROMPT_TOKEN_BUDGET,
+        max_files: int = MAX_FILES_PER_PROMPT,
+    ):
+        self.budget = budget or RetryBudget()
+        self.tracker = BudgetTracker(self.budget)
+        self.prompt_budget = prompt_budget
+        self.max_files = max_files
+        keys = history_keys or paths
+        self.loops = [RetryLoop(path, self.budget, key, self.tracker) for path, key in zip(paths, keys)]
+        self.states = {loop.path: "review" for loop in self.loops}
+        self.requests = 0
+        self._review_slots = asyncio.Semaphore(REVIEW_CONCURRENCY)
+
+    # ---------------- steps ----------------
+
+    async def _local_step(self, loop: RetryLoop, state: str) -> str:
+        async with self._review_slots:
+            return await loop.step(state)
+
+    async def _single(self, loop: RetryLoop, state: str) -> str:
+        self.requests += 1
+        return await loop.step(state)
+
+    async def _run_batch(self, state: str, batch: List[Tuple[RetryLoop, str]]) -> List[Tuple[RetryLoop, str]]:
+        if len(batch) == 1:
+            loop = batch[0][0]
+            return [(loop, await self._single(loop, state))]
+
+        prompt = multi_file_prompt(state, [(loop.path, body) for loop, body in batch])
+        self.requests += 1
+        try:
+            with timed(f"retry:{state}_batch"):
+                text, used = await self.tracker.call(STATE_AGENTS[state], prompt)
+        except BudgetExceeded as e:
+            return [(loop, loop.stop(str(e))) for loop, _ in batch]
+
+        replies = split_reply(text)
+        total = sum(len(body) for _, body in batch) or 1
+        results = []
+        for loop, body in batch:
+            loop.tokens += round(used * len(body) / total)
+            reply = replies.get(loop.path)
+            if reply is None:
+                results.append((loop, await self._single(loop, state)))
+            elif state == "instruct":
+                results.append((loop, loop.apply_instructions(reply)))
+            else:
+                results.append((loop, loop.apply_patch(reply)))
+        return results
+
+    async def _batched_step(self, state: str, loops: List[RetryLoop]) -> List[Tuple[RetryLoop, str]]:
+        bodies = {
+            loop.path: (loop, loop.instruct_prompt() if state == "instruct" else loop.patch_prompt())
+            for loop in loops
+        }
+        packed = pack([(path, body) for path, (_, body) in bodies.items()], self.prompt_budget, self.max_files)
+        batches = [[bodies[path] for path, _ in batch] for batch in packed]
+        results = await asyncio.gather(*(self._run_batch(state, batch) for batch in batches))
+        return [pair for batch_result in results for pair in batch_result]
+
+    # ---------------- driver ----------------
+
+    async def iter_run(self) -> AsyncIterator[Dict]:
+        """Yields every file's state records, as in RetryLoop.iter_run."""
+        await asyncio.gather(*(loop.begin() for loop in self.loops))
+
+        while any(state != "done" for state in self.states.values()):
+            for state in ("review", "evaluate", "instruct", "patch"):
+                group = [loop for loop in self.loops if self.states[loop.path] == state]
+                if not group:
+                    continue
+                if state in STATE_AGENTS:
+                    results = await self._batched_step(state, group)
+                else:
+                    results = zip(group, await asyncio.gather(*(self._local_step(l, state) for l in group)))
+                for loop, next_state in results:
+                    self.states[loop.path] = next_state
+                    yield loop.state_record(state)
+                    if next_state == "done":
+                        await loop.finish()
+
+    async def iter_results(self) -> AsyncIterator[Dict]:
+        """Yields each file's RetryLoop.result() as soon as its loop stops."""
+        by_path = {loop.path: loop for loop in self.loops}
+        async for record in self.iter_run():
+            if record.get("stop_reason"):
+                yield by_path[record["file"]].result()
+
+    def summary(self) -> Dict:
+        return {
+            "files": len(self.loops),
+            "model_requests": self.requests,
+            "tokens": self.tracker.tokens,
+            "stop_reasons": dict(Counter(loop.stop_reason for loop in self.loops)),
+        }
+
+
+async def run_batch_retry_loop(paths: Sequence[str], budget: Optional[RetryBudget] = None) -> Dict:
+    batch = BatchRetryLoop(paths, budget)
+    results = [result async for result in batch.iter_results()]
+    return {"results": results, "summary": batch.summary()}
+
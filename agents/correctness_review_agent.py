@@ -2,7 +2,8 @@ from typing import List
 from pydantic import BaseModel, Field
 from google.adk.agents import Agent
 from google.adk.models.google_llm import Gemini
-from services.correctness_review import correctness_review
+from agents.model_cache import cached
+from services.correctness_review import correctness_review_async
 
 
 class CorrectnessIssue(BaseModel):
@@ -18,8 +19,8 @@ class CorrectnessOutput(BaseModel):
     issues: List[CorrectnessIssue] = Field(default_factory=list)
 
 
-def run_correctness_review(path: str) -> CorrectnessOutput:
-    report = correctness_review(path)
+async def run_correctness_review(path: str) -> CorrectnessOutput:
+    report = await correctness_review_async(path)
 
     issues = [
         CorrectnessIssue(
@@ -41,7 +42,7 @@ def run_correctness_review(path: str) -> CorrectnessOutput:
 correctness_review_agent = Agent(
     name="correctness_review_agent",
     description="Analyzes code correctness using pylint.",
-    model=Gemini(model="gemini-2.5-flash-lite"),
+    model=cached(Gemini(model="gemini-2.5-flash-lite")),
     instruction="""
 1. Call run_correctness_review tool.
 2. After receiving the tool result, RETURN IT EXACTLY AS JSON TEXT.Never return only a function-call. Always send a final text message afterward.
@@ -0,0 +1,59 @@
+from typing import AsyncIterator, Dict, List
+
+from google.genai import types
+
+
+def event_records(event) -> List[Dict]:
+    """Flatten one ADK event into JSON-friendly stream records."""
+    if getattr(event, "partial", False):
+        return []
+
+    records = []
+    for call in event.get_function_calls():
+        records.append({
+            "stage": event.author,
+            "type": "tool_call",
+            "name": call.name,
+            "args": call.args,
+        })
+    for response in event.get_function_responses():
+        records.append({
+            "stage": event.author,
+            "type": "tool_result",
+            "name": response.name,
+            "response": response.response,
+        })
+
+    parts = event.content.parts if event.content and event.content.parts else []
+    text = "".join(part.text for part in parts if getattr(part, "text", None))
+    if text:
+        records.append({
+            "stage": event.author,
+            "type": "message",
+            "text": text,
+            "final": event.is_final_response(),
+        })
+    return records
+
+
+async def stream_agent_review(runner, path: str, user_id: str = "api") -> AsyncIterator[Dict]:
+    """
+    Runs the coordinator on `path` in a fresh session and yields a record for
+    every sub-agent message, tool call and tool result as soon as it exists.
+    Repeated stages (e.g. one patch per retry) carry an `iteration` number.
+    The session is deleted once the run ends, so the session store (shared
+    across workers) does not grow with every review.
+    """
+    session = await runner.session_service.create_session(app_name=runner.app_name, user_id=user_id)
+    message = types.Content(role="user", parts=[types.Part(text=f"Please review the Python file at: {path}")])
+
+    iterations: Dict[str, int] = {}
+    try:
+        async for event in runner.run_async(user_id=user_id, session_id=session.id, new_message=message):
+            for record in event_records(event):
+                if record["type"] == "tool_result":
+                    iterations[record["stage"]] = iterations.get(record["stage"], 0) + 1
+                    record["iteration"] = iterations[record["stage"]]
+                yield record
+    finally:
+        await runner.session_service.delete_session(app_name=runner.app_name, user_id=user_id, session_id=session.id)
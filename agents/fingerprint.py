@@ -0,0 +1,53 @@
+import hashlib
+import json
+
+from services.ast_analysis import ANALYZER_VERSION
+from services.rule_packs import default_matcher
+from services.scoring import scoring_fingerprint
+from services.static_review import tool_versions
+
+
+def _describe_agent(agent, seen: set) -> dict:
+    if id(agent) in seen:
+        return {"name": getattr(agent, "name", "")}
+    seen.add(id(agent))
+
+    model = getattr(agent, "model", "")
+    tools = []
+    for tool in getattr(agent, "tools", None) or []:
+        inner = getattr(tool, "agent", None)
+        if inner is not None:
+            tools.append(_describe_agent(inner, seen))
+        else:
+            tools.append(getattr(tool, "__qualname__", getattr(tool, "name", repr(tool))))
+
+    return {
+        "name": getattr(agent, "name", ""),
+        "instruction": getattr(agent, "instruction", ""),
+        "model": getattr(model, "model", model) if not isinstance(model, str) else model,
+        "tools": tools,
+        "sub_agents": [_describe_agent(a, seen) for a in getattr(agent, "sub_agents", None) or []],
+    }
+
+
+def _hash(payload: dict) -> str:
+    blob = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def pipeline_fingerprint(*agents, **settings) -> str:
+    """
+    Stable hash of everything that can change a review's output:
+    every agent's instruction and model, the tool wiring, the static
+    analyzer rule set and rule packs, the scoring weights and the installed linter versions.
+    `settings` covers anything else the caller's pipeline depends on.
+    """
+    seen = set()
+    return _hash({
+        "agents": [_describe_agent(agent, seen) for agent in agents],
+        "analyzer_version": ANALYZER_VERSION,
+        "rule_packs": default_matcher().fingerprint,
+        "scoring": scoring_fingerprint(),
+        "tools": tool_versions(),
+        **settings,
+    })
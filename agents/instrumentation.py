@@ -0,0 +1,107 @@
+import time
+import weakref
+from typing import Dict, Tuple
+
+from services.metrics import observe_agent, observe_model, observe_tool
+
+# Start times of agent runs and model calls still in flight. An agent makes
+# its model calls one at a time, so (invocation, agent) names one call.
+_started: Dict[Tuple[str, ...], float] = {}
+# A call that raised never reaches its after-callback; its entry is dropped
+# once it is this old.
+STALE_SECONDS = 3600.0
+_pruned = 0.0
+# Tool calls, by the ToolContext ADK passes to both of their callbacks, so
+# parallel calls of one tool never share an entry and none outlives its call.
+_tool_started: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_instrumented = set()
+
+
+# --------------------------------------------------
+# CALLBACKS
+# --------------------------------------------------
+
+def _start(key: Tuple[str, ...]) -> None:
+    global _pruned
+    now = time.perf_counter()
+    if now - _pruned > STALE_SECONDS / 60:
+        for stale in [k for k, started in _started.items() if now - started > STALE_SECONDS]:
+            del _started[stale]
+        _pruned = now
+    _started[key] = now
+
+
+def _before_agent(callback_context):
+    _start(("agent", callback_context.invocation_id, callback_context.agent_name))
+
+
+def _after_agent(callback_context):
+    start = _started.pop(("agent", callback_context.invocation_id, callback_context.agent_name), None)
+    if start is not None:
+        observe_agent(callback_context.agent_name, time.perf_counter() - start)
+
+
+def _before_model(callback_context, llm_request):
+    _start(("model", callback_context.invocation_id, callback_context.agent_name))
+
+
+def _after_model(callback_context, llm_response):
+    # Streamed chunks arrive here too; the call ends with the final one.
+    if getattr(llm_response, "partial", False):
+        return
+    start = _started.pop(("model", callback_context.invocation_id, callback_context.agent_name), None)
+    if start is not None:
+        # Responses served by agents/model_cache.py cost no tokens.
+        cached = (getattr(llm_response, "custom_metadata", None) or {}).get("cached")
+        observe_model(
+            callback_context.agent_name,
+            time.perf_counter() - start,
+            None if cached else getattr(llm_response, "usage_metadata", None),
+        )
+
+
+def _before_tool(tool, args, tool_context):
+    _tool_started[tool_context] = time.perf_counter()
+
+
+def _after_tool(tool, args, tool_context, tool_response):
+    start = _tool_started.pop(tool_context, None)
+    if start is not None:
+        observe_tool(tool.name, time.perf_counter() - start)
+
+
+# --------------------------------------------------
+# WIRING
+# --------------------------------------------------
+
+CALLBACKS = {
+    "before_agent_callback": _before_agent,
+    "after_agent_callback": _after_agent,
+    "before_model_callback": _before_model,
+    "after_model_callback": _after_model,
+    "before_tool_callback": _before_tool,
+    "after_tool_callback": _after_tool,
+}
+
+
+def instrument(*agents) -> None:
+    """
+    Adds the timing/token callbacks to every agent in each tree: sub-agents
+    and agents wrapped in AgentTools included. Existing callbacks are kept
+    and run first. Safe to call more than once.
+    """
+    for agent in agents:
+        if id(agent) in _instrumented:
+            continue
+        _instrumented.add(id(agent))
+
+        for field, callback in CALLBACKS.items():
+            # Workflow agents (Sequential/Parallel) only have the agent callbacks.
+            if field not in type(agent).model_fields:
+                continue
+            current = getattr(agent, field)
+            callbacks = list(current) if isinstance(current, list) else [current] if current else []
+            setattr(agent, field, callbacks + [callback])
+
+        instrument(*(getattr(agent, "sub_agents", None) or []))
+        instrument(*(tool.agent for tool in getattr(agent, "tools", None) or [] if getattr(tool, "agent", None)))
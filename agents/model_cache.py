@@ -0,0 +1,144 @@
+"""
+Prompt-hash cache and request de-duplication in front of the agents' models.
+
+`cached(Gemini(...))` wraps a model so that:
+
+* a request identical to an earlier one (same model, conversation,
+  instruction, tools and generation config) is answered from a disk cache,
+* identical requests already in flight on the same event loop wait for that
+  one call instead of making their own,
+* `MODEL_CACHE=replay` answers only from the cache directory and fails on a
+  miss, so a directory recorded once can stand in for the API offline.
+"""
+import asyncio
+import hashlib
+import json
+import os
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from services.metrics import cache_lookup
+from services.state import backend
+
+MODE = os.getenv("MODEL_CACHE", "on")  # on | off | replay
+CACHE_DIR = os.getenv("MODEL_CACHE_DIR", "memory/model_cache")
+# Seconds a response is reused for; 0 keeps responses until evicted.
+TTL = float(os.getenv("MODEL_CACHE_TTL", str(24 * 3600)))
+MAX_ENTRIES = int(os.getenv("MODEL_CACHE_MAX_ENTRIES", "5000"))
+MAX_BYTES = int(os.getenv("MODEL_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+
+model_cache = backend().cache(
+    "model", CACHE_DIR, MAX_ENTRIES, MAX_BYTES, ttl=TTL if TTL > 0 and MODE != "replay" else None,
+)
+
+# Request key -> (event loop, future of the leader's responses) for calls in flight.
+_inflight: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+
+
+class ReplayMiss(LookupError):
+    """`MODEL_CACHE=replay` and the request is not in the cache directory."""
+
+
+def _without_call_ids(value: Any) -> Any:
+    # ADK gives every function call a fresh random id, which would make
+    # every turn after a tool call unique.
+    if isinstance(value, dict):
+        value = {k: _without_call_ids(v) for k, v in value.items()}
+        for field in ("function_call", "function_response"):
+            if isinstance(value.get(field), dict):
+                value[field] = {k: v for k, v in value[field].items() if k != "id"}
+        return value
+    if isinstance(value, list):
+        return [_without_call_ids(v) for v in value]
+    return value
+
+
+def request_key(model: str, llm_request: LlmRequest) -> str:
+    payload = {
+        "model": model,
+        "contents": [c.model_dump(mode="json", exclude_none=True) for c in llm_request.contents],
+        "config": llm_request.config.model_dump(mode="json", exclude_none=True) if llm_request.config else None,
+    }
+    blob = json.dumps(_without_call_ids(payload), sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def _restore(dumps: List[dict]) -> List[LlmResponse]:
+    responses = []
+    for dump in dumps:
+        response = LlmResponse.model_validate(dump)
+        response.custom_metadata = {**(response.custom_metadata or {}), "cached": True}
+        responses.append(response)
+    return responses
+
+
+def _settle(future: asyncio.Future, dumps: Optional[List[dict]]) -> None:
+    if not future.done():
+        future.set_result(dumps)
+
+
+class CachedGemini(BaseLlm):
+    """Answers from `model_cache` when it can, otherwise calls `inner` once per distinct request."""
+
+    inner: BaseLlm
+
+    async def _join(self, key: str) -> Optional[List[LlmResponse]]:
+        """The responses of an identical call already running on this loop, if any."""
+        inflight = _inflight.get(key)
+        if inflight is None or inflight[0] is not asyncio.get_running_loop():
+            return None
+        # A failed or abandoned leader settles with None; this caller then makes its own call.
+        dumps = await asyncio.shield(inflight[1])
+        cache_lookup("model_inflight", dumps is not None)
+        return _restore(dumps) if dumps is not None else None
+
+    async def _call(self, key: str, llm_request: LlmRequest, stream: bool) -> AsyncGenerator[LlmResponse, None]:
+        future = asyncio.get_running_loop().create_future()
+        _inflight[key] = (asyncio.get_running_loop(), future)
+        dumps: List[dict] = []
+        try:
+            async for response in self.inner.generate_content_async(llm_request, stream):
+                if not response.partial:
+                    dumps.append(_without_call_ids(response.model_dump(mode="json", exclude_none=True)))
+                yield response
+
+            if dumps and not any(d.get("error_code") for d in dumps):
+                await asyncio.to_thread(model_cache.put, key, {"model": self.inner.model, "responses": dumps})
+                _settle(future, dumps)
+        finally:
+            _settle(future, None)
+            if _inflight.get(key, (None, None))[1] is future:
+                del _inflight[key]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if MODE == "off":
+            async for response in self.inner.generate_content_async(llm_request, stream):
+                yield response
+            return
+
+        key = request_key(self.inner.model, llm_request)
+        stored = await asyncio.to_thread(model_cache.get, key)
+        responses = _restore(stored["responses"]) if stored else None
+        if responses is None and MODE != "replay":
+            responses = await self._join(key)
+        if responses is not None:
+            for response in responses:
+                yield response
+            return
+
+        if MODE == "replay":
+            raise ReplayMiss(f"no recorded response for {self.inner.model} request {key[:12]}")
+        async for response in self._call(key, llm_request, stream):
+            yield response
+
+
+def cached(model: BaseLlm) -> BaseLlm:
+    """`model` behind the shared response cache (`MODEL_CACHE=off` returns it as is)."""
+    if MODE == "off":
+        return model
+    return CachedGemini(model=model.model, inner=model)
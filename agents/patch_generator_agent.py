@@ -1,5 +1,6 @@
 from google.adk.agents import Agent
 from google.adk.models.google_llm import Gemini
+from agents.model_cache import cached
 from google.genai import types
 from pydantic import BaseModel
 
@@ -7,17 +8,10 @@ class PatchOutput(BaseModel):
     updated_code: str
     description: str
 
-def run_patch_generator(original_code: str, improvement_instructions: str) -> PatchOutput:
-    """Stub for ADK — logic handled by LLM."""
-    return PatchOutput(
-        updated_code=original_code,
-        description="Patch generated based on instructions."
-    )
-
 patch_generator_agent = Agent(
     name="patch_generator_agent",
     description="Generates improved code patches based on evaluator feedback.",
-    model=Gemini(model="gemini-2.5-flash-lite"),
+    model=cached(Gemini(model="gemini-2.5-flash-lite")),
     instruction=(
         "You are a patch generator.\n"
         "Input:\n"
@@ -27,7 +21,12 @@ patch_generator_agent = Agent(
         "1. Apply the instructions precisely.\n"
         "2. Modify only the necessary lines.\n"
         "3. Maintain original formatting & comments.\n"
-        "4. Never return only a function-call. Always send a final text message afterward.\n"
+        "4. Reply with text only, there are no tools to call: the complete updated file\n"
+        "   in a single ```python code block, then one sentence on what changed.\n"
+        "5. If original_code is given as 'REGION <start>-<end>' blocks, answer each region\n"
+        "   you change with the same header followed by its own ```python code block\n"
+        "   instead of the whole file.\n"
+        "6. If the input holds several files under '### FILE: <path>' headers, answer\n"
+        "   each file under the same header.\n"
     ),
-    tools=[run_patch_generator],
 )
@@ -1,8 +1,9 @@
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel, Field
 from google.adk.agents import Agent
 from google.adk.models.google_llm import Gemini
-from services.performance_review import performance_review
+from agents.model_cache import cached
+from services.performance_review import performance_review_async
 
 class PerformanceInput(BaseModel):
     path: str
@@ -11,20 +12,22 @@ class PerformanceIssue(BaseModel):
     issue: str
     line: int
     code: str
+    cost: Optional[float] = None
 
 class PerformanceOutput(BaseModel):
     file: str
     issue_count: int
     issues: List[PerformanceIssue] = Field(default_factory=list)
 
-def run_performance_review(request: PerformanceInput) -> PerformanceOutput:
-    report = performance_review(request.path)
+async def run_performance_review(request: PerformanceInput) -> PerformanceOutput:
+    report = await performance_review_async(request.path)
 
     issues = [
         PerformanceIssue(
             issue=i["issue"],
             line=i["line"],
-            code=i["code"]
+            code=i["code"],
+            cost=i.get("cost"),
         )
         for i in report["issues"]
     ]
@@ -38,7 +41,7 @@ def run_performance_review(request: PerformanceInput) -> PerformanceOutput:
 performance_review_agent = Agent(
     name="performance_review_agent",
     description="Analyzes code performance issues.",
-    model=Gemini(model="gemini-2.5-flash-lite"),
+    model=cached(Gemini(model="gemini-2.5-flash-lite")),
     instruction=(
         "You MUST call run_performance_review using this exact JSON schema:\n"
         "{ \"request\": { \"path\": \"<full file path>\" } }\n"
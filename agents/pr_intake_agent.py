@@ -1,5 +1,6 @@
 from google.adk.agents import Agent
 from google.adk.models.google_llm import Gemini
+from agents.model_cache import cached
 # from google.adk.tools import tool
 from google.genai import types
 
@@ -28,7 +29,7 @@ retry = types.HttpRetryOptions(
 pr_intake_agent = Agent(
     name="pr_intake_agent",
     description="Extracts changed files, diffs, and metadata.",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry),
+    model=cached(Gemini(model="gemini-2.5-flash-lite", retry_options=retry)),
     instruction=(
         "Given either a file path, folder path, or diff text:\n\n"
         "If user gives a directory → call run_list_files.\n"
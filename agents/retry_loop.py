@@ -0,0 +1,439 @@
+import ast
+import asyncio
+import difflib
+import hashlib
+import json
+import os
+import re
+import time
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from agents.evaluator_agent import evaluator_agent
+from agents.fingerprint import pipeline_fingerprint
+from agents.instrumentation import instrument
+from agents.patch_generator_agent import patch_generator_agent
+from services.context_builder import apply_regions, code_regions, findings_context, regions_prompt, savings
+from services.metrics import cache_lookup, timed
+from services.scoring import count_loc, evaluate
+from services.source_file import SourceFile
+from services.state import history
+from services.static_review import SECTIONS, format_report, iter_static_review
+
+MAX_ITERATIONS = int(os.getenv("RETRY_MAX_ITERATIONS", "3"))
+MAX_TOKENS = int(os.getenv("RETRY_MAX_TOKENS", "200000"))
+MAX_SECONDS = float(os.getenv("RETRY_MAX_SECONDS", "300"))
+# A patch has to raise overall_score by at least this much to keep going.
+MIN_IMPROVEMENT = float(os.getenv("RETRY_MIN_IMPROVEMENT", "0.25"))
+
+AST_SECTIONS = ("security", "performance")
+
+
+@dataclass
+class RetryBudget:
+    max_iterations: int = MAX_ITERATIONS
+    max_tokens: int = MAX_TOKENS
+    max_seconds: float = MAX_SECONDS
+
+
+class BudgetExceeded(Exception):
+    """Raised before a model call that the remaining budget cannot cover."""
+
+
+class BudgetTracker:
+    """Token and wall-clock accounting; one tracker can be shared by several loops."""
+
+    def __init__(self, budget: RetryBudget):
+        self.budget = budget
+        self.tokens = 0
+        self.started = time.monotonic()
+
+    def remaining_seconds(self) -> float:
+        return self.budget.max_seconds - (time.monotonic() - self.started)
+
+    async def call(self, agent, prompt: str) -> Tuple[str, int]:
+        remaining = self.remaining_seconds()
+        if remaining <= 0:
+            raise BudgetExceeded("wall_clock")
+        # Rough prompt size; the reply is billed after the fact.
+        if self.tokens + len(prompt) // 4 > self.budget.max_tokens:
+            raise BudgetExceeded("token_budget")
+        try:
+            text, used = await asyncio.wait_for(run_agent(agent, prompt), timeout=remaining)
+        except asyncio.TimeoutError:
+            raise BudgetExceeded("wall_clock")
+        self.tokens += used
+        return text, used
+
+
+# --------------------------------------------------
+# ANALYZER MEMO
+# --------------------------------------------------
+
+def _sha(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def section_inputs(src: SourceFile) -> Dict[str, str]:
+    """
+    The key of what each analyzer actually reads. flake8 and pylint see the
+    raw text; the AST scans only see the tree, so a patch that only touches
+    whitespace or comments on existing lines does not re-run them.
+    """
+    text_key = src.sha256
+    tree_key = text_key if src.tree is None else _sha(ast.dump(src.tree, include_attributes=True))
+    return {
+        "style": text_key,
+        "correctness": text_key,
+        "security": "ast:" + tree_key,
+        "performance": "ast:" + tree_key,
+    }
+
+
+class SectionMemo:
+    """Section reports keyed by `section_inputs`, shared by every iteration."""
+
+    def __init__(self):
+        self._reports: Dict[Tuple[str, str], Dict] = {}
+
+    def review(self, path: str, source: str) -> Tuple[Dict, List[str], List[str]]:
+        """Returns (report, sections run, sections reused) for `source`."""
+        src = SourceFile.from_text(path, source)
+        keys = section_inputs(src)
+        stale = [s for s in SECTIONS if (s, keys[s]) not in self._reports]
+        for section in SECTIONS:
+            cache_lookup("sections", section not in stale)
+
+        if stale:
+            # The AST scans reuse `src`'s parse; the linters share one temporary copy.
+            for section, result in iter_static_review(src, sections=stale):
+                self._reports[(section, keys[section])] = result
+
+        lines = src.lines
+        report = {"file": path}
+        for section in SECTIONS:
+            result = self._reports[(section, keys[section])]
+            issues = result["issues"]
+            if section in AST_SECTIONS and section not in stale:
+                # Same tree, but a reused finding should quote the current line.
+                issues = [
+                    {**i, "code": lines[i["line"] - 1].strip() if 0 < i.get("line", 0) <= len(lines) else i.get("code", "")}
+                    for i in issues
+                ]
+            report[section] = {**result, "file": path, "issues": issues}
+
+        return report, stale, [s for s in SECTIONS if s not in stale]
+
+
+# --------------------------------------------------
+# MODEL CALLS
+# --------------------------------------------------
+
+_runners: Dict[str, InMemoryRunner] = {}
+
+
+def _runner(agent) -> InMemoryRunner:
+    if agent.name not in _runners:
+        instrument(agent)
+        _runners[agent.name] = InMemoryRunner(agent=agent, app_name=f"retry-loop-{agent.name}")
+    return _runners[agent.name]
+
+
+async def run_agent(agent, prompt: str) -> Tuple[str, int]:
+    """
+    Runs one agent on `prompt` in a fresh session; returns (final text, tokens
+    used). The session is deleted afterwards, since nothing reads it again.
+    """
+    runner = _runner(agent)
+    session = await runner.session_service.create_session(app_name=runner.app_name, user_id="retry-loop")
+    message = types.Content(role="user", parts=[types.Part(text=prompt)])
+
+    texts, tokens = [], 0
+    try:
+        async for event in runner.run_async(user_id="retry-loop", session_id=session.id, new_message=message):
+            usage = getattr(event, "usage_metadata", None)
+            if usage is not None and usage.total_token_count:
+                tokens += usage.total_token_count
+            if event.content and event.content.parts and not getattr(event, "partial", False):
+                texts.extend(part.text for part in event.content.parts if getattr(part, "text", None))
+    finally:
+        await runner.session_service.delete_session(
+            app_name=runner.app_name, user_id="retry-loop", session_id=session.id,
+        )
+    return "\n".join(texts), tokens
+
+
+_CODE_BLOCK = re.compile(r"```(?:python|py)?[ \t]*\n(.*?)```", re.DOTALL)
+
+
+def extract_code(text: str) -> Optional[str]:
+    """The last fenced code block in a model reply, if any."""
+    blocks = _CODE_BLOCK.findall(text)
+    return blocks[-1] if blocks else None
+
+
+# --------------------------------------------------
+# STATE MACHINE
+# --------------------------------------------------
+
+class RetryLoop:
+    """
+    review -> evaluate -> instruct -> patch -> review ... as plain Python.
+
+    Models are only called for improvement instructions and for patches.
+    The loop stops when the file passes, when the iteration, token or
+    wall-clock budget runs out, when a patch changes nothing, or when a
+    patch fails to raise overall_score by MIN_IMPROVEMENT. The best
+    version seen so far is the result.
+    """
+
+    def __init__(
+        self,
+        source: Union[str, SourceFile],
+        budget: Optional[RetryBudget] = None,
+        history_key: Optional[str] = None,
+        tracker: Optional[BudgetTracker] = None,
+    ):
+        src = SourceFile.load(source)
+        self.path = src.name
+        self.history_key = history_key or src.name
+        self.budget = budget or RetryBudget()
+        self.tracker = tracker
+        self.memo = SectionMemo()
+
+        self.original = src.text
+        self.code = self.original
+        # Of the reviewed bytes, not of whatever the name points to on disk.
+        self.content_hash = src.sha256
+
+        self.iteration = 0
+        # Tokens spent on this file; a batched call is split by prompt share.
+        self.tokens = 0
+        self.started = 0.0
+        self.stop_reason: Optional[str] = None
+        self.report: Optional[Dict] = None
+        self.evaluation: Optional[Dict] = None
+        self.instructions = ""
+        self._regions = None
+        self.best: Optional[Tuple[str, Dict, Dict]] = None
+        self.history: List[Dict] = []
+        self._record: Dict = {}
+        self.trend = ""
+
+    async def _call(self, agent, prompt: str) -> str:
+        text, used = await self.tracker.call(agent, prompt)
+        self.tokens += used
+        return text
+
+    # ---------------- states ----------------
+
+    async def _review(self) -> str:
+        self.report, ran, reused = await asyncio.to_thread(self.memo.review, self.path, self.code)
+        self._record = {"iteration": self.iteration, "reviewed": ran, "reused": reused}
+        return "evaluate"
+
+    async def _evaluate(self) -> str:
+        self.evaluation = evaluate(self.report, loc=count_loc(self.code), trend=self.trend)
+        self._record.update({
+            f"{s}_score": self.evaluation[f"{s}_score"] for s in SECTIONS
+        })
+        self._record.update({
+            "overall_score": self.evaluation["overall_score"],
+            "should_retry": self.evaluation["should_retry"],
+        })
+        self.history.append(self._record)
+
+        previous_best = self.best[2]["overall_score"] if self.best else None
+        if previous_best is None or self.evaluation["overall_score"] > previous_best:
+            self.best = (self.code, self.report, self.evaluation)
+
+        if not self.evaluation["should_retry"]:
+            return self.stop("passed")
+        if previous_best is not None and self.evaluation["overall_score"] - previous_best < MIN_IMPROVEMENT:
+            return self.stop("converged")
+        if self.iteration >= self.budget.max_iterations:
+            return self.stop("max_iterations")
+        return "instruct"
+
+    async def _instruct(self) -> str:
+        return self.apply_instructions(await self._call(evaluator_agent, self.instruct_prompt()))
+
+    async def _patch(self) -> str:
+        return self.apply_patch(await self._call(patch_generator_agent, self.patch_prompt()))
+
+    # Prompt bodies and reply handling are separate from the calls so
+    # BatchRetryLoop can pack several files into one request.
+
+    def _note_context(self, kind: str, stats: Dict[str, int]) -> None:
+        if self.history:
+            self.history[-1].setdefault("context", {})[kind] = stats
+
+    def instruct_prompt(self) -> str:
+        # Findings go out compacted: one entry per rule with its lines.
+        evaluation = {k: v for k, v in self.evaluation.items() if k not in ("details", "trend")}
+        findings, stats = findings_context(self.report)
+        self._note_context("instruct", stats)
+        return f"report: {findings}\n\nevaluation: {json.dumps(evaluation)}\n\ntrend: {self.trend}"
+
+    def apply_instructions(self, text: str) -> str:
+        self.instructions = text.strip()
+        self.history[-1]["improvement_instructions"] = self.instructions
+        return "patch"
+
+    def patch_prompt(self) -> str:
+        full = (
+            f"original_code:\n```python\n{self.code}```\n\n"
+            f"improvement_instructions:\n{self.instructions}\n\n"
+            "Return the complete updated file in a single ```python code block."
+        )
+        self._regions = code_regions(self.code, self.report)
+        if self._regions is None:
+            prompt = full
+        else:
+            # Too large to send whole: only the regions around findings.
+            prompt = (
+                "original_code (only the regions around the findings):\n"
+                f"{regions_prompt(self.code, self._regions)}\n\n"
+                f"improvement_instructions:\n{self.instructions}\n\n"
+                "For each region you change, reply with the same 'REGION <start>-<end>' "
+                "header followed by the complete replacement for those lines in a single "
+                "```python code block. Leave out regions you do not change."
+            )
+        self._note_context("patch", savings(full, prompt))
+        return prompt
+
+    def apply_patch(self, text: str) -> str:
+        if self._regions is None:
+            patched = extract_code(text)
+        else:
+            patched = apply_regions(self.code, text, self._regions)
+        if patched is None or patched.strip() == self.code.strip():
+            return self.stop("no_diff")
+
+        self.code = patched
+        self.iteration += 1
+        return "review"
+
+    def stop(self, reason: str) -> str:
+        self.stop_reason = reason
+        return "done"
+
+    # ---------------- driver ----------------
+
+    async def begin(self) -> None:
+        self.started = time.monotonic()
+        if self.tracker is None:
+            self.tracker = BudgetTracker(self.budget)
+        self.trend = await asyncio.to_thread(history().trend_digest, self.history_key)
+
+    async def step(self, state: str) -> str:
+        try:
+            with timed(f"retry:{state}"):
+                return await getattr(self, f"_{state}")()
+        except BudgetExceeded as e:
+            return self.stop(str(e))
+
+    async def finish(self) -> None:
+        code, report, evaluation = self.best
+        await asyncio.to_thread(
+            history().save_review,
+            self.history_key,
+            {**{k: v for k, v in evaluation.items() if k != "details"}, "report": report},
+            self.content_hash,
+        )
+
+    async def iter_run(self) -> AsyncIterator[Dict]:
+        """Runs the loop, yielding a stream record after every state."""
+        await self.begin()
+
+        state = "review"
+        while state != "done":
+            current, state = state, await self.step(state)
+            yield self.state_record(current)
+
+        await self.finish()
+
+    def state_record(self, state: str) -> Dict:
+        record = {"stage": state, "type": "tool_result", "file": self.path, "iteration": self.iteration}
+        if state == "review":
+            record["response"] = {k: self._record[k] for k in ("reviewed", "reused")}
+        elif state == "evaluate":
+            record["response"] = {k: v for k, v in self.evaluation.items() if k != "details"}
+        elif state == "instruct" and self.instructions:
+            record["response"] = {"improvement_instructions": self.instructions}
+        if state in ("instruct", "patch") and self.history:
+            stats = self.history[-1].get("context", {}).get(state)
+            if stats:
+                record["context"] = stats
+        if self.stop_reason:
+            record["stop_reason"] = self.stop_reason
+        return record
+
+    def result(self) -> Dict:
+        code, report, evaluation = self.best
+        diff = "".join(difflib.unified_diff(
+            self.original.splitlines(keepends=True),
+            code.splitlines(keepends=True),
+            fromfile="original",
+            tofile="updated",
+        ))
+        context = {"raw_tokens": 0, "sent_tokens": 0, "saved_tokens": 0}
+        for record in self.history:
+            for stats in record.get("context", {}).values():
+                for key in context:
+                    context[key] += stats[key]
+        return {
+            "file": self.path,
+            "stop_reason": self.stop_reason,
+            "iterations": self.history,
+            "context": context,
+            "evaluation": evaluation,
+            "report": report,
+            "final_code": code,
+            "diff": diff,
+            "tokens": self.tokens,
+            "seconds": round(time.monotonic() - self.started, 3),
+        }
+
+    async def run(self) -> Dict:
+        async for _ in self.iter_run():
+            pass
+        return self.result()
+
+
+def loop_fingerprint(budget: Optional[RetryBudget] = None) -> str:
+    return pipeline_fingerprint(
+        evaluator_agent,
+        patch_generator_agent,
+        budget=asdict(budget or RetryBudget()),
+        min_improvement=MIN_IMPROVEMENT,
+    )
+
+
+async def run_retry_loop(
+    source: Union[str, SourceFile],
+    budget: Optional[RetryBudget] = None,
+    history_key: Optional[str] = None,
+) -> Dict:
+    return await RetryLoop(source, budget, history_key).run()
+
+
+def format_loop_result(result: Dict, file_name: str = None) -> str:
+    """Markdown summary: final scores, how the loop ended, then the usual report."""
+    evaluation = result["evaluation"]
+    lines = [
+        format_report(result["report"], file_name or result["file"]).rstrip(),
+        "",
+        "## Evaluation",
+        f"Overall score: {evaluation['overall_score']} ({evaluation['comments']})",
+        f"Stopped: {result['stop_reason']} after {len(result['iterations']) - 1} patch(es), "
+        f"{result['tokens']} tokens, {result['seconds']}s",
+    ]
+    if evaluation.get("trend"):
+        lines.append(f"Trend: {evaluation['trend']}")
+    if result["diff"]:
+        lines += ["", "## Patch", "```diff", result["diff"].rstrip(), "```"]
+    return "\n".join(lines) + "\n"
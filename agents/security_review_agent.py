@@ -2,7 +2,8 @@ from typing import List
 from pydantic import BaseModel, Field
 from google.adk.agents import Agent
 from google.adk.models.google_llm import Gemini
-from services.security_review import security_review
+from agents.model_cache import cached
+from services.security_review import security_review_async
 
 
 class SecurityIssue(BaseModel):
@@ -17,8 +18,8 @@ class SecurityOutput(BaseModel):
     issues: List[SecurityIssue] = Field(default_factory=list)
 
 
-def run_security_review(path: str) -> SecurityOutput:
-    report = security_review(path)
+async def run_security_review(path: str) -> SecurityOutput:
+    report = await security_review_async(path)
 
     issues = [
         SecurityIssue(
@@ -39,7 +40,7 @@ def run_security_review(path: str) -> SecurityOutput:
 security_review_agent = Agent(
     name="security_review_agent",
     description="Scans for insecure patterns.",
-    model=Gemini(model="gemini-2.5-flash-lite"),
+    model=cached(Gemini(model="gemini-2.5-flash-lite")),
 
     instruction="""
     1. Call run_security_review tool.
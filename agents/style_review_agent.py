@@ -2,8 +2,9 @@ from typing import List
 from pydantic import BaseModel, Field
 from google.adk.agents import Agent
 from google.adk.models.google_llm import Gemini
+from agents.model_cache import cached
 from google.genai import types
-from services.style_review import style_review
+from services.style_review import style_review_async
 
 
 class StyleReviewInput(BaseModel):
@@ -23,8 +24,8 @@ class StyleReviewOutput(BaseModel):
     issues: List[StyleIssue] = Field(default_factory=list)
 
 
-def run_style_review(path: str) -> StyleReviewOutput:
-    report = style_review(path)
+async def run_style_review(path: str) -> StyleReviewOutput:
+    report = await style_review_async(path)
     return StyleReviewOutput(
         file=report["file"],
         issue_count=report["issue_count"],
@@ -43,7 +44,7 @@ def run_style_review(path: str) -> StyleReviewOutput:
 style_review_agent = Agent(
     name="style_review_agent",
     description="Agent that analyzes Python style.",
-    model=Gemini(model="gemini-2.5-flash-lite"),
+    model=cached(Gemini(model="gemini-2.5-flash-lite")),
     instruction=(
     "1. Call the run_style_review tool.\n"
     "2. After receiving the result, ALWAYS return a plain-text summary like:\n"
@@ -1,46 +1,208 @@
 # app.py
-import os
-import tempfile
 import asyncio
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+import json
+import os
+import sys
+import threading
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import AsyncIterator, Awaitable, Callable, List, Literal, Optional
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Header
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from memory.review_cache import content_key
+from services.static_review import static_review_async, iter_static_review_async, format_report, static_fingerprint
+from services.batch_review import collect_paths, confine, diff_hunks, iter_batch_review, summarize
+from services.findings import FindingsTable
+from services.project_index import ProjectIndex
+from services.incremental_review import DEFAULT_CONTEXT
+from services.source_file import SourceFile
+from services.job_queue import TERMINAL, Job, JobQueue, QueueFull
+from services.metrics import REGISTRY, format_timings, request_timings, timed
+from services.state import backend, review_cache as shared_review_cache, upload_key
+
+# --------------------------------------------------
+# AGENTS (loaded on first use)
+# --------------------------------------------------
+
+# Importing the agents pulls in google.adk and builds every model, which
+# takes seconds. Static reviews, health checks and metrics never need them,
+# so the server starts without them; unless PRELOAD_AGENTS=0 they are then
+# loaded in the background.
+PRELOAD_AGENTS = os.getenv("PRELOAD_AGENTS", "1") != "0"
+
+_agents: Optional[SimpleNamespace] = None
+_agents_lock = threading.Lock()
+
+
+def _load_agents() -> SimpleNamespace:
+    global _agents
+    with _agents_lock:
+        if _agents is None:
+            from google.adk.artifacts import InMemoryArtifactService
+            from google.adk.memory import InMemoryMemoryService
+            from google.adk.runners import Runner
+
+            from agents.batch_retry_loop import BatchRetryLoop
+            from agents.event_stream import stream_agent_review
+            from agents.fingerprint import pipeline_fingerprint
+            from agents.retry_loop import RetryLoop, format_loop_result, loop_fingerprint
+            from agents.review_coordinator_agent import coordinator_agent
+
+            _agents = SimpleNamespace(
+                # One runner per process; its sessions live in the shared state backend
+                runner=Runner(
+                    agent=coordinator_agent,
+                    app_name="ai-code-reviewer",
+                    session_service=backend().session_service(),
+                    artifact_service=InMemoryArtifactService(),
+                    memory_service=InMemoryMemoryService(),
+                ),
+                stream_agent_review=stream_agent_review,
+                RetryLoop=RetryLoop,
+                BatchRetryLoop=BatchRetryLoop,
+                format_loop_result=format_loop_result,
+                fingerprints={
+                    "agent": pipeline_fingerprint(coordinator_agent, loop=loop_fingerprint()),
+                    "pipeline": loop_fingerprint(),
+                },
+            )
+    return _agents
+
+
+async def agents() -> SimpleNamespace:
+    """The runner, retry loops and their fingerprints; loads them off the event loop once."""
+    return _agents or await asyncio.to_thread(_load_agents)
+
+
+# Reviews are reused for identical uploads until the pipeline itself changes
+review_cache = shared_review_cache()
+STATIC_FINGERPRINT = static_fingerprint()
+
+
+async def fingerprint(mode: str) -> str:
+    if mode == "static":
+        return STATIC_FINGERPRINT
+    return (await agents()).fingerprints[mode]
+
+
+async def run_job(job: Job) -> dict:
+    kind = job.payload.get("kind")
+    if kind == "stream":
+        return await stream_review(job)
+    if kind == "batch":
+        return await batch_review(job)
+    return await perform_review(**job.payload, tenant=job.tenant)
+
+
+# Every review, streamed and batch ones included, goes through this queue,
+# which bounds concurrent reviews.
+# Job records are shared so any worker can answer GET /jobs/{id}.
+job_store = backend().jobs()
+job_queue = JobQueue(run_job, store=job_store)
+
+
+def _job_states() -> dict:
+    stats = job_queue.stats()
+    return {("queued",): stats["queued"], ("running",): stats["running"]}
+
+
+REGISTRY.gauge("review_jobs", "Reviews on the job queue by state.", ("state",), _job_states)
+REGISTRY.gauge("review_cache_entries", "Entries in the review cache.", (), lambda: {(): review_cache.stats()["entries"]})
+REGISTRY.gauge("review_cache_bytes", "Size of the review cache on disk.", (), lambda: {(): review_cache.stats()["bytes"]})
+
+
+def _model_cache_stat(key: str) -> dict:
+    # Only once the agents (and so the model cache) are loaded.
+    module = sys.modules.get("agents.model_cache")
+    return {(): module.model_cache.stats()[key]} if module else {}
+
+
+REGISTRY.gauge("model_cache_entries", "Entries in the model response cache.", (), lambda: _model_cache_stat("entries"))
+REGISTRY.gauge("model_cache_bytes", "Size of the model response cache on disk.", (), lambda: _model_cache_stat("bytes"))
 
-from google.adk.runners import InMemoryRunner
 
-from agents.review_coordinator_agent import coordinator_agent
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await job_queue.start()
+    if PRELOAD_AGENTS:
+        # Requests are served meanwhile; one that needs the agents waits for this.
+        threading.Thread(target=_load_agents, name="preload-agents", daemon=True).start()
+    yield
+    await job_queue.stop()
+
 
 app = FastAPI(
     title="AI Code Reviewer",
     description="Multi-agent AI code review service (style, correctness, security, performance, evaluator, patcher).",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
-# One runner instance for the whole process
-runner = InMemoryRunner(agent=coordinator_agent, app_name="ai-code-reviewer")
-
 
-async def run_review_on_path(path: str) -> str:
+async def agent_review(
+    src: SourceFile,
+    history_key: str,
+    emit: Optional[Callable[[dict], Awaitable[None]]] = None,
+) -> dict:
     """
-    Uses the exact same pattern you already use in main.py:
-    runner.run_debug(prompt) -> final natural-language summary.
+    mode=agent: the coordinator's review agents on `src` in their own
+    session, then evaluation and patching in code (RetryLoop). `emit`
+    receives every stream record as it is produced.
     """
-    prompt = f"Please review the Python file at: {path}"
-    resp = await runner.run_debug(prompt)
-    if isinstance(resp, str):
-        return resp
+    loaded = await agents()
+    texts = []
+    # The agents' tools take a path.
+    with src.on_disk() as path:
+        async for record in loaded.stream_agent_review(loaded.runner, path):
+            if record["type"] == "message":
+                texts.append(record["text"])
+            if emit is not None:
+                await emit(record)
+
+    loop = loaded.RetryLoop(src, history_key=history_key)
+    async for record in loop.iter_run():
+        if emit is not None:
+            await emit(record)
+    loop_result = loop.result()
+    review = "\n".join(texts) if texts else "No textual response from agent."
+    return {"review": f"{review}\n\n{loaded.format_loop_result(loop_result, src.name)}", "pipeline": loop_result}
+
+
+async def read_upload(file: UploadFile) -> bytes:
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="File must have a name.")
 
+    raw_bytes = await file.read()
     try:
-        from google.genai.types import Content, Part  # type: ignore
+        raw_bytes.decode("utf-8")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File is not valid UTF-8 text.")
+    return raw_bytes
 
-        texts = []
-        for evt in resp:
-            if getattr(evt, "content", None) and getattr(evt.content, "parts", None):
-                for part in evt.content.parts:
-                    if getattr(part, "text", None):
-                        texts.append(part.text)
-        return "\n".join(texts) if texts else "No textual response from agent."
-    except Exception:
-        return str(resp)
+
+# /review/batch only reads files under this directory.
+BATCH_ROOT = os.path.realpath(os.getenv("BATCH_ROOT", "."))
+
+
+def encode_record(record: dict, fmt: str) -> str:
+    data = json.dumps(record, default=str)
+    if fmt == "sse":
+        return f"event: {record.get('type', 'message')}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+class BatchReviewRequest(BaseModel):
+    directory: Optional[str] = None
+    paths: List[str] = []
+    diff: Optional[str] = None
+    root: str = "."
+    workers: Optional[int] = None
+    incremental: bool = False
+    context: int = DEFAULT_CONTEXT
+    pipeline: bool = False
+    index: bool = False
 
 
 @app.get("/healthz")
@@ -48,39 +210,333 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    return review_cache.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text format: stage, agent, model, tool and rule timings, tokens, cache lookups."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+async def perform_review(
+    raw_bytes: bytes, filename: str, mode: str, timings: bool = False, tenant: str = "default",
+) -> dict:
+    with request_timings() as observed:
+        with timed(f"review:{mode}"):
+            result = await _perform_review(raw_bytes, filename, mode, tenant)
+    if timings:
+        result["timings"] = format_timings(observed)
+    return result
+
+
+async def cached_review(raw_bytes: bytes, filename: str, mode: str) -> Optional[dict]:
+    """The stored result for these bytes in `mode`, as /review returns it, or None."""
+    cached = review_cache.get(content_key(raw_bytes, await fingerprint(mode)))
+    if cached is None:
+        return None
+    return {"file_name": filename, **cached, "cached": True}
+
+
+async def _perform_review(raw_bytes: bytes, filename: str, mode: str, tenant: str) -> dict:
+    # Checked again: POST /jobs does not look first, and another job may
+    # have stored it since this one was queued.
+    cached = await cached_review(raw_bytes, filename, mode)
+    if cached is not None:
+        return cached
+
+    # Stays in memory; linters get a temporary copy only while they run.
+    src = SourceFile(filename, raw_bytes)
+
+    if mode == "static":
+        report = await static_review_async(src)
+        result = {"review": format_report(report, filename), "report": report}
+    elif mode == "pipeline":
+        loaded = await agents()
+        loop_result = await loaded.RetryLoop(src, history_key=upload_key(tenant, filename)).run()
+        result = {"review": loaded.format_loop_result(loop_result, filename), "pipeline": loop_result}
+    else:
+        result = await agent_review(src, upload_key(tenant, filename))
+    review_cache.put(content_key(raw_bytes, await fingerprint(mode)), result)
+
+    return {"file_name": filename, **result, "cached": False}
+
+
+def submit_job(tenant: str, payload: dict, stream: bool = False) -> Job:
+    try:
+        return job_queue.submit(tenant, payload, stream=stream)
+    except QueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+async def job_records(job: Job) -> AsyncIterator[dict]:
+    """
+    The records a streaming job emits, as they come. The job is cancelled
+    if the client goes away first; a failed job raises once its records
+    have been sent.
+    """
+    try:
+        async for record in job.stream():
+            yield record
+    finally:
+        if job.status not in TERMINAL:
+            job_queue.cancel(job.id)
+    if job.status != "done":
+        raise RuntimeError(job.error or job.status)
+
+
+async def stream_review(job: Job) -> dict:
+    """Queued /review/stream: emits each sub-agent result, returns the final review."""
+    filename, mode = job.payload["filename"], job.payload["mode"]
+    src = SourceFile(filename, job.payload["raw_bytes"])
+    if mode == "static":
+        report = {"file": src.name}
+        async for section, result in iter_static_review_async(src):
+            report[section] = result
+            await job.emit({"stage": section, "type": "tool_result", "response": result})
+        result = {"review": format_report(report, filename), "report": report}
+        await job.emit({"stage": "summary", "type": "message", "text": result["review"], "final": True})
+    elif mode == "pipeline":
+        loaded = await agents()
+        loop = loaded.RetryLoop(src, history_key=upload_key(job.tenant, filename))
+        async for record in loop.iter_run():
+            await job.emit(record)
+        loop_result = loop.result()
+        result = {"review": loaded.format_loop_result(loop_result, filename), "pipeline": loop_result}
+        await job.emit({"stage": "summary", "type": "message", "text": result["review"], "final": True})
+    else:
+        result = await agent_review(src, upload_key(job.tenant, filename), job.emit)
+        await job.emit({"stage": "summary", "type": "message", "text": result["review"], "final": True})
+    review_cache.put(job.payload["cache_key"], result)
+    return result
+
+
+def _static_batch(job: Job, loop: asyncio.AbstractEventLoop) -> dict:
+    """Runs a static batch in a worker thread, emitting each file's result."""
+    request, paths, hunks = job.payload["request"], job.payload["paths"], job.payload["hunks"]
+    index = ProjectIndex(request.root) if request.index else None
+    # Findings are kept columnar for the summary; each result is sent as it comes.
+    findings, indexed = FindingsTable(), 0
+    results = iter_batch_review(paths, workers=request.workers, hunks=hunks, context=request.context, index=index)
+    try:
+        for result in results:
+            findings.add_result(result)
+            indexed += bool(result.get("indexed"))
+            if not job.emit_from_thread(result, loop):
+                break
+    finally:
+        results.close()
+        if index is not None:
+            index.close()
+    return summarize(findings, indexed)
+
+
+async def batch_review(job: Job) -> dict:
+    """Queued /review/batch: emits one record per file, then the summary."""
+    if job.payload["request"].pipeline:
+        batch = (await agents()).BatchRetryLoop(job.payload["paths"])
+        async for result in batch.iter_results():
+            await job.emit(result)
+        summary = batch.summary()
+    else:
+        summary = await asyncio.to_thread(_static_batch, job, asyncio.get_running_loop())
+    await job.emit({"summary": summary})
+    return {"summary": summary}
+
+
 @app.post("/review")
-async def review_file(file: UploadFile = File(...)):
+async def review_file(
+    file: UploadFile = File(...),
+    mode: Literal["agent", "static", "pipeline"] = Query("agent"),
+    timings: bool = Query(False),
+    x_tenant_id: str = Header("default"),
+):
     """
-    POST /review
+    POST /review?mode=agent|static|pipeline[&timings=true]
     Content-Type: multipart/form-data
     Body: file=<uploaded python file>
 
-    Returns the final coordinator_agent summary (markdown / text).
+    mode=agent (default) returns the review agents' summaries followed by
+    the pipeline loop's result (the retry loop runs in code either way).
+    mode=static runs the four static reviewers directly, with no model
+    calls, and returns their markdown summary plus the structured report.
+    mode=pipeline runs the review / score / patch loop in code and only
+    calls models for improvement instructions and patches.
+    timings=true adds a per-stage timing breakdown of this request.
+
+    A cached result is returned straight away. Otherwise the review runs
+    on the shared job queue and this call waits for it; a full queue
+    answers 503 with Retry-After.
     """
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="File must have a name.")
+    raw_bytes = await read_upload(file)
+    with request_timings() as observed:
+        cached = await cached_review(raw_bytes, file.filename, mode)
+    if cached is not None:
+        if timings:
+            cached["timings"] = format_timings(observed)
+        return JSONResponse(cached)
 
-    try:
-        raw_bytes = await file.read()
+    job = submit_job(x_tenant_id, {"raw_bytes": raw_bytes, "filename": file.filename, "mode": mode, "timings": timings})
+    await job.done.wait()
+
+    if job.status != "done":
+        raise HTTPException(status_code=500, detail=f"Internal error: {job.error or job.status}")
+    return JSONResponse(job.result)
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(
+    file: UploadFile = File(...),
+    mode: Literal["agent", "static", "pipeline"] = Query("agent"),
+    timings: bool = Query(False),
+    x_tenant_id: str = Header("default"),
+):
+    """
+    POST /jobs?mode=agent|static|pipeline[&timings=true]
+    Body: file=<uploaded python file>
+
+    Queues a review and returns immediately with its job id.
+    """
+    raw_bytes = await read_upload(file)
+    job = submit_job(x_tenant_id, {"raw_bytes": raw_bytes, "filename": file.filename, "mode": mode, "timings": timings})
+    return job.to_dict()
+
+
+@app.get("/jobs")
+async def jobs_stats():
+    return job_queue.stats()
+
+
+async def _shared_job(job_id: str) -> dict:
+    """A job queued on another worker, from the shared job store."""
+    record = await asyncio.to_thread(job_store.get, job_id) if job_store is not None else None
+    if record is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return record
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        return await _shared_job(job_id)
+    return job.to_dict()
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = job_queue.cancel(job_id)
+    if job is None:
+        record = await _shared_job(job_id)
+        if record["status"] not in TERMINAL:
+            raise HTTPException(status_code=409, detail="Job is running on another worker.")
+        return record
+    return job.to_dict()
+
+
+@app.post("/review/stream")
+async def review_stream(
+    file: UploadFile = File(...),
+    mode: Literal["agent", "static", "pipeline"] = Query("agent"),
+    format: Literal["ndjson", "sse"] = Query("ndjson"),
+    x_tenant_id: str = Header("default"),
+):
+    """
+    POST /review/stream?mode=agent|static|pipeline&format=ndjson|sse
+    Body: file=<uploaded python file>
+
+    Streams one record per sub-agent result (style, correctness, security,
+    performance, evaluator, each patch iteration) as soon as it is produced,
+    followed by a final {"type": "done"} record.
+
+    The review runs on the shared job queue like POST /review; a full
+    queue answers 503 with Retry-After.
+    """
+    raw_bytes = await read_upload(file)
+    cache_key = content_key(raw_bytes, await fingerprint(mode))
+    cached = review_cache.get(cache_key)
+    job = None
+    if cached is None:
+        job = submit_job(
+            x_tenant_id,
+            {"kind": "stream", "raw_bytes": raw_bytes, "filename": file.filename, "mode": mode, "cache_key": cache_key},
+            stream=True,
+        )
+
+    async def records():
+        if cached is not None:
+            yield {"stage": "cache", "type": "cached", **cached}
+            return
+        async for record in job_records(job):
+            yield record
+
+    async def stream():
         try:
-            code_text = raw_bytes.decode("utf-8")
-        except UnicodeDecodeError:
-            raise HTTPException(status_code=400, detail="File is not valid UTF-8 text.")
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1] or ".py") as tmp:
-            tmp.write(code_text.encode("utf-8"))
-            tmp_path = tmp.name
-
-        review_text = await run_review_on_path(tmp_path)
-
-        return JSONResponse(
-            {
-                "file_name": file.filename,
-                "tmp_path": tmp_path,
-                "review": review_text,
-            }
+            async for record in records():
+                yield encode_record(record, format)
+        except Exception as e:
+            yield encode_record({"type": "error", "detail": f"Internal error: {e}"}, format)
+        yield encode_record({"type": "done"}, format)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media_type)
+
+
+@app.post("/review/batch")
+async def review_batch(request: BatchReviewRequest, x_tenant_id: str = Header("default")):
+    """
+    POST /review/batch
+    Body: {"directory": ..., "paths": [...], "diff": "<unified diff>", "root": ".",
+           "incremental": false, "context": 3, "index": false}
+
+    Runs the static reviewers over every resolved file on a process pool and
+    streams one NDJSON line per file as it finishes, then a summary line.
+    With a diff and incremental=true, only findings on changed lines (plus
+    `context` lines) are reported and the rest come from the cached baseline.
+    With pipeline=true, each file goes through the retry loop instead, with
+    several files packed into each model request.
+    With index=true, the project index for `root` answers unchanged files
+    and only changed files and their importers are analyzed again.
+    The retry loop reviews and patches whole files, so pipeline=true with
+    incremental or index is refused with 400.
+
+    Paths are relative to BATCH_ROOT and anything resolving outside it is
+    refused with 400. `workers` is capped at the CPU count. The batch is
+    one job on the shared review queue; a full queue answers 503 with
+    Retry-After.
+    """
+    if request.pipeline and (request.incremental or request.index):
+        raise HTTPException(status_code=400, detail="pipeline=true cannot be combined with incremental or index.")
+    try:
+        root = confine(request.root, BATCH_ROOT)
+        paths = await asyncio.to_thread(
+            collect_paths,
+            directory=request.directory,
+            paths=request.paths,
+            diff=request.diff,
+            root=root,
+            within=BATCH_ROOT,
         )
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal error: {e}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not paths:
+        raise HTTPException(status_code=400, detail="No Python files to review.")
+    cpus = os.cpu_count() or 1
+    request = request.model_copy(update={"root": root, "workers": max(1, min(request.workers or cpus, cpus))})
+    hunks = diff_hunks(request.diff, root) if request.diff and request.incremental else None
+    job = submit_job(x_tenant_id, {"kind": "batch", "request": request, "paths": paths, "hunks": hunks}, stream=True)
+
+    async def stream():
+        try:
+            async for result in job_records(job):
+                yield json.dumps(result) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": f"Internal error: {e}"}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
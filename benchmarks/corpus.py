@@ -0,0 +1,94 @@
+import ast
+import glob
+import os
+from typing import Dict, Iterable, List, Set, Tuple
+
+SEED_DIR = os.getenv("BENCH_SEED_DIR", "agents/test-input-python-code")
+SIZES = (1_000, 10_000, 100_000)
+
+
+class _Renamer(ast.NodeTransformer):
+    """Suffixes every use of a module-level name, so copies do not collide."""
+
+    def __init__(self, names: Set[str], suffix: str):
+        self.names = names
+        self.suffix = suffix
+
+    def _rename(self, name: str) -> str:
+        return f"{name}{self.suffix}" if name in self.names else name
+
+    def visit_Name(self, node: ast.Name) -> ast.Name:
+        node.id = self._rename(node.id)
+        return node
+
+    def visit_FunctionDef(self, node):
+        node.name = self._rename(node.name)
+        self.generic_visit(node)
+        return node
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+    visit_ClassDef = visit_FunctionDef
+
+
+def _top_level_names(tree: ast.Module) -> Set[str]:
+    names = set()
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            names.update(t.id for t in targets if isinstance(t, ast.Name))
+    return names
+
+
+def load_seeds(seed_dir: str = SEED_DIR) -> List[Tuple[List[str], str, Set[str]]]:
+    """(import lines, body source, top-level names) per seed file that parses."""
+    seeds = []
+    for path in sorted(glob.glob(os.path.join(seed_dir, "*.py"))):
+        with open(path, "r", encoding="utf-8") as f:
+            try:
+                tree = ast.parse(f.read())
+            except SyntaxError:
+                # Fixtures like buggy_code.py are meant not to parse.
+                continue
+        imports = [ast.unparse(n) for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+        body = ast.Module(body=[n for n in tree.body if not isinstance(n, (ast.Import, ast.ImportFrom))], type_ignores=[])
+        seeds.append((imports, ast.unparse(body), _top_level_names(tree)))
+    if not seeds:
+        raise ValueError(f"no parseable seed files in {seed_dir}")
+    return seeds
+
+
+def synthesize(loc: int, seed_dir: str = SEED_DIR) -> str:
+    """
+    A module of about `loc` lines: the seed files' imports once, then their
+    bodies repeated round-robin with module-level names suffixed per copy.
+    The same arguments always give the same text.
+    """
+    seeds = load_seeds(seed_dir)
+    imports = list(dict.fromkeys(line for seed_imports, _, _ in seeds for line in seed_imports))
+    chunks = ['"""Synthetic benchmark module."""', *imports]
+    lines = len(chunks)
+
+    copy = 0
+    while lines < loc:
+        _, body, names = seeds[copy % len(seeds)]
+        tree = _Renamer(names, f"_{copy}").visit(ast.parse(body))
+        chunk = "\n\n" + ast.unparse(tree)
+        chunks.append(chunk)
+        lines += chunk.count("\n") + 1
+        copy += 1
+
+    return "\n".join(chunks) + "\n"
+
+
+def write_corpus(directory: str, sizes: Iterable[int] = SIZES, seed_dir: str = SEED_DIR) -> Dict[int, str]:
+    """Writes one `synthetic_<loc>.py` per size into `directory`; returns their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for size in sizes:
+        path = os.path.join(directory, f"synthetic_{size}.py")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(synthesize(size, seed_dir))
+        paths[size] = path
+    return paths
@@ -0,0 +1,218 @@
+"""
+Offline stand-ins for `Gemini`, so benchmarks measure the pipeline and
+not the network.
+
+`ReplayGemini` answers from a recordings file: for every agent, a list of
+turns (`text` or `function_call`, optional `latency` and `usage`), picked by
+how many tool results the conversation already holds. `RecordingGemini`
+wraps a real model and writes that file. Recorded text and arguments are
+templates: `{path}` is the file under review and `{code}` the last fenced
+code block of the prompt, so one recording replays against any corpus.
+Multi-file prompts ('### FILE: <path>' sections) get one templated answer
+per file.
+"""
+import asyncio
+import json
+import re
+import time
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from pydantic import Field
+
+from agents.batch_retry_loop import FILE_HEADER, split_reply
+from services.context_builder import estimate_tokens
+
+RECORDINGS = "benchmarks/recordings/default.json"
+
+_PATH_RE = re.compile(r"""([^\s'"`:]*\.py)\b""")
+_CODE_BLOCK = re.compile(r"```(?:python|py)?[ \t]*\n(.*?)```", re.DOTALL)
+
+
+def _texts(content: types.Content) -> List[str]:
+    return [p.text for p in content.parts or [] if getattr(p, "text", None)]
+
+
+def request_text(llm_request: LlmRequest) -> str:
+    """The user-side text of the conversation so far."""
+    return "\n".join(t for c in llm_request.contents if c.role == "user" for t in _texts(c))
+
+
+def request_turn(llm_request: LlmRequest) -> int:
+    """Tool results already in the conversation, i.e. which recorded turn is next."""
+    return sum(
+        1
+        for c in llm_request.contents
+        for p in c.parts or []
+        if getattr(p, "function_response", None) is not None
+    )
+
+
+def _variables(text: str) -> Dict[str, str]:
+    paths = _PATH_RE.findall(text)
+    blocks = _CODE_BLOCK.findall(text)
+    return {"{path}": paths[0] if paths else "", "{code}": blocks[-1] if blocks else ""}
+
+
+def _fill(value: Any, variables: Dict[str, str]) -> Any:
+    if isinstance(value, str):
+        for name, replacement in variables.items():
+            value = value.replace(name, replacement)
+        return value
+    if isinstance(value, dict):
+        return {k: _fill(v, variables) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fill(v, variables) for v in value]
+    return value
+
+
+def _template(value: Any, variables: Dict[str, str]) -> Any:
+    """Inverse of `_fill`, for recording: concrete path/code back to placeholders."""
+    if isinstance(value, str):
+        for name, concrete in variables.items():
+            if concrete:
+                value = value.replace(concrete, name)
+        return value
+    if isinstance(value, dict):
+        return {k: _template(v, variables) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_template(v, variables) for v in value]
+    return value
+
+
+def load_recordings(path: str = RECORDINGS) -> Dict[str, List[dict]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class ReplayGemini(BaseLlm):
+    """Replays one agent's recorded turns; `latency` overrides recorded latencies."""
+
+    agent_name: str
+    turns: List[dict] = Field(default_factory=list)
+    latency: Optional[float] = None
+
+    def _reply(self, turn: dict, prompt: str) -> types.Part:
+        if "function_call" in turn:
+            call = _fill(turn["function_call"], _variables(prompt))
+            return types.Part(function_call=types.FunctionCall(name=call["name"], args=call.get("args", {})))
+
+        sections = split_reply(prompt)
+        if not sections:
+            return types.Part(text=_fill(turn.get("text", ""), _variables(prompt)))
+        answers = [
+            f"{FILE_HEADER.format(path)}\n{_fill(turn.get('text', ''), {**_variables(body), '{path}': path})}"
+            for path, body in sections.items()
+        ]
+        return types.Part(text="\n\n".join(answers))
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if not self.turns:
+            raise ValueError(f"no recorded turns for {self.agent_name}")
+        turn = self.turns[min(request_turn(llm_request), len(self.turns) - 1)]
+        prompt = request_text(llm_request)
+        part = self._reply(turn, prompt)
+
+        delay = self.latency if self.latency is not None else turn.get("latency", 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+
+        output = part.text or json.dumps(turn.get("function_call", {}))
+        # A copy: the recorded turn is replayed again for later requests.
+        usage = dict(turn.get("usage") or {
+            "prompt_token_count": estimate_tokens(prompt),
+            "candidates_token_count": estimate_tokens(output),
+        })
+        usage.setdefault("total_token_count", usage.get("prompt_token_count", 0) + usage.get("candidates_token_count", 0))
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[part]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(**usage),
+        )
+
+
+class RecordingGemini(BaseLlm):
+    """Passes calls to `inner` and appends each final reply, templated, to `recordings`."""
+
+    agent_name: str
+    inner: BaseLlm
+    recordings: Dict[str, List[dict]]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        turn_index = request_turn(llm_request)
+        variables = _variables(request_text(llm_request))
+        started = time.perf_counter()
+        final = None
+        async for response in self.inner.generate_content_async(llm_request, stream):
+            if not response.partial:
+                final = response
+            yield response
+        if final is None or final.content is None:
+            return
+
+        turn: Dict[str, Any] = {"latency": round(time.perf_counter() - started, 3)}
+        for part in final.content.parts or []:
+            if part.function_call is not None:
+                turn["function_call"] = _template(
+                    {"name": part.function_call.name, "args": part.function_call.args or {}}, variables
+                )
+                break
+            if part.text:
+                turn["text"] = turn.get("text", "") + _template(part.text, variables)
+        if final.usage_metadata is not None:
+            turn["usage"] = final.usage_metadata.model_dump(exclude_none=True, include={
+                "prompt_token_count", "candidates_token_count", "total_token_count",
+            })
+
+        turns = self.recordings.setdefault(self.agent_name, [])
+        if turn_index >= len(turns):
+            turns.append(turn)
+
+
+def _agents(*roots) -> List[Any]:
+    seen, found = set(), []
+
+    def walk(agent):
+        if id(agent) in seen:
+            return
+        seen.add(id(agent))
+        found.append(agent)
+        for sub in getattr(agent, "sub_agents", None) or []:
+            walk(sub)
+        for tool in getattr(agent, "tools", None) or []:
+            if getattr(tool, "agent", None) is not None:
+                walk(tool.agent)
+
+    for root in roots:
+        walk(root)
+    return found
+
+
+def install_replay(recordings: Dict[str, List[dict]], *roots, latency: Optional[float] = None) -> None:
+    """Swaps the model of every LLM agent under `roots` for a ReplayGemini."""
+    for agent in _agents(*roots):
+        model = getattr(agent, "model", None)
+        if model is None or isinstance(model, ReplayGemini) or "model" not in type(agent).model_fields:
+            continue
+        name = model if isinstance(model, str) else model.model
+        agent.model = ReplayGemini(
+            model=name or "replay", agent_name=agent.name, turns=recordings.get(agent.name, []), latency=latency,
+        )
+
+
+def install_recording(recordings: Dict[str, List[dict]], *roots) -> None:
+    """Wraps the model of every LLM agent under `roots` in a RecordingGemini."""
+    from google.adk.models.google_llm import Gemini
+
+    for agent in _agents(*roots):
+        model = getattr(agent, "model", None)
+        if model is None or isinstance(model, RecordingGemini) or "model" not in type(agent).model_fields:
+            continue
+        inner = Gemini(model=model) if isinstance(model, str) else model
+        agent.model = RecordingGemini(model=inner.model, agent_name=agent.name, inner=inner, recordings=recordings)
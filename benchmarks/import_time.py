@@ -0,0 +1,104 @@
+"""
+Import-time budget for the entry points.
+
+    python -m benchmarks.import_time [--budget app=2.0] [--repeat 3] [--output imports.json]
+
+Each module is imported in a fresh interpreter with `-X importtime`, the
+fastest of --repeat runs counts. A module fails the check when it takes
+longer than its budget (seconds) or loads a package it must not load: the
+static entry points never import google.adk, and the API loads the agents
+only after it has started. The exit code is 1 if any module fails.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# module -> budget in seconds
+BUDGETS = {
+    "services.static_review": 0.5,
+    "static_main": 1.0,
+    "main": 1.0,
+    "app": 3.0,
+}
+FORBIDDEN = ("google.adk", "google.genai")
+
+
+def measure(module: str) -> Tuple[float, List[str], List[Tuple[str, float]]]:
+    """Seconds to import `module`, the modules it loaded, and its slowest direct imports."""
+    code = f"import sys, {module}; print('\\n'.join(sys.modules))"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+        env={**os.environ, "PYTHONPATH": ROOT, "PYTHONWARNINGS": "ignore"},
+    )
+
+    # Lines come innermost first; a module's direct imports (one level deeper)
+    # are listed right before it.
+    total, children, pending = 0.0, [], []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        seconds = int(cumulative) / 1e6
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            pending.append((name.strip(), seconds))
+        elif depth == 0:
+            if name.strip() == module:
+                total, children = seconds, pending
+            pending = []
+    children.sort(key=lambda item: -item[1])
+    return total, proc.stdout.split(), children[:5]
+
+
+def check(budgets: Dict[str, float], repeat: int) -> Dict:
+    results = {}
+    for module, budget in budgets.items():
+        runs = [measure(module) for _ in range(repeat)]
+        seconds, modules, slowest = min(runs, key=lambda run: run[0])
+        forbidden = sorted(m for m in modules if m.startswith(FORBIDDEN))
+        results[module] = {
+            "seconds": round(seconds, 3),
+            "budget": budget,
+            "slowest_imports": [[name, round(s, 3)] for name, s in slowest],
+            "forbidden": forbidden[:10],
+            "ok": seconds <= budget and not forbidden,
+        }
+    return results
+
+
+def parse_budget(value: str) -> Tuple[str, float]:
+    module, _, seconds = value.partition("=")
+    return module, float(seconds)
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(description="Check the import time of the entry points against a budget")
+    parser.add_argument("--budget", action="append", type=parse_budget, default=[], metavar="MODULE=SECONDS",
+                        help="Override or add a module's budget")
+    parser.add_argument("--repeat", type=int, default=3, help="Imports per module; the fastest counts")
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args(argv)
+
+    budgets = {**BUDGETS, **dict(args.budget)}
+    results = check(budgets, args.repeat)
+    for module, result in results.items():
+        status = "ok" if result["ok"] else "FAIL"
+        print(f"{status:4} {module:28} {result['seconds']:.3f}s / {result['budget']:.1f}s")
+        if result["forbidden"]:
+            print(f"     imports {', '.join(result['forbidden'])}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0 if all(r["ok"] for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,332 @@
+"""
+Review pipeline benchmarks, without network calls.
+
+    python -m benchmarks.run [--sizes 1000,10000,100000] [--modes static,pipeline,agent]
+                             [--output bench.json] [--baseline previous.json]
+
+1. analyzers  - flake8, pylint, the AST parse and the AST rules (total and
+                per rule) on synthetic files of each size
+2. latency    - POST /review per mode, one request at a time, over the seed
+                fixtures and the smallest synthetic file
+3. throughput - POST /review with N requests in flight, for each --concurrency
+
+Models are replaced by ReplayGemini (benchmarks/fake_gemini.py). The review
+cache and history database live in a temporary directory, and every request
+gets unique bytes, so nothing is served from cache. Results go to --output
+as JSON. With --baseline, p50 latencies and throughputs that got worse by
+more than --tolerance are listed under "regressions" and the exit code is 1.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix="review-bench-")
+# Read by the cache and history modules at import, so set before importing them.
+os.environ["REVIEW_CACHE_DIR"] = os.path.join(WORKDIR, "cache")
+os.environ["MEMORY_DB"] = os.path.join(WORKDIR, "history.db")
+# Replayed models replace the cached ones; keep stray entries out of memory/.
+os.environ["MODEL_CACHE_DIR"] = os.path.join(WORKDIR, "model_cache")
+
+from benchmarks.corpus import SEED_DIR, SIZES, write_corpus  # noqa: E402
+from benchmarks.fake_gemini import RECORDINGS, install_replay, load_recordings  # noqa: E402
+from services.ast_analysis import ANALYZER_VERSION  # noqa: E402
+from services.correctness_review import correctness_review  # noqa: E402
+from services.metrics import RULE_SECONDS  # noqa: E402
+from services.performance_review import performance_review  # noqa: E402
+from services.security_review import security_review  # noqa: E402
+from services.source_file import SourceFile  # noqa: E402
+from services.static_review import tool_versions  # noqa: E402
+from services.style_review import style_review  # noqa: E402
+
+MODES = ("static", "pipeline", "agent")
+CONCURRENCY = (1, 4, 16)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the review pipeline with replayed model responses")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="Synthetic file sizes in lines")
+    parser.add_argument("--modes", default=",".join(MODES), help="Review modes for the latency runs")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per analyzer per file, and per latency file")
+    parser.add_argument("--concurrency", default=",".join(map(str, CONCURRENCY)), help="In-flight request counts for the throughput runs")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per throughput run")
+    parser.add_argument("--throughput-mode", default="static", choices=MODES)
+    parser.add_argument("--recordings", default=RECORDINGS, help="Recorded model turns to replay")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="Seconds each replayed model call takes")
+    parser.add_argument("--recorded-latency", action="store_true", help="Replay the recorded latencies instead of --model-latency")
+    parser.add_argument("--seed-dir", default=SEED_DIR, help="Python files the synthetic corpus is built from")
+    parser.add_argument("--skip", default="", help="Comma-separated parts to skip: analyzers, latency, throughput")
+    parser.add_argument("--output", default="bench-results.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown before a result counts as a regression")
+    return parser.parse_args(argv)
+
+
+def _ints(value: str):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def summarize(samples) -> dict:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"n": 0}
+    return {
+        "n": len(ordered),
+        "min": round(ordered[0], 6),
+        "p50": round(statistics.median(ordered), 6),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 6),
+        "mean": round(statistics.fmean(ordered), 6),
+        "max": round(ordered[-1], 6),
+    }
+
+
+def _timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def metadata(args) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "analyzer_version": ANALYZER_VERSION,
+        "tools": tool_versions(),
+        "args": vars(args),
+    }
+
+
+# --------------------------------------------------
+# ANALYZERS
+# --------------------------------------------------
+
+def bench_analyzers(paths: dict, repeat: int) -> dict:
+    # Warm the linter workers so the first size does not pay their startup.
+    warmup = paths[min(paths)]
+    style_review(warmup)
+    correctness_review(warmup)
+
+    results = {}
+    for size, path in sorted(paths.items()):
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().count("\n")
+
+        flake8 = [_timed(style_review, path) for _ in range(repeat)]
+        pylint = [_timed(correctness_review, path) for _ in range(repeat)]
+
+        parse, rules = [], []
+        before = RULE_SECONDS.totals()
+        for _ in range(repeat):
+            # A fresh SourceFile each run, so neither the parse nor the scan is reused.
+            src = SourceFile.from_path(path)
+            parse.append(_timed(lambda: src.tree))
+            rules.append(_timed(lambda: (security_review(src), performance_review(src))))
+        after = RULE_SECONDS.totals()
+
+        per_rule = {}
+        for (category, rule), (total, count) in after.items():
+            spent = total - before.get((category, rule), (0.0, 0))[0]
+            per_rule[f"{category}/{rule}"] = round(spent / repeat, 6)
+
+        results[str(size)] = {
+            "file": path,
+            "lines": lines,
+            "analyzers": {
+                "flake8": summarize(flake8),
+                "pylint": summarize(pylint),
+                "ast_parse": summarize(parse),
+                "ast_rules": summarize(rules),
+            },
+            "rules": dict(sorted(per_rule.items(), key=lambda kv: -kv[1])),
+        }
+        print(f"analyzers {size:>7} lines: " + ", ".join(
+            f"{name} {stats['p50']:.3f}s" for name, stats in results[str(size)]["analyzers"].items()
+        ), file=sys.stderr)
+    return results
+
+
+# --------------------------------------------------
+# API
+# --------------------------------------------------
+
+class _Uploads:
+    """Unique bytes per request (a trailing comment), so the review cache never hits."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, path: str):
+        self.count += 1
+        with open(path, "rb") as f:
+            data = f.read()
+        return os.path.basename(path), data + f"\n# bench request {self.count}\n".encode("utf-8")
+
+
+async def _review(client, upload, path: str, mode: str) -> tuple:
+    name, data = upload(path)
+    start = time.perf_counter()
+    response = await client.post(f"/review?mode={mode}&timings=true", files={"file": (name, data)})
+    elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    return elapsed, response.json().get("timings", {})
+
+
+async def bench_latency(client, upload, files: list, modes: list, repeat: int) -> dict:
+    results = {}
+    for mode in modes:
+        samples, stages = [], {}
+        try:
+            for path in files:
+                for _ in range(repeat):
+                    elapsed, timings = await _review(client, upload, path, mode)
+                    samples.append(elapsed)
+                    for stage, entry in timings.items():
+                        stages.setdefault(stage, []).append(entry["seconds"])
+        except Exception as e:
+            # One broken mode (e.g. an ADK version without run_debug) should not lose the rest.
+            results[mode] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"latency {mode:>8}: failed ({e})", file=sys.stderr)
+            continue
+        results[mode] = {
+            "latency": summarize(samples),
+            # Mean seconds per request spent in each stage, largest first.
+            "stages": dict(sorted(
+                ((stage, round(sum(values) / len(samples), 6)) for stage, values in stages.items()),
+                key=lambda kv: -kv[1],
+            )),
+        }
+        print(f"latency {mode:>8}: p50 {results[mode]['latency']['p50']:.3f}s", file=sys.stderr)
+    return results
+
+
+async def bench_throughput(client, upload, files: list, mode: str, requests: int, levels: list) -> dict:
+    results = {}
+    for level in levels:
+        slots = asyncio.Semaphore(level)
+
+        async def one(i):
+            async with slots:
+                return (await _review(client, upload, files[i % len(files)], mode))[0]
+
+        start = time.perf_counter()
+        samples = await asyncio.gather(*(one(i) for i in range(requests)))
+        wall = time.perf_counter() - start
+        results[str(level)] = {
+            "requests": requests,
+            "seconds": round(wall, 6),
+            "rps": round(requests / wall, 3),
+            "latency": summarize(samples),
+        }
+        print(f"throughput {mode} x{level:<3}: {results[str(level)]['rps']:.2f} req/s", file=sys.stderr)
+    return results
+
+
+async def bench_api(args, files: list) -> dict:
+    import httpx
+
+    import app
+    from agents import coordinator_agent
+    from agents.evaluator_agent import evaluator_agent
+    from agents.patch_generator_agent import patch_generator_agent
+
+    latency = None if args.recorded_latency else args.model_latency
+    install_replay(load_recordings(args.recordings), coordinator_agent, evaluator_agent, patch_generator_agent, latency=latency)
+
+    skip = set(args.skip.split(","))
+    upload = _Uploads()
+    results = {}
+    transport = httpx.ASGITransport(app=app.app)
+    async with app.lifespan(app.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            if "latency" not in skip:
+                modes = [m for m in args.modes.split(",") if m]
+                results["latency"] = await bench_latency(client, upload, files, modes, args.repeat)
+            if "throughput" not in skip:
+                results["throughput"] = await bench_throughput(
+                    client, upload, files, args.throughput_mode, args.requests, _ints(args.concurrency)
+                )
+    return results
+
+
+# --------------------------------------------------
+# REGRESSIONS
+# --------------------------------------------------
+
+def flatten(results: dict) -> dict:
+    """{metric path: (value, higher_is_better)} for the numbers worth comparing."""
+    metrics = {}
+    for size, entry in (results.get("analyzers") or {}).items():
+        for name, stats in entry["analyzers"].items():
+            metrics[f"analyzers.{size}.{name}.p50"] = (stats.get("p50"), False)
+    for mode, entry in (results.get("latency") or {}).items():
+        if "latency" in entry:
+            metrics[f"latency.{mode}.p50"] = (entry["latency"].get("p50"), False)
+    for level, entry in (results.get("throughput") or {}).items():
+        metrics[f"throughput.{level}.rps"] = (entry["rps"], True)
+    return {k: v for k, v in metrics.items() if v[0] is not None}
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list:
+    old, new = flatten(baseline), flatten(current)
+    regressions = []
+    for key, (value, higher_is_better) in sorted(new.items()):
+        if key not in old or not old[key][0]:
+            continue
+        before = old[key][0]
+        change = (before - value) / before if higher_is_better else (value - before) / before
+        if change > tolerance:
+            regressions.append({"metric": key, "baseline": before, "current": value, "change": round(change, 4)})
+    return regressions
+
+
+def main(argv) -> int:
+    args = parse_args(argv)
+    skip = set(args.skip.split(","))
+    try:
+        corpus = write_corpus(os.path.join(WORKDIR, "corpus"), _ints(args.sizes), args.seed_dir)
+        results = {"meta": metadata(args)}
+        if "analyzers" not in skip:
+            results["analyzers"] = bench_analyzers(corpus, args.repeat)
+        if not {"latency", "throughput"} <= skip:
+            files = sorted(glob.glob(os.path.join(args.seed_dir, "*.py")))
+            if corpus:
+                files.append(corpus[min(corpus)])
+            results.update(asyncio.run(bench_api(args, files)))
+
+        if args.baseline:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                results["regressions"] = compare(json.load(f), results, args.tolerance)
+
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.output}", file=sys.stderr)
+
+        for regression in results.get("regressions", []):
+            print(f"REGRESSION {regression['metric']}: {regression['baseline']} -> {regression['current']}", file=sys.stderr)
+        return 1 if results.get("regressions") else 0
+    finally:
+        from tools.linter_pool import shutdown
+
+        shutdown()
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,15 +1,85 @@
 import sys
+import json
 import asyncio
-from google.adk.runners import InMemoryRunner
-from agents.review_coordinator_agent import coordinator_agent 
+import argparse
+
+# Only the static reviewers are imported up front; the agents (and
+# google.adk with them) load when a mode that needs them runs.
+from static_main import add_static_arguments, run_batch, run_static
+from services.batch_review import collect_paths
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="AI code reviewer")
+    add_static_arguments(parser)
+    parser.add_argument("--static", action="store_true", help="Run only the deterministic reviewers, no model calls")
+    parser.add_argument("--pipeline", action="store_true", help="Run the review/score/patch loop in code; models only write instructions and patches (with --batch: the retry loop over many files)")
+    parser.add_argument("--max-iterations", type=int, default=None, help="Patch cycles allowed by the retry loop (default: RETRY_MAX_ITERATIONS or 3)")
+    args = parser.parse_args(argv)
+    # The retry loop reviews and patches whole files.
+    if args.pipeline and (args.index or args.incremental):
+        parser.error("--pipeline cannot be combined with --index or --incremental")
+    return args
+
+
+def retry_budget(args):
+    from agents.retry_loop import RetryBudget
+
+    if args.max_iterations is None:
+        return RetryBudget()
+    return RetryBudget(max_iterations=args.max_iterations)
+
+
+async def run_batch_pipeline(args):
+    from agents.batch_retry_loop import BatchRetryLoop
+
+    diff = None
+    if args.diff:
+        with open(args.diff, "r", encoding="utf-8") as f:
+            diff = f.read()
+
+    paths = collect_paths(paths=args.paths, diff=diff, root=args.root)
+    batch = BatchRetryLoop(paths, retry_budget(args))
+    async for result in batch.iter_results():
+        print(json.dumps(result), flush=True)
+    print(json.dumps({"summary": batch.summary()}))
 
 
 async def main():
-    if len(sys.argv) != 2:
-        print("Usage: python main.py <path_to_file>")
+    args = parse_args(sys.argv[1:])
+
+    if (args.batch or args.diff) and args.pipeline:
+        await run_batch_pipeline(args)
         return
 
-    path = sys.argv[1]
+    if args.batch or args.diff:
+        run_batch(args)
+        return
+
+    if len(args.paths) != 1:
+        print("Usage: python main.py [--static | --pipeline] <path_to_file>")
+        print("       python main.py --batch <files or directories...> [--index --root <dir>] | --diff <patch> [--root <dir>] [--incremental]")
+        print("       python main.py --batch --pipeline <files or directories...> | --pipeline --diff <patch> [--root <dir>]")
+        return
+
+    path = args.paths[0]
+
+    if args.static:
+        # Deterministic reviewers only: no model calls
+        run_static(path)
+        return
+
+    if args.pipeline:
+        from agents.retry_loop import format_loop_result, run_retry_loop
+
+        result = await run_retry_loop(path, retry_budget(args))
+        print(format_loop_result(result))
+        return
+
+    from google.adk.runners import InMemoryRunner
+    from agents import coordinator_agent
+    from agents.retry_loop import format_loop_result, run_retry_loop
+
     prompt = f"Please review the Python file at: {path}"
 
     runner = InMemoryRunner(agent=coordinator_agent)
@@ -35,6 +105,10 @@ async def main():
             print("NO CONTENT")
         print("---------------------------------")
 
+    # Evaluation and patching run in code, not as model orchestration turns.
+    print("\n\n====== RETRY LOOP ======\n")
+    print(format_loop_result(await run_retry_loop(path, retry_budget(args))))
+
 
 if __name__ == "__main__":
     asyncio.run(main())
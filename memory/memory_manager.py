@@ -1,26 +1,281 @@
+import hashlib
 import json
 import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
 
-MEMORY_DIR = "memory/code_history.json"
+from services.metrics import timed
+from services.scoring import SECTIONS, rule_code
+from services.state import UPLOAD_PREFIX
 
-os.makedirs(MEMORY_DIR, exist_ok=True)
+MEMORY_DB = os.getenv("MEMORY_DB", "memory/review_history.db")
+DEFAULT_LIMIT = int(os.getenv("MEMORY_HISTORY_LIMIT", "20"))
 
-def load_past_reviews(file: str):
-    path = os.path.join(MEMORY_DIR, f"{os.path.basename(file)}.json")
-    if not os.path.exists(path):
-        return []
-    with open(path, "r") as f:
-        return json.load(f)
+# Per-file JSON history written by earlier versions; imported once.
+LEGACY_MEMORY_DIR = "memory/code_history.json"
 
-def save_review(file: str, review: dict):
-    path = os.path.join(MEMORY_DIR, f"{os.path.basename(file)}.json")
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    content_hash TEXT,
+    created_at REAL NOT NULL,
+    review TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reviews_path_time ON reviews (path, created_at);
+CREATE INDEX IF NOT EXISTS reviews_hash_time ON reviews (content_hash, created_at);
+CREATE INDEX IF NOT EXISTS reviews_time ON reviews (created_at);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS file_trends (
+    path TEXT PRIMARY KEY,
+    runs INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    trend TEXT NOT NULL
+);
+"""
 
-    history = []
-    if os.path.exists(path):
-        with open(path, "r") as f:
-            history = json.load(f)
+SCORE_FIELDS = ("overall_score", "style_score", "correctness_score", "security_score", "performance_score")
+# Bounds on the per-file aggregate so it stays O(1) to update and to send.
+TREND_POINTS = int(os.getenv("MEMORY_TREND_POINTS", "20"))
+TREND_RULES = 50
 
-    history.append(review)
+LEGACY_PREFIX = "legacy:"
 
-    with open(path, "w") as f:
-        json.dump(history, f, indent=2)
+_local = threading.local()
+
+
+def _connect() -> sqlite3.Connection:
+    """One connection per thread; WAL lets readers run alongside a writer."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "db", None) == MEMORY_DB:
+        return conn
+
+    directory = os.path.dirname(MEMORY_DB)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(MEMORY_DB, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    if os.path.isdir(LEGACY_MEMORY_DIR) and not _legacy_imported(conn):
+        _import_legacy(conn)
+
+    _local.conn, _local.db = conn, MEMORY_DB
+    return conn
+
+
+def _legacy_imported(conn: sqlite3.Connection) -> bool:
+    row = conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone()
+    return row is not None
+
+
+def _import_legacy(conn: sqlite3.Connection) -> None:
+    rows = []
+    for name in sorted(os.listdir(LEGACY_MEMORY_DIR)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(LEGACY_MEMORY_DIR, name), "r") as f:
+                history = json.load(f)
+        except (OSError, ValueError):
+            continue
+        # Legacy entries were keyed by basename only and had no timestamps.
+        for offset, review in enumerate(history):
+            rows.append((LEGACY_PREFIX + name[: -len(".json")], None, offset, json.dumps(review)))
+
+    # IMMEDIATE takes the write lock up front, so concurrent workers cannot
+    # both import.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if not _legacy_imported(conn):
+            conn.executemany(
+                "INSERT INTO reviews (path, content_hash, created_at, review) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported', ?)", (str(time.time()),))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _key(file: str) -> str:
+    # Upload keys are not paths on this host.
+    if file.startswith(UPLOAD_PREFIX):
+        return file
+    return os.path.abspath(file)
+
+
+def _file_hash(file: str) -> Optional[str]:
+    try:
+        with open(file, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _rows(query: str, params: tuple) -> List[dict]:
+    with timed("memory:load_reviews"):
+        rows = _connect().execute(query, params).fetchall()
+    # Newest rows are selected first; history is returned oldest-first.
+    return [json.loads(review) for (review,) in reversed(rows)]
+
+
+def load_past_reviews(file: str, limit: int = DEFAULT_LIMIT, since: Optional[float] = None):
+    """
+    The `limit` most recent reviews of `file` (by full path), oldest first.
+    History imported from the old per-basename JSON files is included too.
+    """
+    return _rows(
+        "SELECT review FROM reviews WHERE path IN (?, ?) AND created_at >= ? "
+        "ORDER BY created_at DESC, id DESC LIMIT ?",
+        (_key(file), LEGACY_PREFIX + os.path.basename(file), since or 0, limit),
+    )
+
+
+def load_reviews_by_hash(content_hash: str, limit: int = DEFAULT_LIMIT):
+    """Reviews of any file whose content had this SHA-256, oldest first."""
+    return _rows(
+        "SELECT review FROM reviews WHERE content_hash = ? "
+        "ORDER BY created_at DESC, id DESC LIMIT ?",
+        (content_hash, limit),
+    )
+
+
+def load_recent_reviews(since: float, limit: int = DEFAULT_LIMIT):
+    """Reviews of any file saved at or after `since` (epoch seconds), oldest first."""
+    return _rows(
+        "SELECT review FROM reviews WHERE created_at >= ? "
+        "ORDER BY created_at DESC, id DESC LIMIT ?",
+        (since, limit),
+    )
+
+
+def _update_trend(trend: dict, review: dict, now: float) -> dict:
+    """Fold one review into the running per-file aggregate."""
+    scores = {f: review[f] for f in SCORE_FIELDS if isinstance(review.get(f), (int, float))}
+    if scores:
+        trend["scores"] = (trend.get("scores", []) + [{"at": now, **scores}])[-TREND_POINTS:]
+
+    report = review.get("report") or {}
+    counts = {}
+    seen_codes = set()
+    for section in SECTIONS:
+        section_report = report.get(section)
+        if not isinstance(section_report, dict):
+            continue
+        issues = section_report.get("issues") or []
+        counts[section] = section_report.get("issue_count", len(issues))
+        for issue in issues:
+            code = rule_code(section, issue)
+            if code:
+                seen_codes.add(f"{section}:{code}")
+
+    if counts:
+        trend["previous_counts"] = trend.get("last_counts")
+        trend["last_counts"] = counts
+        totals = trend.setdefault("total_counts", {})
+        for section, count in counts.items():
+            totals[section] = totals.get(section, 0) + count
+
+    # How many runs each rule showed up in, i.e. how persistent it is.
+    rule_runs = trend.setdefault("rule_runs", {})
+    for code in seen_codes:
+        rule_runs[code] = rule_runs.get(code, 0) + 1
+    if len(rule_runs) > TREND_RULES:
+        top = sorted(rule_runs.items(), key=lambda kv: -kv[1])[:TREND_RULES]
+        trend["rule_runs"] = dict(top)
+
+    return trend
+
+
+def save_review(file: str, review: dict, content_hash: Optional[str] = None):
+    """
+    Append one review and fold it into the file's trend aggregate.
+    Both writes are O(1) in the history size and share one transaction.
+    """
+    with timed("memory:save_review"):
+        conn = _connect()
+        key, now = _key(file), time.time()
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO reviews (path, content_hash, created_at, review) VALUES (?, ?, ?, ?)",
+                (key, content_hash or _file_hash(file), now, json.dumps(review)),
+            )
+            row = conn.execute("SELECT runs, trend FROM file_trends WHERE path = ?", (key,)).fetchone()
+            runs, trend = (row[0], json.loads(row[1])) if row else (0, {})
+            conn.execute(
+                "INSERT OR REPLACE INTO file_trends (path, runs, updated_at, trend) VALUES (?, ?, ?, ?)",
+                (key, runs + 1, now, json.dumps(_update_trend(trend, review, now))),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def load_trend(file: str) -> Optional[dict]:
+    """The stored aggregate for `file`: run count, score series, issue counts, recurring rules."""
+    with timed("memory:load_trend"):
+        row = _connect().execute(
+            "SELECT runs, updated_at, trend FROM file_trends WHERE path = ?", (_key(file),)
+        ).fetchone()
+    if row is None:
+        return None
+    return {"runs": row[0], "updated_at": row[1], **json.loads(row[2])}
+
+
+def _direction(delta: float) -> str:
+    if delta > 0.25:
+        return "improving"
+    if delta < -0.25:
+        return "regressing"
+    return "flat"
+
+
+def trend_digest(file: str, top_rules: int = 5) -> str:
+    """
+    Short, precomputed summary of a file's history for the evaluator prompt.
+    Built from the aggregate only, never from the raw review rows.
+    """
+    return format_trend(load_trend(file), top_rules)
+
+
+def format_trend(trend: Optional[dict], top_rules: int = 5) -> str:
+    """`trend_digest` for an aggregate already loaded (from any history store)."""
+    if not trend:
+        return "No previous reviews of this file."
+
+    parts = [f"{trend['runs']} previous review(s)."]
+
+    scores = [p["overall_score"] for p in trend.get("scores", []) if "overall_score" in p]
+    if scores:
+        recent = scores[-5:]
+        series = " -> ".join(f"{s:g}" for s in recent)
+        delta = recent[-1] - recent[0]
+        parts.append(f"Overall score (last {len(recent)}): {series} ({_direction(delta)}, {delta:+.2f}).")
+
+    last, previous = trend.get("last_counts"), trend.get("previous_counts")
+    if last:
+        counts = []
+        for section in SECTIONS:
+            if section not in last:
+                continue
+            change = ""
+            if previous and section in previous:
+                change = f" ({last[section] - previous[section]:+d})"
+            counts.append(f"{section} {last[section]}{change}")
+        parts.append("Issues last run: " + ", ".join(counts) + ".")
+
+    rule_runs = trend.get("rule_runs") or {}
+    recurring = [(code, n) for code, n in sorted(rule_runs.items(), key=lambda kv: -kv[1]) if n > 1]
+    if recurring:
+        listed = ", ".join(f"{code} ({n} runs)" for code, n in recurring[:top_rules])
+        parts.append(f"Recurring: {listed}.")
+
+    return " ".join(parts)
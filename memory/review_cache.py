@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: eviction is only serialized within a process
+    fcntl = None
+
+from services.metrics import cache_lookup, timed
+
+CACHE_DIR = os.getenv("REVIEW_CACHE_DIR", "memory/review_cache")
+MAX_ENTRIES = int(os.getenv("REVIEW_CACHE_MAX_ENTRIES", "1000"))
+MAX_BYTES = int(os.getenv("REVIEW_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+def content_key(content: bytes, fingerprint: str) -> str:
+    """SHA-256 of the content, salted with the pipeline fingerprint."""
+    digest = hashlib.sha256(content).hexdigest()
+    return hashlib.sha256(f"{fingerprint}:{digest}".encode("utf-8")).hexdigest()
+
+
+class ReviewCache:
+    """
+    Content-addressed JSON cache on local disk.
+
+    One file per key. Reads bump the file's mtime, so eviction drops the
+    least recently used entries once either the entry count or the total
+    size goes over its limit. With a `ttl` (seconds), entries expire that
+    long after they were written instead, and reads leave mtime alone, so
+    eviction drops the oldest entries first. `name` labels the cache's
+    metrics. Writes are atomic renames and eviction takes a file lock, so
+    several worker processes can share one directory.
+    """
+
+    def __init__(
+        self,
+        directory: str = CACHE_DIR,
+        max_entries: int = MAX_ENTRIES,
+        max_bytes: int = MAX_BYTES,
+        ttl: Optional[float] = None,
+        name: str = "review",
+    ):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.name = name
+        # The review cache's stages ("cache:get") predate the others.
+        self._stage = "cache" if name == "review" else f"{name}_cache"
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            with timed(f"{self._stage}:get"):
+                if self.ttl is not None and time.time() - os.stat(path).st_mtime > self.ttl:
+                    os.remove(path)
+                    raise FileNotFoundError(path)
+                with open(path, "r", encoding="utf-8") as f:
+                    value = json.load(f)
+            if self.ttl is None:
+                os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            cache_lookup(self.name, False)
+            return None
+
+        with self._lock:
+            self.hits += 1
+        cache_lookup(self.name, True)
+        return value
+
+    def put(self, key: str, value: dict) -> None:
+        with timed(f"{self._stage}:put"):
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(value, f)
+                os.replace(tmp_path, self._path(key))
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self._evict()
+
+    def _entries(self) -> list:
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, name))
+        return entries
+
+    @contextmanager
+    def _evicting(self) -> Iterator[bool]:
+        """True if this process may evict now; another worker already evicting means skip."""
+        if fcntl is None:
+            yield True
+            return
+        with open(os.path.join(self.directory, ".evict.lock"), "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _evict(self) -> None:
+        with self._lock, self._evicting() as allowed:
+            if not allowed:
+                return
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+                _, size, name = entries.pop(0)
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
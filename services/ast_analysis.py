@@ -0,0 +1,270 @@
+import ast
+import os
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from services.ast_rules import BLOCK_NODES, COMPREHENSION_NODES, LOOP_NODES, RULES, Context, Rule
+from services.metrics import RULE_TIMING, observe_rules
+from services.rule_packs import PackMatcher, default_matcher
+from services.source_file import SourceFile
+
+
+# Bump whenever a rule is added or changes behaviour so cached reviews
+# produced by an older rule set are not reused.
+ANALYZER_VERSION = "4"
+
+CATEGORIES = ("security", "performance")
+
+SCOPE_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)
+
+# Every enclosing loop multiplies a finding's estimated cost by this.
+LOOP_COST = 10
+
+LineRanges = Sequence[Tuple[int, int]]
+
+
+def in_ranges(line: int, ranges: LineRanges) -> bool:
+    return any(start <= line <= end for start, end in ranges)
+
+
+def _overlaps(node: ast.AST, ranges: LineRanges) -> bool:
+    start = node.lineno
+    end = getattr(node, "end_lineno", None) or start
+    return any(start <= r_end and r_start <= end for r_start, r_end in ranges)
+
+
+class _Analyzer:
+    """Walks a module once and runs every rule registered for each node type."""
+
+    def __init__(
+        self,
+        rules: Iterable[Rule],
+        lines: List[str],
+        ranges: Optional[LineRanges] = None,
+        matcher: Optional[PackMatcher] = None,
+    ):
+        self.ranges = ranges
+        self.dispatch: Dict[type, List[Rule]] = {}
+        for r in rules:
+            for node_type in r.node_types:
+                self.dispatch.setdefault(node_type, []).append(r)
+        self.matcher = matcher
+        self.ctx = Context(lines=lines)
+        self.issues: Dict[str, List[dict]] = {c: [] for c in CATEGORIES}
+        # (category, rule name) -> seconds spent in that rule.
+        self.rule_seconds: Optional[Dict[Tuple[str, str], float]] = {} if RULE_TIMING else None
+
+    def visit(self, node: ast.AST) -> None:
+        # Statements entirely outside the requested lines are skipped whole,
+        # but their imports still resolve names on the lines that are checked.
+        if self.ranges is not None and isinstance(node, ast.stmt) and not _overlaps(node, self.ranges):
+            for child in ast.walk(node):
+                if isinstance(child, (ast.Import, ast.ImportFrom)):
+                    self.ctx.observe(child)
+            return
+
+        self.ctx.observe(node)
+        self._check(node)
+
+        if isinstance(node, LOOP_NODES):
+            self._visit_loop(node)
+        elif isinstance(node, COMPREHENSION_NODES):
+            self._visit_comprehension(node)
+        elif isinstance(node, SCOPE_NODES):
+            outer = self.ctx.enter_scope(node)
+            self._visit_children(node)
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                # Complexity rules run while the function's own (empty) loop stack is current.
+                self._check(self.ctx.functions[-1])
+            self.ctx.leave_scope(node, outer)
+        elif isinstance(node, BLOCK_NODES):
+            self._visit_block(node)
+        else:
+            self._visit_children(node)
+
+    def _timed(self, key: Tuple[str, str], check, *args):
+        if self.rule_seconds is None:
+            return check(*args)
+        start = time.perf_counter()
+        try:
+            return check(*args)
+        finally:
+            self.rule_seconds[key] = self.rule_seconds.get(key, 0.0) + time.perf_counter() - start
+
+    def _check(self, node) -> None:
+        if self.matcher is not None and isinstance(node, PackMatcher.node_types):
+            # Every pack rule at once: one lookup, however many rules are loaded.
+            for r in self._timed(("packs", "matcher"), self.matcher.match, node, self.ctx.imports):
+                self._report(r, node, self.ctx.loop_depth)
+
+        for r in self.dispatch.get(type(node), ()):
+            hit = self._timed((r.category, r.check.__name__.lstrip("_")), r.check, node, self.ctx)
+            if isinstance(hit, frozenset):
+                self.ctx.loops[-1].pending.append((r, node, hit, self.ctx.loop_depth))
+            elif hit:
+                self._report(r, node, self.ctx.loop_depth, hit if isinstance(hit, str) else None)
+
+    def _report(self, r, node, depth: int, detail: Optional[str] = None) -> None:
+        # `r` is a Rule or a rule_packs.PackRule.
+        line = getattr(node, "lineno", 0)
+        issue = {
+            "issue": f"{r.issue} ({detail})" if detail else r.issue,
+            "line": line,
+            "code": self.ctx.code(line),
+        }
+        if r.cost is not None:
+            issue["cost"] = round(r.cost * LOOP_COST ** depth, 2)
+        self.issues.setdefault(r.category, []).append(issue)
+
+    def _visit_loop(self, node: ast.AST) -> None:
+        # A for loop's iterable and its else clause run once, outside the loop.
+        if isinstance(node, ast.While):
+            inside = [node.test, *node.body]
+        else:
+            self.visit(node.iter)
+            inside = [node.target, *node.body]
+
+        self.ctx.enter_loop(node)
+        self.ctx.enter_block()
+        for child in inside:
+            self.visit(child)
+        self.ctx.leave_block()
+        self._leave_loop()
+
+        for child in node.orelse:
+            self.visit(child)
+
+    def _visit_comprehension(self, node: ast.AST) -> None:
+        first, *rest = node.generators
+        self.visit(first.iter)
+
+        self.ctx.enter_loop(node)
+        self.visit(first.target)
+        for condition in first.ifs:
+            self.visit(condition)
+        for generator in rest:
+            self._visit_children(generator)
+        if isinstance(node, ast.DictComp):
+            self.visit(node.key)
+            self.visit(node.value)
+        else:
+            self.visit(node.elt)
+        self._leave_loop()
+
+    def _leave_loop(self) -> None:
+        # Checks waiting on loop-invariant names are settled now the whole body is seen.
+        frame = self.ctx.leave_loop()
+        for r, node, names, depth in frame.pending:
+            if not names & frame.changed:
+                self._report(r, node, depth)
+
+    def _visit_block(self, node: ast.AST) -> None:
+        self.ctx.enter_block()
+        if isinstance(node, ast.If) and len(node.orelse) == 1 and isinstance(node.orelse[0], ast.If):
+            # An `elif` is not one level deeper than its `if`.
+            self.visit(node.test)
+            for child in node.body:
+                self.visit(child)
+            self.ctx.leave_block()
+            self.visit(node.orelse[0])
+            return
+        self._visit_children(node)
+        self.ctx.leave_block()
+
+    def _visit_children(self, node: ast.AST) -> None:
+        for child in ast.iter_child_nodes(node):
+            self.visit(child)
+
+
+def _unparseable(error: SyntaxError) -> Dict[str, List[dict]]:
+    issue = {
+        "issue": f"unparseable source ({error.msg})",
+        "line": error.lineno or 0,
+        "code": (error.text or "").strip(),
+    }
+    return {c: [dict(issue)] for c in CATEGORIES}
+
+
+def analyze_tree(
+    tree: ast.Module,
+    lines: List[str],
+    rules: Iterable[Rule] = RULES,
+    ranges: Optional[LineRanges] = None,
+    matcher: Optional[PackMatcher] = None,
+) -> Dict[str, List[dict]]:
+    """
+    Run all rules over an already parsed module (see `analyze_source`).
+    `matcher` defaults to the rule packs in `SECURITY_RULE_PACKS`.
+    """
+    analyzer = _Analyzer(rules, lines, ranges, matcher or default_matcher())
+    analyzer.visit(tree)
+    if analyzer.rule_seconds:
+        observe_rules(analyzer.rule_seconds)
+
+    result = {}
+    for category, issues in analyzer.issues.items():
+        if ranges is not None:
+            issues = [i for i in issues if in_ranges(i["line"], ranges)]
+        # Performance findings come most expensive first; the rest have no cost.
+        result[category] = sorted(issues, key=lambda i: (-i.get("cost", 0), i["line"]))
+    return result
+
+
+def analyze_source(
+    source: str,
+    rules: Iterable[Rule] = RULES,
+    ranges: Optional[LineRanges] = None,
+) -> Dict[str, List[dict]]:
+    """
+    Parse `source` once and run all rules over the tree.
+    Returns issues grouped by category, each sorted by line (performance
+    issues by estimated cost first).
+    With `ranges`, only issues on those (inclusive) line ranges are reported.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        return _unparseable(e)
+    return analyze_tree(tree, source.splitlines(), rules, ranges)
+
+
+@lru_cache(maxsize=128)
+def _analyze_cached(path: str, mtime_ns: int, size: int, ranges: Optional[tuple]) -> Dict[str, List[dict]]:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return analyze_source(f.read(), ranges=ranges)
+
+
+def _analyze_source_file(src: SourceFile, ranges: Optional[tuple]) -> Dict[str, List[dict]]:
+    key = ("ast_analysis", ANALYZER_VERSION, default_matcher().fingerprint, ranges)
+    if key not in src.analyses:
+        if src.tree is None:
+            src.analyses[key] = _unparseable(src.syntax_error)
+        else:
+            src.analyses[key] = analyze_tree(src.tree, src.lines, ranges=ranges)
+    return src.analyses[key]
+
+
+def analyze_file(source: Union[str, SourceFile], ranges: Optional[LineRanges] = None) -> Dict[str, List[dict]]:
+    """
+    Analyze a file, reusing the parse for every category.
+    The security and performance reviews of the same unchanged file share
+    one read, one parse and one tree walk. A `SourceFile` is analyzed from
+    memory and keeps its own results.
+    """
+    key = tuple(map(tuple, ranges)) if ranges is not None else None
+    if isinstance(source, SourceFile):
+        result = _analyze_source_file(source, key)
+    else:
+        st = os.stat(source)
+        result = _analyze_cached(source, st.st_mtime_ns, st.st_size, key)
+    return {c: [dict(i) for i in issues] for c, issues in result.items()}
+
+
+def category_report(source: Union[str, SourceFile], category: str, ranges: Optional[LineRanges] = None) -> Dict:
+    issues = analyze_file(source, ranges).get(category, [])
+    return {
+        "file": source.name if isinstance(source, SourceFile) else source,
+        "issue_count": len(issues),
+        "issues": issues,
+    }
@@ -0,0 +1,462 @@
+import ast
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, List, Optional, Set, Tuple, Union
+
+
+LOOP_NODES = (ast.For, ast.AsyncFor, ast.While)
+COMPREHENSION_NODES = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+# Compound statements that add a level of nesting inside a function.
+BLOCK_NODES = LOOP_NODES + (ast.If, ast.With, ast.AsyncWith, ast.Try) + (
+    (ast.Match,) if hasattr(ast, "Match") else ()
+) + ((ast.TryStar,) if hasattr(ast, "TryStar") else ())
+
+HARDCODED_PASSWORD = re.compile(r"passw(or)?d", re.IGNORECASE)
+
+# Per-function limits above which a function is reported.
+MAX_COMPLEXITY = int(os.getenv("PERF_MAX_COMPLEXITY", "10"))
+MAX_NESTING = int(os.getenv("PERF_MAX_NESTING", "4"))
+# Attribute chains are only reported this many loops deep.
+HOT_LOOP_DEPTH = 2
+
+# Methods that change the object they are called on (sort/reverse are left
+# out so that sorting an unchanged list in a loop is still reported).
+MUTATING_METHODS = frozenset({
+    "append", "extend", "insert", "pop", "remove", "clear",
+    "add", "update", "discard", "setdefault", "popitem",
+})
+
+
+@dataclass
+class LoopFrame:
+    """One enclosing loop (or comprehension) while its body is walked."""
+
+    node: ast.AST
+    # Names rebound or mutated anywhere in the loop.
+    changed: Set[str] = field(default_factory=set)
+    # (rule, node, names, loop depth) reported only if `names` never change.
+    pending: List[Tuple["Rule", ast.AST, FrozenSet[str], int]] = field(default_factory=list)
+    seen: Set[tuple] = field(default_factory=set)
+
+
+@dataclass
+class FunctionStats:
+    """Complexity of one function, checked by rules once its body is walked."""
+
+    name: str
+    lineno: int
+    complexity: int = 1
+    nesting: int = 0
+
+
+@dataclass
+class Context:
+    """State shared by every rule while walking one module."""
+
+    lines: List[str]
+    loops: List[LoopFrame] = field(default_factory=list)
+    functions: List[FunctionStats] = field(default_factory=list)
+    # What simple assignments bound each name to ("list", "str", ...), innermost scope last.
+    kinds: List[Dict[str, Optional[str]]] = field(default_factory=lambda: [{}])
+    nesting: int = 0
+    # Local name -> qualified name, from every import seen so far.
+    imports: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def loop_depth(self) -> int:
+        return len(self.loops)
+
+    def code(self, lineno: int) -> str:
+        if 1 <= lineno <= len(self.lines):
+            return self.lines[lineno - 1].strip()
+        return ""
+
+    def kind(self, name: str) -> Optional[str]:
+        for scope in reversed(self.kinds):
+            if name in scope:
+                return scope[name]
+        return None
+
+    def first_in_loop(self, key: tuple) -> bool:
+        """True the first time `key` is seen in the innermost loop."""
+        seen = self.loops[-1].seen
+        if key in seen:
+            return False
+        seen.add(key)
+        return True
+
+    # ---- bookkeeping done by the walker ----
+
+    def observe(self, node: ast.AST) -> None:
+        """Record what `node` binds, mutates and adds to the function's complexity."""
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            self._changed(node.id)
+        elif isinstance(node, (ast.Attribute, ast.Subscript)) and not isinstance(node.ctx, ast.Load):
+            self._changed(_base_name(node))
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            if node.func.attr in MUTATING_METHODS:
+                self._changed(_base_name(node.func.value))
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    self.imports[alias.asname] = alias.name
+                else:
+                    top = alias.name.split(".", 1)[0]
+                    self.imports[top] = top
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            for alias in node.names:
+                self.imports[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            kind = _value_kind(node.value) if node.value is not None else None
+            if isinstance(node, ast.AnnAssign):
+                kind = kind or _annotation_kind(node.annotation)
+            for target in _assign_targets(node):
+                if isinstance(target, ast.Name):
+                    self.kinds[-1][target.id] = kind
+
+        if self.functions:
+            self.functions[-1].complexity += _decisions(node)
+
+    def _changed(self, name: Optional[str]) -> None:
+        if name and self.loops:
+            self.loops[-1].changed.add(name)
+
+    def enter_loop(self, node: ast.AST) -> None:
+        self.loops.append(LoopFrame(node))
+
+    def leave_loop(self) -> LoopFrame:
+        frame = self.loops.pop()
+        if self.loops:
+            self.loops[-1].changed |= frame.changed
+        return frame
+
+    def enter_block(self) -> None:
+        self.nesting += 1
+        if self.functions:
+            stats = self.functions[-1]
+            stats.nesting = max(stats.nesting, self.nesting)
+
+    def leave_block(self) -> None:
+        self.nesting -= 1
+
+    def enter_scope(self, node: ast.AST) -> tuple:
+        # A function defined inside a loop body does not run per iteration.
+        outer = (self.loops, self.nesting)
+        self.loops, self.nesting = [], 0
+        scope: Dict[str, Optional[str]] = {}
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            self.functions.append(FunctionStats(node.name, node.lineno))
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            args = node.args
+            for arg in args.posonlyargs + args.args + args.kwonlyargs:
+                scope[arg.arg] = _annotation_kind(arg.annotation)
+        self.kinds.append(scope)
+        return outer
+
+    def leave_scope(self, node: ast.AST, outer: tuple) -> None:
+        self.loops, self.nesting = outer
+        self.kinds.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            self.functions.pop()
+
+
+# A rule's check returns:
+#   * a truthy value to report the node; a string is added to the issue text,
+#   * a frozenset of names to report it only if none of them change in the
+#     innermost enclosing loop (decided when that loop has been walked),
+#   * anything falsy to skip it.
+CheckResult = Union[bool, str, FrozenSet[str], None]
+
+
+@dataclass(frozen=True)
+class Rule:
+    category: str
+    issue: str
+    node_types: Tuple[type, ...]
+    check: Callable[[ast.AST, Context], CheckResult] = field(compare=False)
+    # Estimated cost of one finding outside any loop; None for rules not ranked by cost.
+    cost: Optional[float] = None
+
+
+RULES: List[Rule] = []
+
+
+def rule(category: str, issue: str, *node_types: type, cost: Optional[float] = None):
+    """Register `check` to run on every node of the given types."""
+
+    def decorator(check):
+        RULES.append(Rule(category, issue, node_types, check, cost))
+        return check
+
+    return decorator
+
+
+def _call_name(node: ast.Call) -> str:
+    func = node.func
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name):
+        return f"{func.value.id}.{func.attr}"
+    return ""
+
+
+def _is_str_literal(node: ast.AST) -> bool:
+    return isinstance(node, ast.JoinedStr) or (
+        isinstance(node, ast.Constant) and isinstance(node.value, str)
+    )
+
+
+def _target_names(node: ast.AST) -> List[str]:
+    if isinstance(node, ast.Assign):
+        targets = node.targets
+    else:
+        targets = [node.target]
+    names = []
+    for target in targets:
+        if isinstance(target, ast.Name):
+            names.append(target.id)
+        elif isinstance(target, ast.Attribute):
+            names.append(target.attr)
+    return names
+
+
+def _assign_targets(node: ast.AST) -> List[ast.AST]:
+    return node.targets if isinstance(node, ast.Assign) else [node.target]
+
+
+def _base_name(node: ast.AST) -> Optional[str]:
+    """`x` for `x`, `x.a.b`, `x[i].a`; None when the chain starts elsewhere."""
+    while isinstance(node, (ast.Attribute, ast.Subscript)):
+        node = node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+def _dotted(node: ast.Attribute) -> Optional[str]:
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def _value_kind(node: ast.AST) -> Optional[str]:
+    """The container/str type an assigned value obviously has, if any."""
+    if isinstance(node, (ast.List, ast.ListComp)):
+        return "list"
+    if isinstance(node, (ast.Set, ast.SetComp)):
+        return "set"
+    if isinstance(node, (ast.Dict, ast.DictComp)):
+        return "dict"
+    if _is_str_value(node):
+        return "str"
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        return {"list": "list", "sorted": "list", "set": "set", "frozenset": "set", "dict": "dict"}.get(node.func.id)
+    return None
+
+
+def _annotation_kind(node: Optional[ast.AST]) -> Optional[str]:
+    if isinstance(node, ast.Subscript):
+        node = node.value
+    if isinstance(node, ast.Attribute):
+        name = node.attr
+    elif isinstance(node, ast.Name):
+        name = node.id
+    else:
+        return None
+    return {"list": "list", "List": "list", "str": "str", "set": "set", "Set": "set", "dict": "dict", "Dict": "dict"}.get(name)
+
+
+def _is_str_value(node: ast.AST) -> bool:
+    if _is_str_literal(node):
+        return True
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Mod)):
+        return _is_str_value(node.left) or _is_str_value(node.right)
+    if isinstance(node, ast.Call):
+        if isinstance(node.func, ast.Name):
+            return node.func.id in ("str", "repr")
+        if isinstance(node.func, ast.Attribute):
+            return node.func.attr in ("join", "format") and _is_str_literal(node.func.value)
+    return False
+
+
+def _is_list(node: ast.AST, ctx: Context) -> bool:
+    # Short literal lists (`x in [a, b]`) are left alone.
+    if isinstance(node, ast.Name):
+        return ctx.kind(node.id) == "list"
+    return _value_kind(node) == "list"
+
+
+def _decisions(node: ast.AST) -> int:
+    """Branches `node` adds to its function's cyclomatic complexity."""
+    if isinstance(node, (ast.If, ast.IfExp, ast.For, ast.AsyncFor, ast.While, ast.ExceptHandler)):
+        return 1
+    if isinstance(node, ast.BoolOp):
+        return len(node.values) - 1
+    if isinstance(node, COMPREHENSION_NODES):
+        return sum(1 + len(g.ifs) for g in node.generators)
+    if hasattr(ast, "match_case") and isinstance(node, ast.match_case):
+        return 1
+    return 0
+
+
+def _is_int(node: ast.AST, *values: int) -> bool:
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return _is_int(node.operand, *(-v for v in values))
+    return isinstance(node, ast.Constant) and type(node.value) is int and node.value in values
+
+
+# --------------------------------------------------
+# SECURITY RULES
+# --------------------------------------------------
+
+# Calls and imports (eval, pickle, subprocess, ...) are matched by the
+# rule packs in services/packs/ instead; see services/rule_packs.py.
+
+@rule("security", "hardcoded password", ast.Assign, ast.AnnAssign)
+def _hardcoded_password(node, ctx):
+    if node.value is None or not _is_str_literal(node.value):
+        return False
+    return any(HARDCODED_PASSWORD.search(name) for name in _target_names(node))
+
+
+@rule("security", "hardcoded password", ast.keyword)
+def _hardcoded_password_kwarg(node, ctx):
+    return (
+        node.arg is not None
+        and HARDCODED_PASSWORD.search(node.arg) is not None
+        and _is_str_literal(node.value)
+    )
+
+
+# --------------------------------------------------
+# PERFORMANCE RULES
+# --------------------------------------------------
+# `cost` is the estimated cost of one finding outside any loop; every
+# enclosing loop multiplies it (see `ast_analysis.LOOP_COST`).
+
+@rule("performance", "inefficient loop append", ast.Call, cost=0.5)
+def _append_in_loop(node, ctx):
+    # Only loops that do nothing but (conditionally) append: a comprehension.
+    if not (
+        ctx.loop_depth > 0
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == "append"
+        and isinstance(ctx.loops[-1].node, (ast.For, ast.AsyncFor))
+    ):
+        return False
+    body = ctx.loops[-1].node.body
+    if len(body) == 1 and isinstance(body[0], ast.If) and not body[0].orelse:
+        body = body[0].body
+    return len(body) == 1 and isinstance(body[0], ast.Expr) and body[0].value is node
+
+
+@rule("performance", "string concat in loop", ast.AugAssign, cost=1.0)
+def _str_concat_in_loop(node, ctx):
+    if ctx.loop_depth == 0 or not isinstance(node.op, ast.Add):
+        return False
+    if _is_str_value(node.value):
+        return True
+    return isinstance(node.target, ast.Name) and ctx.kind(node.target.id) == "str"
+
+
+@rule("performance", "nested loop", *LOOP_NODES, cost=1.0)
+def _nested_loop(node, ctx):
+    return ctx.loop_depth > 0
+
+
+@rule("performance", "membership test on list in loop", ast.Compare, cost=1.0)
+def _list_membership_in_loop(node, ctx):
+    return ctx.loop_depth > 0 and any(
+        isinstance(op, (ast.In, ast.NotIn)) and _is_list(right, ctx)
+        for op, right in zip(node.ops, node.comparators)
+    )
+
+
+@rule("performance", "list.pop(0) in loop", ast.Call, cost=1.0)
+def _pop_front_in_loop(node, ctx):
+    return (
+        ctx.loop_depth > 0
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == "pop"
+        and len(node.args) == 1
+        and _is_int(node.args[0], 0)
+    )
+
+
+@rule("performance", "list.insert(0) in loop", ast.Call, cost=1.0)
+def _insert_front_in_loop(node, ctx):
+    return (
+        ctx.loop_depth > 0
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == "insert"
+        and len(node.args) == 2
+        and _is_int(node.args[0], 0)
+    )
+
+
+@rule("performance", "len() in loop", ast.Call, cost=0.1)
+def _invariant_len_in_loop(node, ctx):
+    if ctx.loop_depth == 0 or _call_name(node) != "len" or len(node.args) != 1:
+        return False
+    arg = node.args[0]
+    if not isinstance(arg, ast.Name) or not ctx.first_in_loop(("len", arg.id)):
+        return False
+    return frozenset([arg.id])
+
+
+@rule("performance", "attribute lookup in hot loop", ast.Attribute, cost=0.1)
+def _attribute_chain_in_loop(node, ctx):
+    if ctx.loop_depth < HOT_LOOP_DEPTH or not isinstance(node.ctx, ast.Load):
+        return False
+    chain = _dotted(node)
+    # `a.b.c` and longer; the inner `a.b` of the same chain is visited too.
+    if chain is None or chain.count(".") < 2:
+        return False
+    base = chain.split(".", 1)[0]
+    if not ctx.first_in_loop(("attribute", base)):
+        return False
+    return frozenset([base])
+
+
+@rule("performance", "sort in loop", ast.Call, cost=2.0)
+def _sort_in_loop(node, ctx):
+    if ctx.loop_depth == 0:
+        return False
+    if _call_name(node) == "sorted" and node.args and isinstance(node.args[0], ast.Name):
+        return frozenset([node.args[0].id])
+    if isinstance(node.func, ast.Attribute) and node.func.attr == "sort" and isinstance(node.func.value, ast.Name):
+        return frozenset([node.func.value.id])
+    return False
+
+
+@rule("performance", "redundant sort", ast.Call, cost=0.5)
+def _redundant_sort(node, ctx):
+    name = _call_name(node)
+    if name not in ("sorted", "list") or len(node.args) != 1 or not isinstance(node.args[0], ast.Call):
+        return False
+    inner = _call_name(node.args[0])
+    # sorted(sorted(x)), sorted(list(x)), list(sorted(x))
+    return inner == "sorted" or (name == "sorted" and inner == "list")
+
+
+@rule("performance", "sort for min/max", ast.Subscript, cost=0.5)
+def _sort_for_min_max(node, ctx):
+    return (
+        isinstance(node.value, ast.Call)
+        and _call_name(node.value) == "sorted"
+        and _is_int(node.slice, 0, -1)
+    )
+
+
+@rule("performance", "high cyclomatic complexity", FunctionStats, cost=2.0)
+def _complex_function(stats, ctx):
+    return stats.complexity > MAX_COMPLEXITY and f"{stats.name}: {stats.complexity}"
+
+
+@rule("performance", "deep nesting", FunctionStats, cost=2.0)
+def _deeply_nested_function(stats, ctx):
+    return stats.nesting > MAX_NESTING and f"{stats.name}: {stats.nesting} levels"
@@ -0,0 +1,191 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from services.findings import FindingsTable
+from services.incremental_review import DEFAULT_CONTEXT, incremental_review
+from services.project_index import IndexPlan, ProjectIndex, file_imports, module_name
+from services.source_file import SourceFile
+from services.static_review import SECTIONS, iter_static_review, static_review
+from tools.list_files import list_files
+from tools.parse_diff import parse_diff
+
+
+def confine(path: str, base: str) -> str:
+    """
+    `path` resolved with `realpath`, relative ones against `base` (itself a
+    realpath). Raises ValueError if the result is outside `base`.
+    """
+    resolved = os.path.realpath(os.path.join(base, path))
+    if os.path.commonpath([resolved, base]) != base:
+        raise ValueError(f"Path is outside the batch root: {path}")
+    return resolved
+
+
+def collect_paths(
+    directory: Optional[str] = None,
+    paths: Optional[Iterable[str]] = None,
+    diff: Optional[str] = None,
+    root: str = ".",
+    within: Optional[str] = None,
+) -> List[str]:
+    """
+    Resolve a batch target into a de-duplicated list of Python files.
+    Files named in a diff are resolved against `root`; deleted files are skipped.
+    With `within` (a realpath), every target is resolved against it and
+    ValueError is raised for any file, symlinks followed, outside it.
+    """
+    if within is not None:
+        directory = directory and confine(directory, within)
+        paths = [confine(path, within) for path in paths or []]
+        root = confine(root, within)
+    targets: List[str] = []
+
+    if directory:
+        targets.extend(list_files(directory))
+    for path in paths or []:
+        targets.extend(list_files(path) if os.path.isdir(path) else [path])
+    if diff:
+        targets.extend(os.path.join(root, f) for f in parse_diff(diff)["changed_files"])
+
+    seen = set()
+    files = []
+    for path in targets:
+        if path.endswith(".py") and os.path.isfile(path) and path not in seen:
+            if within is not None:
+                confine(path, within)
+            seen.add(path)
+            files.append(path)
+    return files
+
+
+def diff_hunks(diff: str, root: str = ".") -> Dict[str, List[dict]]:
+    """Hunks per changed file, keyed by the same paths `collect_paths` returns."""
+    return {os.path.join(root, f): h for f, h in parse_diff(diff)["hunks"].items()}
+
+
+def _init_worker() -> None:
+    # Batch workers are long-lived already, so lint in-process instead of
+    # starting a nested linter pool inside every worker.
+    from tools import linter_pool
+
+    linter_pool.POOL_WORKERS = 0
+    linter_pool._warm()
+
+
+def _review_one(path: str, hunks: Optional[List[dict]], context: int) -> Dict:
+    try:
+        if hunks:
+            result = incremental_review(path, hunks, context)
+            return {
+                "file": path,
+                "report": result["report"],
+                "ranges": result["ranges"],
+                "baseline_hit": result["baseline_hit"],
+                "reused_findings": result["reused_findings"],
+            }
+        return {"file": path, "report": static_review(path)}
+    except Exception as e:
+        return {"file": path, "error": str(e)}
+
+
+def _index_one(path: str, dependent: bool) -> Dict:
+    """
+    A file's static review plus what the project index stores. An unchanged
+    `dependent` (it imports a changed module) only needs pylint again.
+    """
+    try:
+        src = SourceFile.from_path(path)
+        if dependent:
+            report, imports = dict(iter_static_review(src, sections=("correctness",))), None
+        else:
+            report, imports = dict(iter_static_review(src)), file_imports(src, module_name(path))
+        return {"file": path, "report": report, "sha256": src.sha256, "imports": imports}
+    except Exception as e:
+        return {"file": path, "error": str(e)}
+
+
+def _from_index(index: ProjectIndex, plan: IndexPlan, result: Dict) -> Dict:
+    """Completes an indexed file's result with its stored sections and records it."""
+    path = result["file"]
+    sections = {**plan.dependents.get(path, {}), **result["report"]}
+    report = {"file": path, **{section: sections[section] for section in SECTIONS}}
+    index.record(path, plan.stats[path], result["sha256"], report, result["imports"])
+    return {"file": path, "report": report}
+
+
+def iter_batch_review(
+    paths: List[str],
+    workers: Optional[int] = None,
+    hunks: Optional[Dict[str, List[dict]]] = None,
+    context: int = DEFAULT_CONTEXT,
+    index: Optional[ProjectIndex] = None,
+) -> Iterator[Dict]:
+    """
+    Runs the static reviewers over `paths` on a process pool sized to the
+    machine and yields each file's result as soon as it finishes.
+    Files with `hunks` are reviewed incrementally (changed lines only).
+    With a project `index`, unchanged files are answered from it first
+    (`"indexed": true`) and only the rest reach the pool.
+    """
+    hunks = hunks or {}
+    if not paths:
+        return
+
+    plan = None
+    if index is not None:
+        plan = index.plan([p for p in paths if p not in hunks])
+        for path, report in plan.fresh.items():
+            yield {"file": path, "report": {**report, "file": path}, "indexed": True}
+        paths = [p for p in paths if p not in plan.fresh]
+        if not paths:
+            return
+
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    ) as pool:
+        futures = []
+        for path in paths:
+            if plan is None or path in hunks:
+                futures.append(pool.submit(_review_one, path, hunks.get(path), context))
+            else:
+                futures.append(pool.submit(_index_one, path, path in plan.dependents))
+
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                yield _from_index(index, plan, result) if "sha256" in result else result
+        finally:
+            # Closed early (the reader went away): files not started yet are skipped.
+            for future in futures:
+                future.cancel()
+
+
+SUMMARY_TOP = int(os.getenv("BATCH_SUMMARY_TOP", "5"))
+
+
+def summarize(findings: FindingsTable, indexed: int = 0, top: int = SUMMARY_TOP) -> Dict:
+    """
+    Totals across a finished batch, from the findings of every result
+    (`FindingsTable.add_result`): issues per reviewer, the most frequent
+    rules per reviewer and the files with the highest weighted penalty.
+    """
+    issues = findings.counts("section")
+    top_rules = {}
+    for section in SECTIONS:
+        rules = findings.counts("rule", section=section)
+        rules.pop(None, None)
+        top_rules[section] = rules.most_common(top)
+    penalties = sorted(findings.penalties("file").items(), key=lambda item: -item[1])
+    return {
+        "files": len(findings.files),
+        "errors": len(findings.errors),
+        "indexed": indexed,
+        "issues": {section: issues.get(section, 0) for section in SECTIONS},
+        "top_rules": top_rules,
+        "top_files": [[file, round(penalty, 2)] for file, penalty in penalties[:top]],
+    }
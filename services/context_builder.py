@@ -0,0 +1,177 @@
+import json
+import os
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+from services.ast_analysis import LineRanges
+from services.scoring import SECTIONS, rule_code
+from tools.parse_diff import line_window
+
+# Estimated tokens of source code a prompt may carry per file before only
+# the regions around findings are sent.
+CODE_TOKEN_BUDGET = int(os.getenv("CONTEXT_CODE_TOKENS", "6000"))
+CONTEXT_LINES = int(os.getenv("CONTEXT_LINES", "5"))
+
+# The only finding fields a model needs; pylint's module, obj, path,
+# message-id, column and end positions are dropped.
+FINDING_FIELDS = {
+    "style": ("message",),
+    "correctness": ("type", "message"),
+    "security": (),
+    "performance": (),
+}
+
+_REGION_RE = re.compile(r"^REGION (\d+)-(\d+)\s*$", re.MULTILINE)
+_CODE_BLOCK = re.compile(r"```(?:python|py)?[ \t]*\n(.*?)```", re.DOTALL)
+
+
+def estimate_tokens(text: str) -> int:
+    """About four characters per token, which is close enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+def context_excerpt(text: str, ranges: LineRanges) -> str:
+    """Numbered source lines inside `ranges`, for LLM prompts."""
+    lines = text.splitlines()
+    chunks = []
+    for start, end in ranges:
+        end = min(end, len(lines))
+        if start > end:
+            continue
+        chunks.append("\n".join(f"{n:>5}: {lines[n - 1]}" for n in range(start, end + 1)))
+    return "\n   ...\n".join(chunks)
+
+
+# --------------------------------------------------
+# FINDINGS
+# --------------------------------------------------
+
+def compact_section(section: str, report: dict) -> List[dict]:
+    """
+    One entry per distinct (rule, message) with the lines it was hit on,
+    in first-seen order.
+    """
+    groups: Dict[Tuple, dict] = {}
+    for issue in report.get("issues") or []:
+        fields = {f: issue[f] for f in FINDING_FIELDS.get(section, ()) if issue.get(f)}
+        key = (rule_code(section, issue), tuple(sorted(fields.items())))
+        entry = groups.get(key)
+        if entry is None:
+            entry = groups[key] = {"rule": key[0], **fields, "lines": []}
+        line = issue.get("line")
+        if line and line not in entry["lines"]:
+            entry["lines"].append(line)
+    return list(groups.values())
+
+
+def compact_report(report: dict) -> Dict[str, dict]:
+    return {
+        section: {
+            "issue_count": (report.get(section) or {}).get("issue_count", 0),
+            "findings": compact_section(section, report.get(section) or {}),
+        }
+        for section in SECTIONS
+    }
+
+
+def finding_lines(report: dict) -> Set[int]:
+    return {
+        issue["line"]
+        for section in SECTIONS
+        for issue in (report.get(section) or {}).get("issues") or []
+        if issue.get("line")
+    }
+
+
+# --------------------------------------------------
+# CODE
+# --------------------------------------------------
+
+def code_regions(
+    source: str,
+    report: dict,
+    budget: int = CODE_TOKEN_BUDGET,
+    context: int = CONTEXT_LINES,
+) -> Optional[List[Tuple[int, int]]]:
+    """
+    None when the whole file fits in `budget`. Otherwise the line ranges
+    around findings, narrowed and then truncated until they fit.
+    """
+    if estimate_tokens(source) <= budget:
+        return None
+
+    lines = source.splitlines()
+    hits = finding_lines(report) or {1}
+    while True:
+        ranges = [(s, min(e, len(lines))) for s, e in line_window(hits, context)]
+        size = sum(estimate_tokens("\n".join(lines[s - 1:e])) for s, e in ranges)
+        if size <= budget or context == 0:
+            break
+        context -= 1
+
+    kept, size = [], 0
+    for start, end in ranges:
+        cost = estimate_tokens("\n".join(lines[start - 1:end]))
+        if kept and size + cost > budget:
+            break
+        kept.append((start, end))
+        size += cost
+    return kept
+
+
+def regions_prompt(source: str, ranges: LineRanges) -> str:
+    lines = source.splitlines()
+    parts = []
+    for start, end in ranges:
+        body = "\n".join(lines[start - 1:end])
+        parts.append(f"REGION {start}-{end}\n```python\n{body}\n```")
+    return "\n\n".join(parts)
+
+
+def apply_regions(source: str, reply: str, ranges: LineRanges) -> Optional[str]:
+    """
+    `source` with every 'REGION <start>-<end>' block of `reply` replaced by
+    the code that follows it. Each block must name one of the `ranges` that
+    were sent, at most once; otherwise (or with no block at all) None, since
+    an invented or overlapping range would corrupt the file.
+    """
+    sent = set(ranges)
+    matches = list(_REGION_RE.finditer(reply))
+    edits, seen = [], set()
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(reply)
+        block = _CODE_BLOCK.search(reply, match.end(), end)
+        if block:
+            region = (int(match.group(1)), int(match.group(2)))
+            if region not in sent or region in seen:
+                return None
+            seen.add(region)
+            edits.append((*region, block.group(1)))
+    if not edits:
+        return None
+
+    lines = source.splitlines(keepends=True)
+    # Bottom-up, so earlier line numbers stay valid.
+    for start, end, code in sorted(edits, reverse=True):
+        replacement = code if code.endswith("\n") or not code else code + "\n"
+        lines[start - 1:end] = replacement.splitlines(keepends=True)
+    return "".join(lines)
+
+
+# --------------------------------------------------
+# ACCOUNTING
+# --------------------------------------------------
+
+def savings(raw: str, sent: str) -> Dict[str, int]:
+    raw_tokens, sent_tokens = estimate_tokens(raw), estimate_tokens(sent)
+    return {
+        "raw_tokens": raw_tokens,
+        "sent_tokens": sent_tokens,
+        "saved_tokens": max(0, raw_tokens - sent_tokens),
+    }
+
+
+def findings_context(report: dict) -> Tuple[str, Dict[str, int]]:
+    """Compacted findings as JSON, plus the savings against the raw report."""
+    compact = json.dumps(compact_report(report), separators=(",", ":"))
+    return compact, savings(json.dumps(report), compact)
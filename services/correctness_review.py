@@ -1,31 +1,37 @@
-import json
-import subprocess
 from typing import List, Dict
 
+from tools.linter_pool import run_pylint_warm, run_pylint_warm_async
+
+
+def _correctness_report(path: str, issues: List[Dict]) -> Dict:
+    return {
+        "file": path,
+        "issue_count": len(issues),
+        "issues": issues,
+    }
+
+
+def _error_report(path: str, error: Exception) -> Dict:
+    return {
+        "file": path,
+        "issue_count": 1,
+        "issues": [{"type": "error", "message": str(error)}],
+    }
+
 
 def correctness_review(path: str) -> Dict:
     """Runs pylint for static correctness analysis."""
 
     try:
-        result = subprocess.run(
-            ["pylint", path, "-f", "json"],
-            capture_output=True,
-            text=True,
-            check=False
-        )
-
-        output = result.stdout.strip()
-        issues = json.loads(output) if output else []
-
-        return {
-            "file": path,
-            "issue_count": len(issues),
-            "issues": issues,
-        }
+        return _correctness_report(path, run_pylint_warm(path))
+    except Exception as e:
+        return _error_report(path, e)
+
 
+async def correctness_review_async(path: str) -> Dict:
+    """`correctness_review` without blocking the event loop."""
+
+    try:
+        return _correctness_report(path, await run_pylint_warm_async(path))
     except Exception as e:
-        return {
-            "file": path,
-            "issue_count": 1,
-            "issues": [{"type": "error", "message": str(e)}],
-        }
+        return _error_report(path, e)
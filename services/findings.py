@@ -0,0 +1,273 @@
+"""
+Columnar storage for the findings of many files.
+
+A batch over a large repository produces hundreds of thousands of issue
+dicts, most of them repeating the same rule codes, messages and pylint
+module names. `FindingsTable` keeps one column per issue field instead:
+strings are interned once and stored as integer ids, numbers go into typed
+arrays, and every row also gets its file, section, rule code and scoring
+weight. Reports are rebuilt as dicts (and, in the agents, as models) only
+where they leave the process; counts and penalties are answered from the
+columns directly.
+"""
+import math
+from array import array
+from collections import Counter
+from itertools import compress
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.scoring import SECTIONS, WEIGHTS, issue_weight, rule_code
+
+_INT_MIN = -(2 ** 63)
+_INT_MAX = 2 ** 63 - 1
+# Stored for None in integer columns (pylint's endLine on module messages).
+_INT_NONE = _INT_MIN
+# Filler for rows whose issue did not have the field; never read back.
+_PAD = object()
+_FILLER = {"s": 0, "q": _INT_NONE, "d": math.nan}
+_ARRAYS = {"s": "i", "q": "q", "d": "d"}
+
+
+class _Strings:
+    """Interned strings; id 0 is None."""
+
+    def __init__(self):
+        self.values: List[Optional[str]] = [None]
+        self.ids: Dict[str, int] = {}
+
+    def id(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        i = self.ids.get(value)
+        if i is None:
+            i = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+
+def _kind(value: Any) -> str:
+    kind = type(value)
+    if kind is int and _INT_MIN < value <= _INT_MAX:
+        return "q"
+    if kind is float and not math.isnan(value):
+        return "d"
+    if kind is str:
+        return "s"
+    return "o"
+
+
+class _Column:
+    """
+    One issue field. Its type is fixed by the first non-None value: ints and
+    floats in typed arrays, strings as ids. A value that does not fit turns
+    the column into a plain list.
+    """
+
+    def __init__(self, strings: _Strings):
+        self.strings = strings
+        self.kind: Optional[str] = None
+        self.data: Any = []
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def pad(self, length: int) -> None:
+        self.data.extend([_FILLER.get(self.kind, _PAD)] * (length - len(self.data)))
+
+    def append(self, value: Any) -> None:
+        kind, type_ = self.kind, type(value)
+        if kind == "s" and type_ is str:
+            self.data.append(self.strings.id(value))
+        elif kind == "q" and type_ is int and _INT_MIN < value <= _INT_MAX:
+            self.data.append(value)
+        elif kind == "d" and type_ is float and not math.isnan(value):
+            self.data.append(value)
+        else:
+            self._append_other(value)
+
+    def _append_other(self, value: Any) -> None:
+        if value is not None:
+            kind = _kind(value)
+            if self.kind is None:
+                self._retype(kind)
+            elif kind != self.kind and self.kind != "o":
+                self._retype("o")
+        elif self.kind == "d":
+            self._retype("o")
+        self._push(value)
+
+    def _push(self, value: Any) -> None:
+        if self.kind in _FILLER and value is _PAD:
+            self.data.append(_FILLER[self.kind])
+        elif self.kind == "s":
+            self.data.append(self.strings.id(value))
+        elif self.kind == "q":
+            self.data.append(_INT_NONE if value is None else value)
+        else:
+            self.data.append(value)
+
+    def get(self, i: int) -> Any:
+        value = self.data[i]
+        if self.kind == "s":
+            return self.strings.values[value]
+        if self.kind == "q" and value == _INT_NONE:
+            return None
+        return value
+
+    def _retype(self, kind: str) -> None:
+        # Only untyped columns (None and padding so far) and typed ones
+        # falling back to a list are converted; padding stays padding.
+        values = self.data if self.kind is None else [self.get(i) for i in range(len(self.data))]
+        if kind == "d" and None in values:
+            kind = "o"
+        self.kind = kind
+        self.data = array(_ARRAYS[kind]) if kind in _ARRAYS else []
+        for value in values:
+            self._push(value)
+
+
+class FindingsTable:
+    """
+    Findings of any number of files, one row per issue.
+
+    `add_report` / `add_section` take the dicts the reviewers return;
+    `report` and `issues` give them back unchanged. `counts` and `penalties`
+    group rows by file, section, rule or any issue field.
+    """
+
+    def __init__(self, weights: Dict[str, Dict[str, float]] = WEIGHTS):
+        self.weights = weights
+        self._strings = _Strings()
+        # Per row: interned file and rule, section index, scoring weight,
+        # and which fields the issue had (an interned tuple of keys).
+        self.file = array("i")
+        self.section = array("B")
+        self.rule = array("i")
+        self.severity = array("d")
+        self._layout = array("i")
+        self._layouts: List[Tuple[str, ...]] = []
+        self._layout_ids: Dict[Tuple[str, ...], int] = {}
+        self._columns: Dict[str, _Column] = {}
+        # (file id, section index) -> row ranges, in insertion order.
+        self._spans: Dict[Tuple[int, int], List[range]] = {}
+        # Every issue of one rule has the same weight.
+        self._weights: Dict[Tuple, float] = {}
+        self.files: Dict[str, None] = {}
+        self.errors: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.file)
+
+    # ---------------- writing ----------------
+
+    def _layout_id(self, keys: Tuple[str, ...]) -> int:
+        i = self._layout_ids.get(keys)
+        if i is None:
+            i = self._layout_ids[keys] = len(self._layouts)
+            self._layouts.append(keys)
+        return i
+
+    def add_section(self, file: str, section: str, report: Dict) -> None:
+        """One reviewer's report (`{"file", "issue_count", "issues"}`) for `file`."""
+        self.files.setdefault(file)
+        file_id = self._strings.id(file)
+        section_index = SECTIONS.index(section)
+        start = len(self)
+        for row, issue in enumerate(report.get("issues") or [], start):
+            code = rule_code(section, issue)
+            weight_key = (section_index, code, issue.get("message-id"), issue.get("type"))
+            weight = self._weights.get(weight_key)
+            if weight is None:
+                weight = self._weights[weight_key] = issue_weight(section, issue, self.weights)
+            self.file.append(file_id)
+            self.section.append(section_index)
+            self.rule.append(self._strings.id(code))
+            self.severity.append(weight)
+            self._layout.append(self._layout_id(tuple(issue)))
+            for key, value in issue.items():
+                column = self._columns.get(key)
+                if column is None:
+                    column = self._columns[key] = _Column(self._strings)
+                if len(column) < row:
+                    column.pad(row)
+                column.append(value)
+        self._spans.setdefault((file_id, section_index), []).append(range(start, len(self)))
+
+    def add_report(self, report: Dict) -> None:
+        """A combined report: `{"file", "style": {...}, "correctness": {...}, ...}`."""
+        for section in SECTIONS:
+            if section in report:
+                self.add_section(report["file"], section, report[section])
+
+    def add_result(self, result: Dict) -> None:
+        """A batch result line: its report, or its error."""
+        if "error" in result:
+            self.files.setdefault(result["file"])
+            self.errors[result["file"]] = result["error"]
+        else:
+            self.add_report({**result["report"], "file": result["file"]})
+
+    # ---------------- reading ----------------
+
+    def _issue(self, row: int) -> Dict:
+        issue = {}
+        for key in self._layouts[self._layout[row]]:
+            issue[key] = self._columns[key].get(row)
+        return issue
+
+    def _rows(self, file: Optional[str] = None, section: Optional[str] = None) -> Iterable[int]:
+        if file is None:
+            if section is None:
+                return range(len(self))
+            wanted = SECTIONS.index(section)
+            return compress(range(len(self)), (s == wanted for s in self.section))
+        file_id = self._strings.ids.get(file)
+        sections = SECTIONS if section is None else (section,)
+        return [row for s in sections for span in self._spans.get((file_id, SECTIONS.index(s)), ()) for row in span]
+
+    def issues(self, file: str, section: str) -> List[Dict]:
+        return [self._issue(row) for row in self._rows(file, section)]
+
+    def report(self, file: str) -> Dict:
+        """The combined report for `file`, as `static_review` returns it."""
+        report: Dict[str, Any] = {"file": file}
+        for section in SECTIONS:
+            issues = self.issues(file, section)
+            report[section] = {"file": file, "issue_count": len(issues), "issues": issues}
+        return report
+
+    def _group(self, by: str) -> Tuple[Any, Any]:
+        """The column to group on and how to decode its values."""
+        if by == "section":
+            return self.section, SECTIONS.__getitem__
+        if by in ("file", "rule"):
+            return getattr(self, by), self._strings.values.__getitem__
+        column = self._columns[by]
+        # Rows whose issue had no such field count as None.
+        values = [None] * len(self)
+        for row in range(len(self)):
+            if by in self._layouts[self._layout[row]]:
+                values[row] = column.get(row)
+        return values, lambda v: v
+
+    def counts(self, by: str = "rule", file: Optional[str] = None, section: Optional[str] = None) -> Counter:
+        """Issues per value of `by` (file, section, rule or any issue field)."""
+        column, decode = self._group(by)
+        counted = Counter(column[row] for row in self._rows(file, section))
+        return Counter({decode(value): n for value, n in counted.items()})
+
+    def penalties(self, by: str = "file", file: Optional[str] = None, section: Optional[str] = None) -> Dict[Any, float]:
+        """Summed scoring weight per value of `by`."""
+        column, decode = self._group(by)
+        totals: Dict[Any, float] = {}
+        for row in self._rows(file, section):
+            key = column[row]
+            totals[key] = totals.get(key, 0.0) + self.severity[row]
+        return {decode(key): total for key, total in totals.items()}
+
+    def nbytes(self) -> int:
+        """Approximate size of the columns (interned strings excluded)."""
+        arrays = [self.file, self.section, self.rule, self.severity, self._layout]
+        arrays += [c.data for c in self._columns.values() if isinstance(c.data, array)]
+        lists = sum(8 * len(c.data) for c in self._columns.values() if not isinstance(c.data, array))
+        return sum(a.itemsize * len(a) for a in arrays) + lists
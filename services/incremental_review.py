@@ -0,0 +1,92 @@
+import os
+from typing import Dict, List, Optional
+
+from memory.review_cache import ReviewCache, content_key
+from services.state import review_cache
+from services.ast_analysis import LineRanges, in_ranges
+from services.context_builder import context_excerpt
+from services.source_file import SourceFile
+from services.static_review import SECTIONS, format_report, static_fingerprint, static_review
+from tools.parse_diff import changed_lines, line_window, map_old_line, reconstruct_original
+
+DEFAULT_CONTEXT = int(os.getenv("INCREMENTAL_CONTEXT_LINES", "3"))
+
+
+def baseline_key(content: bytes, fingerprint: str) -> str:
+    """
+    Cache key of the full report an incremental review leaves behind. Kept
+    apart from the API's static-mode entries, which are formatted for the
+    uploaded file name.
+    """
+    return content_key(content, f"incremental:{fingerprint}")
+
+
+def _carry_over(issues: List[dict], hunks: List[dict], ranges: LineRanges) -> List[dict]:
+    """Baseline findings on unchanged lines, moved to their new line numbers."""
+    carried = []
+    for issue in issues:
+        line = issue.get("line")
+        new_line = map_old_line(hunks, line) if line else None
+        if new_line is None or in_ranges(new_line, ranges):
+            continue
+        carried.append({**issue, "line": new_line})
+    return carried
+
+
+def _section(path: str, issues: List[dict]) -> Dict:
+    issues = sorted(issues, key=lambda i: (-i.get("cost", 0), i.get("line") or 0))
+    return {"file": path, "issue_count": len(issues), "issues": issues}
+
+
+def incremental_review(
+    path: str,
+    hunks: List[dict],
+    context: int = DEFAULT_CONTEXT,
+    cache: Optional[ReviewCache] = None,
+) -> Dict:
+    """
+    Review only the lines a diff touched, plus `context` lines around them.
+
+    The pre-image is rebuilt from the diff and looked up in the review cache.
+    On a hit, only the changed window is analyzed and every other finding is
+    carried over from that baseline with its line number shifted. On a miss
+    the whole file is analyzed once and becomes the baseline for the next diff.
+    """
+    cache = cache or review_cache()
+    fingerprint = static_fingerprint()
+
+    # Read once; the linters get the file itself and the AST scans this copy.
+    src = SourceFile.from_path(path)
+
+    ranges = line_window(changed_lines(hunks), context)
+    original = reconstruct_original(src.text, hunks).encode("utf-8")
+    # A static review of the pre-image is as good a baseline as our own.
+    baseline = cache.get(baseline_key(original, fingerprint)) or cache.get(content_key(original, fingerprint))
+
+    reused = 0
+    if baseline is None:
+        full = static_review(src)
+    else:
+        fresh = static_review(src, ranges)
+        full = {"file": path}
+        for section in SECTIONS:
+            carried = _carry_over(baseline["report"][section]["issues"], hunks, ranges)
+            reused += len(carried)
+            full[section] = _section(path, fresh[section]["issues"] + carried)
+
+    cache.put(baseline_key(src.data, fingerprint), {"review": format_report(full), "report": full})
+
+    report = {"file": path}
+    for section in SECTIONS:
+        issues = [i for i in full[section]["issues"] if i.get("line") and in_ranges(i["line"], ranges)]
+        report[section] = _section(path, issues)
+
+    return {
+        "file": path,
+        "ranges": ranges,
+        "baseline_hit": baseline is not None,
+        "reused_findings": reused,
+        "report": report,
+        "full_report": full,
+        "context": context_excerpt(src.text, ranges),
+    }
@@ -0,0 +1,283 @@
+import asyncio
+import concurrent.futures
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional
+
+WORKERS = int(os.getenv("REVIEW_WORKERS", "4"))
+MAX_DEPTH = int(os.getenv("REVIEW_QUEUE_DEPTH", "100"))
+MAX_TENANT_DEPTH = int(os.getenv("REVIEW_TENANT_QUEUE_DEPTH", "20"))
+MAX_FINISHED = int(os.getenv("REVIEW_FINISHED_JOBS", "1000"))
+# Records a streaming job may emit ahead of its reader before it waits.
+STREAM_BUFFER = int(os.getenv("REVIEW_STREAM_BUFFER", "100"))
+
+TERMINAL = ("done", "failed", "cancelled")
+
+
+class QueueFull(Exception):
+    """Raised by `submit` when the queue (or the tenant's share of it) is full."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class Job:
+    id: str
+    tenant: str
+    payload: Dict[str, Any]
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    # Streaming jobs only: what the handler emits, read by the request that submitted it.
+    records: Optional[asyncio.Queue] = field(default=None, repr=False)
+
+    async def emit(self, record: dict) -> None:
+        if self.records is not None:
+            await self.records.put(record)
+
+    def emit_from_thread(self, record: dict, loop: asyncio.AbstractEventLoop) -> bool:
+        """`emit` for a handler's worker thread; False once the job has finished or been cancelled."""
+        sent = asyncio.run_coroutine_threadsafe(self.emit(record), loop)
+        while not self.done.is_set():
+            try:
+                sent.result(timeout=1)
+                return True
+            except concurrent.futures.TimeoutError:
+                continue
+        sent.cancel()
+        return False
+
+    async def stream(self) -> AsyncIterator[dict]:
+        """The emitted records as they come, until the job finishes."""
+        finished = asyncio.ensure_future(self.done.wait())
+        record = None
+        try:
+            while True:
+                record = asyncio.ensure_future(self.records.get())
+                await asyncio.wait((record, finished), return_when=asyncio.FIRST_COMPLETED)
+                if not record.done():
+                    break
+                yield record.result()
+            while not self.records.empty():
+                yield self.records.get_nowait()
+        finally:
+            finished.cancel()
+            if record is not None:
+                record.cancel()
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "tenant": self.tenant,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """
+    In-process review queue with bounded concurrency.
+
+    Each tenant has its own FIFO and workers take tenants round-robin, so one
+    tenant's burst cannot starve the others. `submit` refuses new work once
+    the queue or the tenant's share is full instead of growing without bound.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Job], Awaitable[dict]],
+        workers: int = WORKERS,
+        max_depth: int = MAX_DEPTH,
+        max_tenant_depth: int = MAX_TENANT_DEPTH,
+        max_finished: int = MAX_FINISHED,
+        store=None,
+    ):
+        self.handler = handler
+        # A services.state.JobStore: every status change is published there,
+        # so other worker processes can look the job up.
+        self.store = store
+        self.workers = workers
+        self.max_depth = max_depth
+        self.max_tenant_depth = max_tenant_depth
+        self.max_finished = max_finished
+
+        self._queues: Dict[str, Deque[Job]] = {}
+        self._tenants: Deque[str] = deque()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._depth = 0
+        self._running = 0
+        self._avg_seconds = 10.0
+        self._wakeup: Optional[asyncio.Semaphore] = None
+        self._workers: list = []
+        self._stopping = False
+        # Snapshots waiting to be written to the store, in order.
+        self._outbox: Optional[asyncio.Queue] = None
+        self._publisher: Optional[asyncio.Task] = None
+        self._publish_errors = 0
+
+    # ---------------- lifecycle ----------------
+
+    async def start(self) -> None:
+        self._stopping = False
+        self._wakeup = asyncio.Semaphore(0)
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        if self.store is not None:
+            self._outbox = asyncio.Queue()
+            self._publisher = asyncio.create_task(self._publish_all())
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._publisher is not None:
+            # The final statuses of the jobs just cancelled are written too.
+            await self._outbox.join()
+            self._publisher.cancel()
+            self._publisher = None
+
+    # ---------------- public API ----------------
+
+    def retry_after(self) -> int:
+        """Rough seconds until a slot frees up, for the Retry-After header."""
+        backlog = self._depth + self._running
+        return max(1, round(self._avg_seconds * backlog / max(self.workers, 1)))
+
+    def submit(self, tenant: str, payload: Dict[str, Any], stream: bool = False) -> Job:
+        """
+        Queues `payload` for the handler. A `stream` job also buffers the
+        records its handler emits; read them with `Job.stream`.
+        """
+        if self._depth >= self.max_depth:
+            raise QueueFull("Review queue is full.", self.retry_after())
+        if len(self._queues.get(tenant, ())) >= self.max_tenant_depth:
+            raise QueueFull(f"Too many queued reviews for tenant '{tenant}'.", self.retry_after())
+
+        job = Job(id=uuid.uuid4().hex, tenant=tenant, payload=payload)
+        if stream:
+            job.records = asyncio.Queue(STREAM_BUFFER)
+        self._jobs[job.id] = job
+        if tenant not in self._queues:
+            self._queues[tenant] = deque()
+            self._tenants.append(tenant)
+        self._queues[tenant].append(job)
+        self._depth += 1
+        self._wakeup.release()
+        self._publish(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None or job.status in TERMINAL:
+            return job
+
+        if job.status == "queued":
+            queue = self._queues[job.tenant]
+            queue.remove(job)
+            self._depth -= 1
+            if not queue:
+                del self._queues[job.tenant]
+                self._tenants.remove(job.tenant)
+            self._finish(job, "cancelled")
+        elif job.task is not None:
+            job.task.cancel()
+        return job
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._depth,
+            "running": self._running,
+            "workers": self.workers,
+            "tenants": {t: len(q) for t, q in self._queues.items()},
+            "publish_errors": self._publish_errors,
+        }
+
+    # ---------------- internals ----------------
+
+    def _publish(self, job: Job) -> None:
+        # A snapshot now; the store is written off the event loop.
+        if self._outbox is not None:
+            self._outbox.put_nowait(job.to_dict())
+
+    async def _publish_all(self) -> None:
+        """Writes snapshots to the store one at a time, so a job's last status is the one kept."""
+        while True:
+            record = await self._outbox.get()
+            try:
+                await asyncio.to_thread(self.store.publish, record)
+            except Exception:
+                # Other workers see a stale status; this worker's own answers are unaffected.
+                self._publish_errors += 1
+            finally:
+                self._outbox.task_done()
+
+    def _next(self) -> Optional[Job]:
+        if not self._tenants:
+            return None
+        tenant = self._tenants.popleft()
+        queue = self._queues[tenant]
+        job = queue.popleft()
+        if queue:
+            self._tenants.append(tenant)
+        else:
+            del self._queues[tenant]
+        self._depth -= 1
+        return job
+
+    def _finish(self, job: Job, status: str) -> None:
+        job.status = status
+        job.finished_at = time.time()
+        job.payload = {}
+        job.done.set()
+        self._publish(job)
+
+        finished = [j for j in self._jobs.values() if j.status in TERMINAL]
+        for old in finished[: max(0, len(finished) - self.max_finished)]:
+            del self._jobs[old.id]
+
+    async def _work(self) -> None:
+        while True:
+            await self._wakeup.acquire()
+            job = self._next()
+            if job is None:
+                # The job this wakeup was for got cancelled while queued.
+                continue
+
+            job.status = "running"
+            job.started_at = time.time()
+            self._publish(job)
+            self._running += 1
+            job.task = asyncio.create_task(self.handler(job))
+            try:
+                job.result = await job.task
+                self._finish(job, "done")
+            except asyncio.CancelledError:
+                job.task.cancel()
+                self._finish(job, "cancelled")
+                if self._stopping:
+                    raise
+            except Exception as e:
+                job.error = str(e)
+                self._finish(job, "failed")
+            finally:
+                self._running -= 1
+                elapsed = job.finished_at - job.started_at
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
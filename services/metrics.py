@@ -0,0 +1,265 @@
+"""
+Process-wide review metrics, exposed in Prometheus' text format.
+
+Stages (services, linters, retry-loop states, memory I/O) are timed with
+`timed(stage)`; agents, model calls and tools are timed by the ADK
+callbacks in `agents/instrumentation.py`; the AST engine reports the time
+each rule spent on a file. Inside `request_timings()` every observation is
+also summed into a per-request breakdown.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Per-rule timing costs two clock reads per rule check; METRICS_RULE_TIMING=0 skips it.
+RULE_TIMING = os.getenv("METRICS_RULE_TIMING", "1") != "0"
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+RULE_BUCKETS = (0.00001, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5)
+
+# usage_metadata fields counted per model call, by `kind` label.
+TOKEN_FIELDS = (("prompt", "prompt_token_count"), ("output", "candidates_token_count"), ("total", "total_token_count"))
+
+LabelValues = Tuple[str, ...]
+
+_timings: ContextVar[Optional[Dict[str, Dict[str, float]]]] = ContextVar("review_timings", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Per label set: [count per bucket..., sum, count]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def totals(self) -> Dict[LabelValues, Tuple[float, int]]:
+        """(sum, count) per label set."""
+        with self._lock:
+            return {k: (v[-2], v[-1]) for k, v in self._values.items()}
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = []
+        for key, row in items:
+            for bound, count in zip(self.buckets, row):
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(row[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {row[-1]}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Read at scrape time from `read`, which returns {label values: value}."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], read: Callable[[], Dict[LabelValues, float]]):
+        super().__init__(name, help, labelnames)
+        self.read = read
+
+    def samples(self) -> List[str]:
+        try:
+            values = self.read()
+        except Exception:
+            return []
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in sorted(values.items())]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            # Re-registering (e.g. a second app instance) replaces the reader.
+            if metric.name in self._metrics and not isinstance(metric, Gauge):
+                return self._metrics[metric.name]
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str], read: Callable[[], Dict[LabelValues, float]]) -> Gauge:
+        return self._add(Gauge(name, help, labelnames, read))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "review_stage_seconds", "Wall time of one pipeline stage.", ("stage",))
+RULE_SECONDS = REGISTRY.histogram(
+    "review_rule_seconds", "Time one AST rule spent on one file.", ("category", "rule"), RULE_BUCKETS)
+AGENT_SECONDS = REGISTRY.histogram(
+    "review_agent_seconds", "Wall time of one agent run, including its sub-agents and tools.", ("agent",))
+MODEL_SECONDS = REGISTRY.histogram(
+    "review_model_seconds", "Latency of one model call.", ("agent",))
+TOOL_SECONDS = REGISTRY.histogram(
+    "review_tool_seconds", "Wall time of one tool call made by an agent.", ("tool",))
+MODEL_TOKENS = REGISTRY.counter(
+    "review_model_tokens_total", "Tokens used by model calls.", ("agent", "kind"))
+CACHE_LOOKUPS = REGISTRY.counter(
+    "review_cache_lookups_total", "Cache lookups by cache and result (hit or miss).", ("cache", "result"))
+
+
+# --------------------------------------------------
+# RECORDING
+# --------------------------------------------------
+
+def _note(key: str, seconds: float, tokens: int = 0) -> None:
+    timings = _timings.get()
+    if timings is not None:
+        entry = timings.setdefault(key, {"seconds": 0.0, "calls": 0})
+        entry["seconds"] += seconds
+        entry["calls"] += 1
+        if tokens:
+            entry["tokens"] = entry.get("tokens", 0) + tokens
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    _note(stage, seconds)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def observe_agent(agent: str, seconds: float) -> None:
+    AGENT_SECONDS.observe(seconds, agent=agent)
+    _note(f"agent:{agent}", seconds)
+
+
+def observe_model(agent: str, seconds: float, usage=None) -> None:
+    MODEL_SECONDS.observe(seconds, agent=agent)
+    for kind, field in TOKEN_FIELDS:
+        count = getattr(usage, field, None) if usage is not None else None
+        if count:
+            MODEL_TOKENS.inc(count, agent=agent, kind=kind)
+    _note(f"model:{agent}", seconds, getattr(usage, "total_token_count", None) or 0)
+
+
+def observe_tool(tool: str, seconds: float) -> None:
+    TOOL_SECONDS.observe(seconds, tool=tool)
+    _note(f"tool:{tool}", seconds)
+
+
+def observe_rules(rule_seconds: Dict[Tuple[str, str], float]) -> None:
+    """`{(category, rule): seconds}` for one analyzed file."""
+    for (category, rule), seconds in rule_seconds.items():
+        RULE_SECONDS.observe(seconds, category=category, rule=rule)
+
+
+def cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+@contextmanager
+def request_timings() -> Iterator[Dict[str, Dict[str, float]]]:
+    """Collects every stage observed in this context (and tasks/threads it starts)."""
+    timings: Dict[str, Dict[str, float]] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def format_timings(timings: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    return {
+        key: {**entry, "seconds": round(entry["seconds"], 4)}
+        for key, entry in sorted(timings.items(), key=lambda kv: -kv[1]["seconds"])
+    }
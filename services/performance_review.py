@@ -1,30 +1,17 @@
-import re
-from typing import Dict
+import asyncio
+from typing import Dict, Optional, Union
 
+from services.ast_analysis import LineRanges, category_report
+from services.source_file import SourceFile
 
-def performance_review(path: str) -> Dict:
-    patterns = {
-        "inefficient loop append": r"\.append\(",
-        "string concat in loop": r"\+=\s*\"",
-        "nested loop": r"for .*:\s*\n\s*for",
-    }
 
-    issues = []
+def performance_review(path: Union[str, SourceFile], ranges: Optional[LineRanges] = None) -> Dict:
+    """Static scan for common performance smells."""
 
-    with open(path, "r") as f:
-        lines = f.readlines()
+    return category_report(path, "performance", ranges)
 
-    for i, line in enumerate(lines, start=1):
-        for msg, pat in patterns.items():
-            if re.search(pat, line):
-                issues.append({
-                    "issue": msg,
-                    "line": i,
-                    "code": line.strip()
-                })
 
-    return {
-        "file": path,
-        "issue_count": len(issues),
-        "issues": issues,
-    }
+async def performance_review_async(path: Union[str, SourceFile], ranges: Optional[LineRanges] = None) -> Dict:
+    """`performance_review` on a worker thread, off the event loop."""
+
+    return await asyncio.to_thread(performance_review, path, ranges)
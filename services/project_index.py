@@ -0,0 +1,313 @@
+"""
+Persistent index of a repository's static findings, for batch runs.
+
+Every reviewed file keeps a row with its size, mtime, content hash, the
+modules it imports and its last static report. A new run over the same
+root then:
+
+* serves files whose content and analyzer fingerprint did not change
+  straight from the index,
+* reviews new and edited files in full,
+* re-runs only pylint on unchanged files that import an edited, added or
+  deleted module, since pylint's cross-module checks (missing members,
+  call signatures, import errors) depend on the modules a file imports.
+  Their style, security and performance findings are reused.
+
+Files to review again are marked dirty in the database while planning, in
+the same transaction that drops deleted files, and the mark is only
+cleared when their new report is recorded. A run that is interrupted, or
+that covers only some of the paths, leaves them dirty for the next one.
+
+Module names follow the package layout (walking up while `__init__.py`
+exists), as pylint resolves them; relative imports are resolved against it.
+"""
+import ast
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from services.metrics import timed
+from services.source_file import SourceFile
+from services.state import STATE_DIR
+from services.static_review import static_fingerprint
+
+PROJECT_INDEX = os.getenv("PROJECT_INDEX", os.path.join(STATE_DIR, "project_index.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    root TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    report TEXT NOT NULL,
+    PRIMARY KEY (root, path)
+);
+CREATE TABLE IF NOT EXISTS imports (
+    root TEXT NOT NULL,
+    path TEXT NOT NULL,
+    module TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS imports_module ON imports (root, module);
+CREATE INDEX IF NOT EXISTS imports_path ON imports (root, path);
+CREATE TABLE IF NOT EXISTS dirty (
+    root TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (root, path)
+);
+"""
+
+# SQLite's default limit on bound parameters is 999.
+_CHUNK = 500
+
+
+# --------------------------------------------------
+# IMPORT GRAPH
+# --------------------------------------------------
+
+@lru_cache(maxsize=4096)
+def _is_package(directory: str) -> bool:
+    return os.path.isfile(os.path.join(directory, "__init__.py"))
+
+
+def module_name(path: str) -> str:
+    """'pkg.sub.mod' for pkg/sub/mod.py, walking up while directories are packages."""
+    directory, base = os.path.split(os.path.abspath(path))
+    parts = [] if base == "__init__.py" else [base[:-3]]
+    while _is_package(directory):
+        directory, name = os.path.split(directory)
+        parts.append(name)
+    return ".".join(reversed(parts))
+
+
+def _prefixes(name: str) -> Iterable[str]:
+    # `import a.b.c` also imports the packages a and a.b.
+    parts = name.split(".")
+    return (".".join(parts[:i]) for i in range(1, len(parts) + 1))
+
+
+def file_imports(src: SourceFile, module: str) -> List[str]:
+    """Absolute names of every module `src` imports, with their parent packages."""
+    tree = src.tree
+    if tree is None:
+        return []
+    package = module if os.path.basename(src.name) == "__init__.py" else module.rpartition(".")[0]
+
+    names: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            bases = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                parts = package.split(".") if package else []
+                keep = len(parts) - (node.level - 1)
+                if keep < 0:
+                    continue
+                base = ".".join(parts[:keep] + ([base] if base else []))
+            imported = [alias.name for alias in node.names if alias.name != "*"]
+            bases = ([base] + [f"{base}.{n}" for n in imported]) if base else imported
+        else:
+            continue
+        for name in bases:
+            names.update(_prefixes(name))
+
+    # The standard library does not change between runs.
+    return sorted(n for n in names if n.split(".")[0] not in sys.stdlib_module_names)
+
+
+# --------------------------------------------------
+# INDEX
+# --------------------------------------------------
+
+@dataclass
+class IndexPlan:
+    """What a run has to do for each requested path."""
+    # Unchanged files and their stored reports.
+    fresh: Dict[str, dict] = field(default_factory=dict)
+    # New or edited files: full review.
+    changed: List[str] = field(default_factory=list)
+    # Unchanged files importing a changed module, now or in an earlier run
+    # that did not record them: pylint again, the rest reused.
+    dependents: Dict[str, dict] = field(default_factory=dict)
+    # Indexed files that no longer exist; already dropped from the index.
+    deleted: List[str] = field(default_factory=list)
+    # (size, mtime_ns) seen while planning, stored with the new report.
+    stats: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+
+
+class ProjectIndex:
+    """The index for one repository root, stored in a SQLite file shared by all roots."""
+
+    def __init__(self, root: str = ".", fingerprint: Optional[str] = None, path: str = PROJECT_INDEX):
+        self.root = os.path.abspath(root)
+        self.fingerprint = fingerprint or static_fingerprint()
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Batch streams are consumed from whichever thread serves the response.
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def key(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.root)
+
+    def _stat(self, path: str) -> Tuple[int, int]:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+
+    def plan(self, paths: Iterable[str]) -> IndexPlan:
+        """
+        Sorts `paths` into fresh, changed and dependent files. A file whose
+        size and mtime match its row is not read; otherwise its hash decides.
+        Changed files and every importer of a changed or deleted module are
+        marked dirty before this returns, requested or not.
+        """
+        plan = IndexPlan()
+        with timed("index:plan"), self._lock:
+            rows = {
+                path: (size, mtime_ns, sha256, fingerprint)
+                for path, size, mtime_ns, sha256, fingerprint in self._conn.execute(
+                    "SELECT path, size, mtime_ns, sha256, fingerprint FROM files WHERE root = ?", (self.root,)
+                )
+            }
+
+            unchanged: Dict[str, str] = {}
+            touched: List[Tuple[int, int, str]] = []
+            for path in paths:
+                key = self.key(path)
+                stat = plan.stats[path] = self._stat(path)
+                row = rows.get(key)
+                if row is None or row[3] != self.fingerprint:
+                    plan.changed.append(path)
+                elif stat == row[:2]:
+                    unchanged[key] = path
+                elif SourceFile.from_path(path).sha256 == row[2]:
+                    # Checked out or touched again with the same content.
+                    unchanged[key] = path
+                    touched.append((*stat, key))
+                else:
+                    plan.changed.append(path)
+
+            for key in rows:
+                if not os.path.isfile(os.path.join(self.root, key)):
+                    plan.deleted.append(key)
+
+            modules = self._changed_modules(plan.changed, plan.deleted)
+            stale = self._importers(modules) - set(plan.deleted)
+            stale.update(self.key(path) for path in plan.changed)
+            self._conn.execute("BEGIN")
+            try:
+                self._drop(plan.deleted)
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO dirty (root, path) VALUES (?, ?)",
+                    [(self.root, key) for key in sorted(stale)],
+                )
+                if touched:
+                    self._conn.executemany(
+                        "UPDATE files SET size = ?, mtime_ns = ? WHERE root = ? AND path = ?",
+                        [(size, mtime_ns, self.root, key) for size, mtime_ns, key in touched],
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+            dirty = {row[0] for row in self._conn.execute("SELECT path FROM dirty WHERE root = ?", (self.root,))}
+            dependents = dirty & unchanged.keys()
+            for key, report in self._reports(unchanged.keys()):
+                path = unchanged[key]
+                if key in dependents:
+                    plan.dependents[path] = report
+                else:
+                    plan.fresh[path] = report
+        return plan
+
+    def _changed_modules(self, changed: List[str], deleted: List[str]) -> Set[str]:
+        modules = set()
+        for path in list(changed) + [os.path.join(self.root, key) for key in deleted]:
+            modules.add(module_name(path))
+            # Scripts run from the root import each other by root-relative name too.
+            relative = self.key(path)[:-3].replace(os.sep, ".")
+            modules.add(relative[:-len(".__init__")] if relative.endswith(".__init__") else relative)
+        return modules
+
+    def _importers(self, modules: Set[str]) -> Set[str]:
+        modules = sorted(modules)
+        found = set()
+        for i in range(0, len(modules), _CHUNK):
+            chunk = modules[i:i + _CHUNK]
+            marks = ",".join("?" * len(chunk))
+            found.update(row[0] for row in self._conn.execute(
+                f"SELECT DISTINCT path FROM imports WHERE root = ? AND module IN ({marks})",
+                (self.root, *chunk),
+            ))
+        return found
+
+    def _reports(self, keys: Iterable[str]) -> Iterable[Tuple[str, dict]]:
+        keys = sorted(keys)
+        for i in range(0, len(keys), _CHUNK):
+            chunk = keys[i:i + _CHUNK]
+            marks = ",".join("?" * len(chunk))
+            for key, report in self._conn.execute(
+                f"SELECT path, report FROM files WHERE root = ? AND path IN ({marks})",
+                (self.root, *chunk),
+            ):
+                yield key, json.loads(report)
+
+    def _drop(self, keys: List[str]) -> None:
+        for key in keys:
+            self._conn.execute("DELETE FROM files WHERE root = ? AND path = ?", (self.root, key))
+            self._conn.execute("DELETE FROM imports WHERE root = ? AND path = ?", (self.root, key))
+            self._conn.execute("DELETE FROM dirty WHERE root = ? AND path = ?", (self.root, key))
+
+    def record(
+        self,
+        path: str,
+        stat: Tuple[int, int],
+        sha256: str,
+        report: dict,
+        imports: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Stores a file's new report and clears its dirty mark. `stat` is the
+        one taken while planning, so an edit made during the review is picked
+        up by the next run. `imports` None keeps the stored ones (only pylint
+        was re-run).
+        """
+        key = self.key(path)
+        with timed("index:record"), self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO files "
+                    "(root, path, size, mtime_ns, sha256, fingerprint, updated_at, report) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.root, key, *stat, sha256, self.fingerprint, time.time(), json.dumps(report)),
+                )
+                if imports is not None:
+                    self._conn.execute("DELETE FROM imports WHERE root = ? AND path = ?", (self.root, key))
+                    self._conn.executemany(
+                        "INSERT INTO imports (root, path, module) VALUES (?, ?, ?)",
+                        [(self.root, key, module) for module in imports],
+                    )
+                self._conn.execute("DELETE FROM dirty WHERE root = ? AND path = ?", (self.root, key))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
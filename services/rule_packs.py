@@ -0,0 +1,251 @@
+"""
+Declarative rule packs for the AST analyzer.
+
+A pack is a list of rules that match calls or imports by their qualified
+name (`subprocess.Popen`, `yaml.load`, `tempfile.*`), optionally only when
+some keyword arguments have given constant values (`shell = true`). Packs
+come from:
+
+* `builtin`: `services/packs/builtin.toml`,
+* `bandit`: bandit's call and import blacklists, when bandit is installed,
+* any `.toml`, `.yaml` or `.yml` file (or directory of them).
+
+Every enabled pack is compiled into one `PackMatcher`: a dict lookup per
+call or import, so scan time does not grow with the number of rules.
+"""
+import ast
+import glob
+import hashlib
+import json
+import os
+import tomllib
+from dataclasses import asdict, dataclass
+from functools import cached_property, lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+BUILTIN_PACK = os.path.join(os.path.dirname(__file__), "packs", "builtin.toml")
+
+# Comma-separated pack names or paths, in priority order.
+RULE_PACKS = os.getenv("SECURITY_RULE_PACKS", "builtin,bandit")
+LEVELS = ("LOW", "MEDIUM", "HIGH")
+# Rules below this level are not loaded.
+MIN_LEVEL = os.getenv("SECURITY_MIN_LEVEL", "MEDIUM").upper()
+
+
+class RulePackError(ValueError):
+    """A pack file that cannot be read or has an invalid rule."""
+
+
+@dataclass(frozen=True)
+class PackRule:
+    pack: str
+    id: str
+    issue: str
+    category: str = "security"
+    level: str = "MEDIUM"
+    calls: Tuple[str, ...] = ()
+    imports: Tuple[str, ...] = ()
+    # Keyword arguments a matching call must pass, with these constant values.
+    kwargs: Tuple[Tuple[str, Any], ...] = ()
+    cost: Optional[float] = None
+
+
+# --------------------------------------------------
+# LOADING
+# --------------------------------------------------
+
+def _rule(pack: str, index: int, data: dict) -> PackRule:
+    if not isinstance(data, dict) or not data.get("issue"):
+        raise RulePackError(f"{pack}: rule {index} needs an 'issue'")
+    if not data.get("calls") and not data.get("imports"):
+        raise RulePackError(f"{pack}: rule {data['issue']!r} needs 'calls' or 'imports'")
+    level = str(data.get("level", "MEDIUM")).upper()
+    if level not in LEVELS:
+        raise RulePackError(f"{pack}: rule {data['issue']!r} has unknown level {level!r}")
+    return PackRule(
+        pack=pack,
+        id=str(data.get("id") or data["issue"]),
+        issue=data["issue"],
+        category=data.get("category", "security"),
+        level=level,
+        calls=tuple(data.get("calls", ())),
+        imports=tuple(data.get("imports", ())),
+        kwargs=tuple(sorted((data.get("kwargs") or {}).items())),
+        cost=data.get("cost"),
+    )
+
+
+def _read_yaml(path: str) -> dict:
+    try:
+        import yaml  # installed with bandit
+    except ImportError as e:
+        raise RulePackError(f"{path}: YAML packs need PyYAML") from e
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            return yaml.safe_load(f) or {}
+        except yaml.YAMLError as e:
+            raise RulePackError(f"{path}: {e}") from e
+
+
+def _read(path: str) -> dict:
+    try:
+        if path.endswith(".toml"):
+            with open(path, "rb") as f:
+                return tomllib.load(f)
+        return _read_yaml(path)
+    except RulePackError:
+        raise
+    except (OSError, ValueError) as e:
+        raise RulePackError(f"{path}: {e}") from e
+
+
+def load_pack_file(path: str) -> List[PackRule]:
+    """Rules from one TOML/YAML pack: a top-level `rules` list and an optional `name`."""
+    data = _read(path)
+    name = data.get("name") or os.path.splitext(os.path.basename(path))[0]
+    return [_rule(name, i, r) for i, r in enumerate(data.get("rules", []))]
+
+
+def bandit_pack() -> List[PackRule]:
+    """bandit's call and import blacklists (B3xx/B4xx) as pack rules; empty without bandit."""
+    try:
+        from bandit.blacklists import calls, imports
+    except ImportError:
+        return []
+
+    rules = []
+    for kind, blacklist in (("calls", calls.gen_blacklist()), ("imports", imports.gen_blacklist())):
+        for node_type, entries in blacklist.items():
+            # The import blacklist repeats itself for ImportFrom and Call(__import__).
+            if kind == "imports" and node_type != "Import":
+                continue
+            for entry in entries:
+                rules.append(PackRule(
+                    pack="bandit",
+                    id=entry["id"],
+                    issue=f"{entry['name']} ({entry['id']})",
+                    level=entry["level"],
+                    **{kind: tuple(entry["qualnames"])},
+                ))
+    return rules
+
+
+def _pack_paths(entry: str) -> List[str]:
+    if os.path.isdir(entry):
+        return sorted(p for ext in ("toml", "yaml", "yml") for p in glob.glob(os.path.join(entry, f"*.{ext}")))
+    return [entry]
+
+
+def load_packs(packs: Iterable[str]) -> List[PackRule]:
+    """Rules of every named pack ('builtin', 'bandit' or a path), in order."""
+    rules = []
+    for entry in packs:
+        entry = entry.strip()
+        if not entry:
+            continue
+        if entry == "builtin":
+            rules += load_pack_file(BUILTIN_PACK)
+        elif entry == "bandit":
+            rules += bandit_pack()
+        else:
+            for path in _pack_paths(entry):
+                rules += load_pack_file(path)
+    return rules
+
+
+# --------------------------------------------------
+# MATCHING
+# --------------------------------------------------
+
+def _prefixes(name: str) -> Iterator[str]:
+    """'a.b.c', then 'a.b.*', then 'a.*': every key a pattern for `name` may use."""
+    yield name
+    parts = name.split(".")
+    for i in range(len(parts) - 1, 0, -1):
+        yield ".".join(parts[:i]) + ".*"
+
+
+def qualified_name(node: ast.AST, imports: Dict[str, str]) -> Optional[str]:
+    """`sp.Popen` -> 'subprocess.Popen' after `import subprocess as sp`."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(imports.get(node.id, node.id))
+    return ".".join(reversed(parts))
+
+
+def _kwargs_match(node: ast.Call, wanted: Tuple[Tuple[str, Any], ...]) -> bool:
+    given = {k.arg: k.value for k in node.keywords if k.arg}
+    for name, value in wanted:
+        arg = given.get(name)
+        if not isinstance(arg, ast.Constant) or arg.value != value:
+            return False
+    return True
+
+
+class PackMatcher:
+    """Every pack rule compiled into one lookup table per node kind."""
+
+    node_types = (ast.Call, ast.Import, ast.ImportFrom)
+
+    def __init__(self, rules: Iterable[PackRule], min_level: str = MIN_LEVEL):
+        floor = LEVELS.index(min_level) if min_level in LEVELS else 0
+        self.rules = [r for r in rules if LEVELS.index(r.level) >= floor]
+        self.calls: Dict[str, List[PackRule]] = {}
+        self.imports: Dict[str, List[PackRule]] = {}
+        for r in self.rules:
+            for pattern in r.calls:
+                self._add(self.calls, pattern, r)
+            for pattern in r.imports:
+                # A module pattern also covers its submodules.
+                self._add(self.imports, pattern, r)
+                self._add(self.imports, pattern + ".*", r)
+
+    @staticmethod
+    def _add(table: Dict[str, List[PackRule]], pattern: str, r: PackRule) -> None:
+        entries = table.setdefault(pattern, [])
+        # An earlier pack already covering this pattern unconditionally wins,
+        # so bandit's eval entry does not repeat the built-in one.
+        if any(e.pack != r.pack and not e.kwargs and not r.kwargs for e in entries):
+            return
+        entries.append(r)
+
+    @cached_property
+    def fingerprint(self) -> str:
+        blob = json.dumps([asdict(r) for r in self.rules], sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(blob).hexdigest()
+
+    def _lookup(self, table: Dict[str, List[PackRule]], name: str) -> List[PackRule]:
+        found: List[PackRule] = []
+        for key in _prefixes(name):
+            found += (r for r in table.get(key, ()) if r not in found)
+        return found
+
+    def match(self, node: ast.AST, imports: Dict[str, str]) -> List[PackRule]:
+        if isinstance(node, ast.Call):
+            if not self.calls:
+                return []
+            name = qualified_name(node.func, imports)
+            if name is None:
+                return []
+            return [r for r in self._lookup(self.calls, name) if _kwargs_match(node, r.kwargs)]
+
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif node.level == 0 and node.module:
+            modules = [node.module] + [f"{node.module}.{alias.name}" for alias in node.names]
+        else:
+            return []
+        found: List[PackRule] = []
+        for module in modules:
+            found += (r for r in self._lookup(self.imports, module) if r not in found)
+        return found
+
+
+@lru_cache(maxsize=None)
+def default_matcher() -> PackMatcher:
+    """The matcher for `SECURITY_RULE_PACKS`, built on first use."""
+    return PackMatcher(load_packs(RULE_PACKS.split(",")))
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+from collections import Counter
+from typing import Dict, Optional
+
+SCORING_VERSION = "1"
+
+SECTIONS = ("style", "correctness", "security", "performance")
+
+# Files shorter than this are scored as if they had this many lines, so a
+# single issue in a 3-line file does not sink the score.
+MIN_LOC = int(os.getenv("SCORING_MIN_LOC", "20"))
+# Weighted penalty per 100 lines of code that costs one point.
+PENALTY_PER_POINT = float(os.getenv("SCORING_PENALTY_PER_POINT", "2.0"))
+RETRY_THRESHOLD = float(os.getenv("SCORING_RETRY_THRESHOLD", "7"))
+# Optional JSON file of weight overrides, same shape as DEFAULT_WEIGHTS.
+WEIGHTS_FILE = os.getenv("SCORING_WEIGHTS")
+
+# Per-section severity weights. Keys are matched against an issue's rule
+# code exactly first, then by the longest matching prefix (so "E1" covers
+# E101..E131), then against pylint's message type; "*" is the fallback.
+DEFAULT_WEIGHTS: Dict[str, Dict[str, float]] = {
+    "style": {
+        "*": 0.25,
+        "E9": 10.0,   # syntax / io errors
+        "F": 1.0,     # pyflakes: unused imports, undefined names, ...
+        "F821": 3.0,
+        "F811": 2.0,
+        "C9": 1.0,    # mccabe complexity
+        "E501": 0.1,
+    },
+    "correctness": {
+        "*": 1.0,
+        "fatal": 10.0,
+        "error": 5.0,
+        "import-error": 1.0,  # depends on the reviewing environment, not the code
+        "warning": 1.0,
+        "refactor": 0.5,
+        "convention": 0.1,
+        "info": 0.0,
+    },
+    "security": {
+        "*": 4.0,
+        "eval() usage": 8.0,
+        "exec() usage": 8.0,
+        "pickle load": 6.0,
+        "hardcoded password": 6.0,
+        "subprocess with shell=True": 8.0,
+        "TLS verification disabled": 6.0,
+        "weak hash function": 2.0,
+        "unparseable source": 10.0,
+    },
+    "performance": {
+        "*": 1.0,
+        "nested loop": 2.0,
+        "inefficient loop append": 0.5,
+        "string concat in loop": 1.0,
+        "membership test on list in loop": 2.0,
+        "list.pop(0) in loop": 1.5,
+        "list.insert(0) in loop": 1.5,
+        "sort in loop": 2.0,
+        "redundant sort": 0.5,
+        "sort for min/max": 0.5,
+        "len() in loop": 0.25,
+        "attribute lookup in hot loop": 0.25,
+        "high cyclomatic complexity": 1.0,
+        "deep nesting": 1.0,
+        "unparseable source": 10.0,
+    },
+}
+
+
+def load_weights(path: Optional[str] = WEIGHTS_FILE) -> Dict[str, Dict[str, float]]:
+    """DEFAULT_WEIGHTS with the per-section overrides from `path` applied."""
+    weights = {section: dict(table) for section, table in DEFAULT_WEIGHTS.items()}
+    if path:
+        with open(path, "r") as f:
+            overrides = json.load(f)
+        for section, table in overrides.items():
+            weights.setdefault(section, {}).update(table)
+    return weights
+
+
+WEIGHTS = load_weights()
+
+
+def scoring_fingerprint(weights: Dict[str, Dict[str, float]] = WEIGHTS) -> str:
+    """Changes whenever the scoring rules or weights change."""
+    blob = json.dumps({"version": SCORING_VERSION, "weights": weights}, sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def rule_code(section: str, issue: dict) -> Optional[str]:
+    """The identifier a finding is weighted and counted by."""
+    if section == "style":
+        return issue.get("code")
+    if section == "correctness":
+        return issue.get("symbol") or issue.get("message-id")
+    issue_name = issue.get("issue") or ""
+    # "unparseable source (msg)" carries the parser message.
+    return issue_name.split(" (", 1)[0] or None
+
+
+def issue_weight(section: str, issue: dict, weights: Dict[str, Dict[str, float]] = WEIGHTS) -> float:
+    table = weights.get(section, {})
+    keys = [rule_code(section, issue)]
+    if section == "correctness":
+        keys.insert(1, issue.get("message-id"))
+
+    for key in filter(None, keys):
+        if key in table:
+            return table[key]
+    for key in filter(None, keys):
+        prefixes = [p for p in table if p != "*" and key.startswith(p)]
+        if prefixes:
+            return table[max(prefixes, key=len)]
+    if issue.get("type") in table:
+        return table[issue["type"]]
+    return table.get("*", 1.0)
+
+
+def count_loc(source: str) -> int:
+    """Non-blank lines."""
+    return sum(1 for line in source.splitlines() if line.strip())
+
+
+def file_loc(path: str) -> Optional[int]:
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return count_loc(f.read())
+    except OSError:
+        return None
+
+
+def section_score(penalty: float, rules: Counter, loc: int) -> dict:
+    """One section's score from its summed weight and its issue count per rule."""
+    per_100 = penalty * 100 / max(loc, MIN_LOC)
+    score = max(1, min(10, round(10 - per_100 / PENALTY_PER_POINT)))
+    rules.pop(None, None)
+    return {
+        "score": score,
+        "penalty": round(penalty, 2),
+        "penalty_per_100_loc": round(per_100, 2),
+        "top_rules": rules.most_common(3),
+    }
+
+
+def _comment(section: str, detail: dict) -> str:
+    top = ", ".join(f"{code} x{n}" for code, n in detail["top_rules"])
+    return f"{section} {detail['score']}/10" + (f" ({top})" if top else "")
+
+
+def evaluate(report: dict, loc: Optional[int] = None, trend: str = "", weights=WEIGHTS) -> dict:
+    """
+    Deterministic scores for a combined review report.
+
+    Each section's score is 10 minus one point per PENALTY_PER_POINT of
+    weighted penalty per 100 lines, clamped to 1..10. The result has every
+    EvaluationOutput field except improvement_instructions, plus `details`.
+    """
+    # services.findings imports this module.
+    from services.findings import FindingsTable
+
+    file = report.get("file", "")
+    if loc is None:
+        loc = file_loc(file) or 0
+
+    findings = FindingsTable(weights)
+    for section in SECTIONS:
+        findings.add_section(file, section, report.get(section) or {})
+    penalties = findings.penalties("section")
+    details = {
+        section: section_score(penalties.get(section, 0.0), findings.counts("rule", section=section), loc)
+        for section in SECTIONS
+    }
+    scores = {f"{section}_score": details[section]["score"] for section in SECTIONS}
+    overall = round(sum(scores.values()) / len(SECTIONS), 2)
+
+    return {
+        **scores,
+        "overall_score": overall,
+        "should_retry": overall < RETRY_THRESHOLD,
+        "comments": "; ".join(_comment(s, details[s]) for s in SECTIONS) + f" over {loc} LOC.",
+        "trend": trend,
+        "loc": loc,
+        "details": details,
+    }
@@ -1,33 +1,17 @@
-import re
-from typing import Dict
+import asyncio
+from typing import Dict, Optional, Union
 
+from services.ast_analysis import LineRanges, category_report
+from services.source_file import SourceFile
 
-def security_review(path: str) -> Dict:
-    """Simple static scan for common security issues."""
 
-    insecure_patterns = {
-        "eval() usage": r"\beval\(",
-        "exec() usage": r"\bexec\(",
-        "pickle load": r"pickle\.load",
-        "hardcoded password": r"(password|passwd)\s*=",
-    }
+def security_review(path: Union[str, SourceFile], ranges: Optional[LineRanges] = None) -> Dict:
+    """Simple static scan for common security issues."""
 
-    issues = []
+    return category_report(path, "security", ranges)
 
-    with open(path, "r") as f:
-        lines = f.readlines()
 
-    for idx, line in enumerate(lines, start=1):
-        for issue, pattern in insecure_patterns.items():
-            if re.search(pattern, line):
-                issues.append({
-                    "issue": issue,
-                    "line": idx,
-                    "code": line.strip()
-                })
+async def security_review_async(path: Union[str, SourceFile], ranges: Optional[LineRanges] = None) -> Dict:
+    """`security_review` on a worker thread, off the event loop."""
 
-    return {
-        "file": path,
-        "issue_count": len(issues),
-        "issues": issues,
-    }
+    return await asyncio.to_thread(security_review, path, ranges)
@@ -0,0 +1,126 @@
+import ast
+import bisect
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from functools import cached_property
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+# Linters that need a real file get one here; tmpfs when the host has it.
+SOURCE_TMP_DIR = os.getenv("SOURCE_TMP_DIR") or ("/dev/shm" if os.access("/dev/shm", os.W_OK) else None)
+
+
+class SourceFile:
+    """
+    One file's content, read (or received) once and shared by every analyzer:
+    raw bytes, decoded text, a line index and a lazily parsed AST.
+
+    `name` is what reports show. `path` is set when the content is an
+    unmodified file on disk, so linters can read it directly; otherwise
+    `on_disk` writes a single temporary copy and removes it afterwards.
+    """
+
+    def __init__(self, name: str, data: bytes, path: Optional[str] = None):
+        self.name = name
+        self.data = data
+        self.path = path
+        # Analyzer results for this content, keyed by whatever they depend on.
+        self.analyses: Dict[Any, Any] = {}
+        self._disk_lock = threading.Lock()
+        self._disk_users = 0
+        self._disk_dir: Optional[str] = None
+
+    @classmethod
+    def from_path(cls, path: str) -> "SourceFile":
+        with open(path, "rb") as f:
+            return cls(path, f.read(), path=path)
+
+    @classmethod
+    def from_text(cls, name: str, text: str) -> "SourceFile":
+        return cls(name, text.encode("utf-8"))
+
+    @classmethod
+    def load(cls, source: Union[str, "SourceFile"]) -> "SourceFile":
+        """Pass-through for a SourceFile, read from disk for a path."""
+        return source if isinstance(source, SourceFile) else cls.from_path(source)
+
+    # ---------------- derived views (computed once) ----------------
+
+    @cached_property
+    def text(self) -> str:
+        return self.data.decode("utf-8", errors="replace")
+
+    @cached_property
+    def lines(self) -> List[str]:
+        return self.text.splitlines()
+
+    @cached_property
+    def line_offsets(self) -> List[int]:
+        """Character offset at which each line starts."""
+        offsets, position = [0], 0
+        for line in self.text.splitlines(keepends=True):
+            position += len(line)
+            offsets.append(position)
+        return offsets[:-1] or [0]
+
+    @cached_property
+    def sha256(self) -> str:
+        return hashlib.sha256(self.data).hexdigest()
+
+    @cached_property
+    def tree(self) -> Optional[ast.Module]:
+        """The parsed module, or None if it does not parse (see `syntax_error`)."""
+        try:
+            return ast.parse(self.text)
+        except SyntaxError as e:
+            self.__dict__["syntax_error"] = e
+            return None
+
+    @property
+    def syntax_error(self) -> Optional[SyntaxError]:
+        self.tree
+        return self.__dict__.get("syntax_error")
+
+    def line(self, lineno: int) -> str:
+        """1-based source line, '' when out of range."""
+        if 1 <= lineno <= len(self.lines):
+            return self.lines[lineno - 1]
+        return ""
+
+    def line_at(self, offset: int) -> int:
+        """1-based line number containing character `offset`."""
+        return bisect.bisect_right(self.line_offsets, offset)
+
+    # ---------------- linters ----------------
+
+    @contextmanager
+    def on_disk(self) -> Iterator[str]:
+        """
+        A path holding this content for tools that only read files. Nested
+        and concurrent users share one copy, deleted when the last one exits.
+        """
+        if self.path is not None:
+            yield self.path
+            return
+
+        with self._disk_lock:
+            if self._disk_users == 0:
+                self._disk_dir = tempfile.mkdtemp(prefix="review-", dir=SOURCE_TMP_DIR)
+                # Keep the basename so linters report a meaningful module name.
+                with open(self._disk_file(), "wb") as f:
+                    f.write(self.data)
+            self._disk_users += 1
+        try:
+            yield self._disk_file()
+        finally:
+            with self._disk_lock:
+                self._disk_users -= 1
+                if self._disk_users == 0:
+                    shutil.rmtree(self._disk_dir, ignore_errors=True)
+                    self._disk_dir = None
+
+    def _disk_file(self) -> str:
+        return os.path.join(self._disk_dir, os.path.basename(self.name) or "source.py")
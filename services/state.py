@@ -0,0 +1,226 @@
+"""
+State shared between API worker processes: agent sessions, review history,
+result caches and job records.
+
+`STATE_BACKEND` picks the implementation:
+
+* `local` (default): SQLite databases and cache directories on this host.
+  Safe for several uvicorn workers, or containers sharing one volume.
+* `memory`: sessions and job records live in this process only, as with a
+  single worker. History and caches still use their files.
+* `package.module:name`: a `StateBackend` subclass or a factory returning
+  one, e.g. for a networked store shared by replicas on different hosts.
+"""
+import importlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import List, Optional, Protocol
+
+STATE_BACKEND = os.getenv("STATE_BACKEND", "local")
+STATE_DIR = os.getenv("STATE_DIR", "memory")
+SESSION_DB_URL = os.getenv("SESSION_DB_URL") or f"sqlite:///{os.path.join(STATE_DIR, 'sessions.db')}"
+JOBS_DB = os.getenv("JOBS_DB", os.path.join(STATE_DIR, "jobs.db"))
+# Finished job records kept for lookups from other workers.
+JOB_RETENTION = float(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+# History keys of API uploads; see `upload_key`.
+UPLOAD_PREFIX = "upload:"
+
+
+# --------------------------------------------------
+# INTERFACE
+# --------------------------------------------------
+
+class Cache(Protocol):
+    """A JSON result cache; `memory.review_cache.ReviewCache` is the file-based one."""
+
+    def get(self, key: str) -> Optional[dict]: ...
+
+    def put(self, key: str, value: dict) -> None: ...
+
+    def stats(self) -> dict: ...
+
+
+def upload_key(tenant: str, filename: str) -> str:
+    """
+    History key of an uploaded file. The client's file name says nothing
+    about where it lives, so uploads are kept apart per tenant rather than
+    by a path on this host.
+    """
+    return f"{UPLOAD_PREFIX}{tenant}:{filename}"
+
+
+class History(Protocol):
+    """
+    Review history and per-file trends; `memory.memory_manager` is the
+    SQLite one. `file` is a local path or an `upload_key`.
+    """
+
+    def save_review(self, file: str, review: dict, content_hash: Optional[str] = None) -> None: ...
+
+    def load_past_reviews(self, file: str, limit: int = ..., since: Optional[float] = None) -> List[dict]: ...
+
+    def load_reviews_by_hash(self, content_hash: str, limit: int = ...) -> List[dict]: ...
+
+    def load_recent_reviews(self, since: float, limit: int = ...) -> List[dict]: ...
+
+    def load_trend(self, file: str) -> Optional[dict]: ...
+
+    def trend_digest(self, file: str) -> str: ...
+
+
+class JobStore(Protocol):
+    """Snapshots of jobs (`Job.to_dict()`), so any worker can answer GET /jobs/{id}."""
+
+    def publish(self, job: dict) -> None: ...
+
+    def get(self, job_id: str) -> Optional[dict]: ...
+
+
+class StateBackend(ABC):
+    """
+    Everything the service keeps between requests. A networked backend
+    implements these four methods; every call may come from any worker.
+    """
+
+    @abstractmethod
+    def session_service(self):
+        """An ADK `BaseSessionService` for the agent runner."""
+
+    @abstractmethod
+    def cache(
+        self, name: str, directory: str, max_entries: int, max_bytes: int, ttl: Optional[float] = None,
+    ) -> Cache:
+        """The cache called `name`; `directory` is only a hint for file-based stores."""
+
+    @abstractmethod
+    def history(self) -> History:
+        """Review history and trends."""
+
+    @abstractmethod
+    def jobs(self) -> Optional[JobStore]:
+        """Shared job records, or None when jobs are only visible to their own worker."""
+
+
+# --------------------------------------------------
+# IMPLEMENTATIONS
+# --------------------------------------------------
+
+class SqliteJobStore:
+    """Job snapshots in one SQLite table; WAL lets every worker read while one writes."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        updated_at REAL NOT NULL,
+        job TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS jobs_time ON jobs (updated_at);
+    """
+
+    def __init__(self, path: str = JOBS_DB, retention: float = JOB_RETENTION):
+        self.path = path
+        self.retention = retention
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def publish(self, job: dict) -> None:
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO jobs (id, status, updated_at, job) VALUES (?, ?, ?, ?)",
+            (job["id"], job["status"], now, json.dumps(job, default=str)),
+        )
+        conn.execute("DELETE FROM jobs WHERE updated_at < ?", (now - self.retention,))
+
+    def get(self, job_id: str) -> Optional[dict]:
+        row = self._connect().execute("SELECT job FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+class LocalBackend(StateBackend):
+    """SQLite and files on this host, shared by every worker process on it."""
+
+    def session_service(self):
+        from google.adk.sessions import DatabaseSessionService
+
+        if SESSION_DB_URL.startswith("sqlite:///"):
+            directory = os.path.dirname(SESSION_DB_URL[len("sqlite:///"):])
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        return DatabaseSessionService(db_url=SESSION_DB_URL)
+
+    def cache(self, name, directory, max_entries, max_bytes, ttl=None):
+        from memory.review_cache import ReviewCache
+
+        return ReviewCache(directory, max_entries, max_bytes, ttl=ttl, name=name)
+
+    def history(self):
+        from memory import memory_manager
+
+        return memory_manager
+
+    def jobs(self):
+        return SqliteJobStore()
+
+
+class MemoryBackend(LocalBackend):
+    """Process-local sessions and jobs, for a single worker."""
+
+    def session_service(self):
+        from google.adk.sessions import InMemorySessionService
+
+        return InMemorySessionService()
+
+    def jobs(self):
+        return None
+
+
+BACKENDS = {"local": LocalBackend, "memory": MemoryBackend}
+
+
+def load_backend(spec: str) -> StateBackend:
+    """'local', 'memory' or 'package.module:name' (a class or a zero-argument factory)."""
+    if spec in BACKENDS:
+        return BACKENDS[spec]()
+    module, _, name = spec.partition(":")
+    if not name:
+        raise ValueError(f"unknown STATE_BACKEND {spec!r}; use local, memory or package.module:name")
+    backend = getattr(importlib.import_module(module), name)()
+    if not isinstance(backend, StateBackend):
+        raise TypeError(f"{spec} did not produce a StateBackend")
+    return backend
+
+
+@lru_cache(maxsize=None)
+def backend() -> StateBackend:
+    """The process-wide backend named by `STATE_BACKEND`."""
+    return load_backend(STATE_BACKEND)
+
+
+def history() -> History:
+    return backend().history()
+
+
+def review_cache() -> Cache:
+    """The review result cache, with the `REVIEW_CACHE_*` settings."""
+    from memory.review_cache import CACHE_DIR, MAX_BYTES, MAX_ENTRIES
+
+    return backend().cache("review", CACHE_DIR, MAX_ENTRIES, MAX_BYTES)
@@ -0,0 +1,186 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from importlib import metadata
+from typing import AsyncIterator, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from services.ast_analysis import ANALYZER_VERSION, LineRanges, in_ranges
+from services.correctness_review import correctness_review, correctness_review_async
+from services.metrics import timed
+from services.performance_review import performance_review
+from services.rule_packs import default_matcher
+from services.security_review import security_review
+from services.source_file import SourceFile
+from services.style_review import style_review, style_review_async
+
+SECTIONS = ("style", "correctness", "security", "performance")
+
+TOOL_PACKAGES = ("pylint", "flake8", "pycodestyle", "astroid", "bandit")
+
+
+def tool_versions() -> dict:
+    versions = {}
+    for package in TOOL_PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def static_fingerprint() -> str:
+    """Hash of the static analyzer rule set and linter versions only."""
+    payload = {
+        "analyzer_version": ANALYZER_VERSION,
+        "rule_packs": default_matcher().fingerprint,
+        "tools": tool_versions(),
+    }
+    blob = json.dumps(payload, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def _restrict(report: Dict, ranges: Optional[LineRanges]) -> Dict:
+    if ranges is None:
+        return report
+    issues = [i for i in report["issues"] if i.get("line") and in_ranges(i["line"], ranges)]
+    return {**report, "issue_count": len(issues), "issues": issues}
+
+
+AST_REVIEWERS = {"security": security_review, "performance": performance_review}
+
+
+def _ast_reviews(src: SourceFile, ranges: Optional[LineRanges], sections: Iterable[str]) -> Dict:
+    # Run back to back so the second scan reuses the first one's parse.
+    with timed("ast_scan"):
+        return {section: AST_REVIEWERS[section](src, ranges) for section in sections}
+
+
+def _submit(pool: ThreadPoolExecutor, fn, *args):
+    # Pool threads do not inherit context variables; per-request timings need them.
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+
+def _renamed(report: Dict, src: SourceFile, disk_path: str) -> Dict:
+    """A linter report on a temporary copy, pointed back at the source's name."""
+    if disk_path == src.name:
+        return report
+    issues = [{**i, "path": src.name} if "path" in i else i for i in report["issues"]]
+    return {**report, "file": src.name, "issues": issues}
+
+
+def iter_static_review(
+    source: Union[str, SourceFile],
+    ranges: Optional[LineRanges] = None,
+    sections: Iterable[str] = SECTIONS,
+) -> Iterator[Tuple[str, Dict]]:
+    """
+    Runs the deterministic reviewers directly, without any model calls, and
+    yields `(section, report)` pairs as each reviewer finishes.
+
+    `source` is a path or a `SourceFile`; either way the content is read
+    once. The AST scans work on it in memory. flake8 and pylint get the file
+    itself, or one shared temporary copy for in-memory content, and each is
+    awaited on its own thread next to the security and performance scans
+    (which share one AST pass). With `ranges`, only findings on those lines
+    are kept; the AST scans skip statements outside them entirely.
+    `sections` limits which reviewers run.
+    """
+
+    src = SourceFile.load(source)
+    sections = set(sections)
+    ast_sections = [s for s in AST_REVIEWERS if s in sections]
+    with src.on_disk() as disk_path, ThreadPoolExecutor(max_workers=3) as pool:
+        futures = {}
+        if "style" in sections:
+            futures[_submit(pool, style_review, disk_path)] = "style"
+        if "correctness" in sections:
+            futures[_submit(pool, correctness_review, disk_path)] = "correctness"
+        if ast_sections:
+            futures[_submit(pool, _ast_reviews, src, ranges, ast_sections)] = None
+        for future in as_completed(futures):
+            section = futures[future]
+            if section is None:
+                yield from future.result().items()
+            else:
+                yield section, _restrict(_renamed(future.result(), src, disk_path), ranges)
+
+
+def static_review(source: Union[str, SourceFile], ranges: Optional[LineRanges] = None) -> Dict:
+    """Combined report of all four static reviewers (see `iter_static_review`)."""
+
+    src = SourceFile.load(source)
+    sections = dict(iter_static_review(src, ranges))
+    return {"file": src.name, **{section: sections[section] for section in SECTIONS}}
+
+
+async def iter_static_review_async(
+    source: Union[str, SourceFile],
+    ranges: Optional[LineRanges] = None,
+    sections: Iterable[str] = SECTIONS,
+) -> AsyncIterator[Tuple[str, Dict]]:
+    """
+    `iter_static_review` for the event loop: flake8 and pylint are awaited
+    on the linter pool and the AST scans run on a thread, all overlapping.
+    Closing the iterator early cancels (and so kills) unfinished linters.
+    """
+
+    src = SourceFile.load(source)
+
+    async def linter(section, review, disk_path):
+        return {section: _restrict(_renamed(await review(disk_path), src, disk_path), ranges)}
+
+    sections = set(sections)
+    ast_sections = [s for s in AST_REVIEWERS if s in sections]
+    with src.on_disk() as disk_path:
+        tasks = []
+        if "style" in sections:
+            tasks.append(asyncio.ensure_future(linter("style", style_review_async, disk_path)))
+        if "correctness" in sections:
+            tasks.append(asyncio.ensure_future(linter("correctness", correctness_review_async, disk_path)))
+        if ast_sections:
+            tasks.append(asyncio.ensure_future(asyncio.to_thread(_ast_reviews, src, ranges, ast_sections)))
+
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                for item in (await next_done).items():
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def static_review_async(source: Union[str, SourceFile], ranges: Optional[LineRanges] = None) -> Dict:
+    src = SourceFile.load(source)
+    sections = {section: report async for section, report in iter_static_review_async(src, ranges)}
+    return {"file": src.name, **{section: sections[section] for section in SECTIONS}}
+
+
+def _describe(section: str, issue: dict) -> str:
+    line = issue.get("line")
+    where = f"line {line}: " if line else ""
+
+    if section == "style":
+        return f"{where}{issue.get('code', '')} {issue.get('message', '')}".strip()
+    if section == "correctness":
+        symbol = f" ({issue['symbol']})" if issue.get("symbol") else ""
+        return f"{where}{issue.get('message', '')}{symbol}"
+    return f"{where}{issue.get('issue', '')} - `{issue.get('code', '')}`"
+
+
+def format_report(report: Dict, file_name: str = None) -> str:
+    """Markdown summary in the same layout the aggregator agent produces."""
+
+    lines = ["# Code Review Report", f"File: {file_name or report['file']}", ""]
+
+    for section in SECTIONS:
+        lines.append(f"## {section.capitalize()} Issues")
+        issues = report[section]["issues"]
+        if not issues:
+            lines.append("No issues found.")
+        for issue in issues:
+            lines.append(f"- {_describe(section, issue)}")
+        lines.append("")
+
+    return "\n".join(lines).rstrip() + "\n"
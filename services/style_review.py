@@ -1,13 +1,9 @@
-from tools.run_linter import run_flake8
+from typing import List
 
-def style_review(path: str) -> dict:
-    """
-    High-level style review service that wraps the linter tool
-    and returns a clean, structured report.
-    """
+from tools.run_linter import LintIssue, run_flake8, run_flake8_async
 
-    issues = run_flake8(path)
 
+def _style_report(path: str, issues: List[LintIssue]) -> dict:
     report = {
         "file": path,
         "issue_count": len(issues),
@@ -23,3 +19,18 @@ def style_review(path: str) -> dict:
         })
 
     return report
+
+
+def style_review(path: str) -> dict:
+    """
+    High-level style review service that wraps the linter tool
+    and returns a clean, structured report.
+    """
+
+    return _style_report(path, run_flake8(path))
+
+
+async def style_review_async(path: str) -> dict:
+    """`style_review` without blocking the event loop."""
+
+    return _style_report(path, await run_flake8_async(path))
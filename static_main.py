@@ -0,0 +1,75 @@
+"""
+Static-only CLI: the deterministic reviewers and batch mode, no agents.
+
+Never imports google.adk or the models, so it starts in a fraction of the
+time `main.py` takes to load the agents:
+
+    python static_main.py path/to/file.py
+    python static_main.py --batch src/ --index
+    python static_main.py --diff change.patch --root path/to/repo --incremental
+
+`main.py --static` / `--batch` run the same code.
+"""
+import argparse
+import json
+import sys
+
+from services.batch_review import collect_paths, diff_hunks, iter_batch_review, summarize
+from services.findings import FindingsTable
+from services.incremental_review import DEFAULT_CONTEXT
+from services.project_index import PROJECT_INDEX, ProjectIndex
+from services.static_review import format_report, static_review
+
+
+def add_static_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("paths", nargs="*", help="File to review (or files/directories with --batch)")
+    parser.add_argument("--batch", action="store_true", help="Review many files with the static reviewers; prints NDJSON")
+    parser.add_argument("--diff", help="Unified diff file whose changed files should be reviewed (implies --batch)")
+    parser.add_argument("--root", default=".", help="Repository root that diff paths are relative to")
+    parser.add_argument("--incremental", action="store_true", help="With --diff, only report findings on changed lines")
+    parser.add_argument("--context", type=int, default=DEFAULT_CONTEXT, help="Lines of context around each change in --incremental mode")
+    parser.add_argument("--workers", type=int, default=None, help="Batch worker processes (default: CPU count)")
+    parser.add_argument("--index", action="store_true", help="In batch mode, keep a project index under --root and only re-review changed files and their importers")
+    parser.add_argument("--index-path", default=PROJECT_INDEX, help="Project index database for --index")
+
+
+def run_static(path: str) -> None:
+    print(format_report(static_review(path)))
+
+
+def run_batch(args) -> None:
+    diff = None
+    if args.diff:
+        with open(args.diff, "r", encoding="utf-8") as f:
+            diff = f.read()
+
+    paths = collect_paths(paths=args.paths, diff=diff, root=args.root)
+    hunks = diff_hunks(diff, args.root) if diff and args.incremental else None
+    index = ProjectIndex(args.root, path=args.index_path) if args.index else None
+    findings, indexed = FindingsTable(), 0
+    try:
+        for result in iter_batch_review(paths, workers=args.workers, hunks=hunks, context=args.context, index=index):
+            findings.add_result(result)
+            indexed += bool(result.get("indexed"))
+            print(json.dumps(result), flush=True)
+    finally:
+        if index is not None:
+            index.close()
+    print(json.dumps({"summary": summarize(findings, indexed)}))
+
+
+def main(argv) -> None:
+    parser = argparse.ArgumentParser(description="AI code reviewer, deterministic reviewers only")
+    add_static_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.batch or args.diff:
+        run_batch(args)
+    elif len(args.paths) == 1:
+        run_static(args.paths[0])
+    else:
+        parser.print_usage()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
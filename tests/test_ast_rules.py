@@ -0,0 +1,100 @@
+# test_ast_rules.py
+from textwrap import dedent
+
+from services.ast_analysis import analyze_source
+
+
+def performance(source: str) -> list:
+    return analyze_source(dedent(source))["performance"]
+
+
+def issues(source: str) -> list:
+    return [issue["issue"] for issue in performance(source)]
+
+
+def test_elif_chain_is_not_nesting():
+    assert issues("""
+        def f(x):
+            if x == 1:
+                return 1
+            elif x == 2:
+                return 2
+            elif x == 3:
+                return 3
+            elif x == 4:
+                return 4
+            elif x == 5:
+                if x:
+                    return 5
+    """) == []
+
+
+def test_deep_nesting():
+    found = performance("""
+        def f(x):
+            if x:
+                for a in x:
+                    while a:
+                        if a:
+                            with open(a):
+                                pass
+    """)
+    assert "deep nesting (f: 5 levels)" in [issue["issue"] for issue in found]
+
+
+def test_for_else_is_outside_the_loop():
+    assert issues("""
+        def f(items, other):
+            for i in items:
+                pass
+            else:
+                n = len(other)
+    """) == []
+
+
+def test_len_of_unchanged_name_in_loop():
+    found = performance("""
+        def f(items, other):
+            for i in items:
+                n = len(other)
+    """)
+    assert [(issue["issue"], issue["line"]) for issue in found] == [("len() in loop", 4)]
+
+
+def test_len_invalidated_by_mutation():
+    assert issues("""
+        def f(items, other):
+            for i in items:
+                n = len(other)
+                other.append(i)
+    """) == []
+
+
+def test_sorted_of_unchanged_name_in_loop():
+    assert issues("""
+        def f(items, other):
+            for i in items:
+                s = sorted(other)
+    """) == ["sort in loop"]
+
+
+def test_sorted_invalidated_by_reassignment():
+    assert issues("""
+        def f(items, other):
+            for i in items:
+                s = sorted(other)
+                other = other + [i]
+    """) == []
+
+
+def test_cost_grows_with_loop_depth():
+    found = performance("""
+        def f(rows, other):
+            for row in rows:
+                n = len(other)
+            for row in rows:
+                for cell in row:
+                    m = len(other)
+    """)
+    costs = {issue["line"]: issue["cost"] for issue in found if issue["issue"] == "len() in loop"}
+    assert costs[7] == 10 * costs[4]
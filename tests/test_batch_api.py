@@ -0,0 +1,44 @@
+# test_batch_api.py
+import functools
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+from services.project_index import ProjectIndex
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    root = tmp_path / "repo"
+    root.mkdir()
+    (root / "a.py").write_text('"""A."""\nimport b\n\nVALUE = b.VALUE\n')
+    (root / "b.py").write_text('"""B."""\nVALUE = 1\n')
+    monkeypatch.setattr(app, "BATCH_ROOT", str(tmp_path))
+    monkeypatch.setattr(app, "ProjectIndex", functools.partial(ProjectIndex, path=str(tmp_path / "index.db")))
+    with TestClient(app.app) as client:
+        yield client
+
+
+def batch(client, **body) -> list:
+    response = client.post("/review/batch", json={"root": "repo", "directory": "repo", **body})
+    assert response.status_code == 200, response.text
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_static_batch_records_and_reuses_the_index(client):
+    first = batch(client, index=True)
+    assert sorted(r["file"].rsplit("/", 1)[-1] for r in first[:-1]) == ["a.py", "b.py"]
+    assert first[-1]["summary"]["indexed"] == 0
+
+    second = batch(client, index=True)
+    assert second[-1]["summary"]["indexed"] == 2
+    assert {r["file"]: r["report"] for r in second[:-1]} == {r["file"]: r["report"] for r in first[:-1]}
+
+
+@pytest.mark.parametrize("option", ["index", "incremental"])
+def test_pipeline_batch_refuses_index_and_incremental(client, option):
+    response = client.post("/review/batch", json={"root": "repo", "directory": "repo", "pipeline": True, option: True})
+    assert response.status_code == 400
+    assert "pipeline" in response.json()["detail"]
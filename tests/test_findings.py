@@ -0,0 +1,102 @@
+# test_findings.py
+import math
+
+from services.findings import FindingsTable
+from services.scoring import SECTIONS, evaluate
+
+WEIGHTS = {
+    "style": {"E501": 0.5, "*": 1.0},
+    "correctness": {"unused-import": 2.0, "*": 3.0},
+    "security": {"*": 5.0},
+    "performance": {"*": 0.25},
+}
+
+STYLE = [
+    {"code": "E501", "line": 3, "column": 80, "message": "line too long"},
+    {"code": "W291", "line": 4, "column": 1, "message": "trailing whitespace"},
+]
+CORRECTNESS = [
+    {"type": "warning", "symbol": "unused-import", "message-id": "W0611", "line": 1, "endLine": 1},
+    # pylint leaves endLine empty on module-level messages.
+    {"type": "convention", "symbol": "missing-module-docstring", "message-id": "C0114", "line": 1, "endLine": None},
+]
+PERFORMANCE = [
+    {"issue": "len() in loop", "line": 7, "code": "n = len(x)", "cost": 10.0},
+    {"issue": "nested loop", "line": 9, "code": "for b in a:", "cost": 0.5},
+]
+
+
+def section(file, issues):
+    return {"file": file, "issue_count": len(issues), "issues": issues}
+
+
+def make_table() -> FindingsTable:
+    table = FindingsTable(weights=WEIGHTS)
+    table.add_report({
+        "file": "a.py",
+        "style": section("a.py", STYLE),
+        "correctness": section("a.py", CORRECTNESS),
+        "security": section("a.py", []),
+        "performance": section("a.py", PERFORMANCE),
+    })
+    table.add_result({"file": "b.py", "report": {"style": section("b.py", STYLE[:1])}})
+    table.add_result({"file": "c.py", "error": "timeout"})
+    return table
+
+
+def test_report_round_trip():
+    table = make_table()
+    assert table.report("a.py") == {
+        "file": "a.py",
+        "style": section("a.py", STYLE),
+        "correctness": section("a.py", CORRECTNESS),
+        "security": section("a.py", []),
+        "performance": section("a.py", PERFORMANCE),
+    }
+    assert table.issues("b.py", "style") == STYLE[:1]
+    assert list(table.files) == ["a.py", "b.py", "c.py"]
+    assert table.errors == {"c.py": "timeout"}
+
+
+def test_counts_and_penalties():
+    table = make_table()
+    assert table.counts("file") == {"a.py": 6, "b.py": 1}
+    assert table.counts("rule", section="style") == {"E501": 2, "W291": 1}
+    assert table.counts("symbol", file="a.py", section="correctness") == {
+        "unused-import": 1, "missing-module-docstring": 1,
+    }
+    assert table.penalties("file") == {"a.py": 0.5 + 1.0 + 2.0 + 3.0 + 0.25 * 2, "b.py": 0.5}
+    assert table.penalties("section", file="a.py")["performance"] == 0.5
+
+
+def test_fractional_weights_are_kept():
+    table = FindingsTable(weights={"style": {"*": 0.1}})
+    table.add_section("a.py", "style", section("a.py", STYLE))
+    assert list(table.severity) == [0.1, 0.1]
+    assert table.penalties("file")["a.py"] == 0.1 + 0.1
+
+
+def test_mixed_and_oversized_values_round_trip():
+    issues = [
+        {"issue": "x", "line": 1, "cost": 2},
+        {"issue": "x", "line": 2 ** 70, "cost": 2.5},
+        {"issue": "x", "line": -(2 ** 63), "cost": None},
+        {"issue": "x", "line": None, "cost": "high"},
+        {"issue": "x", "extra": float("nan")},
+    ]
+    table = FindingsTable(weights=WEIGHTS)
+    table.add_section("a.py", "security", section("a.py", issues))
+    got = table.issues("a.py", "security")
+    assert got[:4] == issues[:4]
+    assert list(got[4]) == ["issue", "extra"] and math.isnan(got[4]["extra"])
+
+
+def test_evaluate_scores_from_the_table():
+    report = make_table().report("a.py")
+    result = evaluate(report, loc=100, weights=WEIGHTS)
+    details = result["details"]
+    assert details["correctness"]["penalty"] == 5.0
+    assert details["correctness"]["score"] == 8
+    assert details["style"]["top_rules"] == [("E501", 1), ("W291", 1)]
+    assert details["security"] == {"score": 10, "penalty": 0.0, "penalty_per_100_loc": 0.0, "top_rules": []}
+    assert result["overall_score"] == round(sum(result[f"{s}_score"] for s in SECTIONS) / len(SECTIONS), 2)
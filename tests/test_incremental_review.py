@@ -0,0 +1,41 @@
+# test_incremental_review.py
+from memory.review_cache import ReviewCache, content_key
+from services.incremental_review import baseline_key, incremental_review
+from services.static_review import static_fingerprint
+from tools.parse_diff import parse_diff
+
+OLD = 'def run(data):\n    """Run."""\n    result = eval(data)\n    return result\n'
+NEW = 'def run(data):\n    """Run."""\n    result = eval(data)\n    return result + 1\n'
+DIFF = """\
+--- a/m.py
++++ b/m.py
+@@ -2,3 +2,3 @@
+     \"\"\"Run.\"\"\"
+     result = eval(data)
+-    return result
++    return result + 1
+"""
+
+
+def security(result: dict, key: str = "full_report") -> list:
+    return [(issue["issue"], issue["line"]) for issue in result[key]["security"]["issues"]]
+
+
+def test_context_line_findings_are_carried_over(tmp_path):
+    cache = ReviewCache(str(tmp_path / "cache"))
+    path = tmp_path / "m.py"
+    hunks = parse_diff(DIFF)["hunks"]["m.py"]
+
+    path.write_text(OLD)
+    first = incremental_review(str(path), [], context=0, cache=cache)
+    assert ("eval() usage", 3) in security(first)
+
+    path.write_text(NEW)
+    second = incremental_review(str(path), hunks, context=0, cache=cache)
+    assert second["baseline_hit"]
+    assert ("eval() usage", 3) in security(second)
+    assert ("eval() usage", 3) not in security(second, "report")
+
+    fingerprint = static_fingerprint()
+    assert cache.get(baseline_key(NEW.encode(), fingerprint))["report"] == second["full_report"]
+    assert cache.get(content_key(NEW.encode(), fingerprint)) is None
@@ -0,0 +1,39 @@
+# test_memory_manager.py
+import hashlib
+
+import pytest
+
+from memory import memory_manager
+from services.state import upload_key
+
+
+@pytest.fixture(autouse=True)
+def history_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(memory_manager, "MEMORY_DB", str(tmp_path / "history.db"))
+    monkeypatch.setattr(memory_manager, "LEGACY_MEMORY_DIR", str(tmp_path / "legacy"))
+
+
+def review(score: float) -> dict:
+    return {"overall_score": score, "report": {}}
+
+
+def test_uploads_with_the_same_name_keep_separate_histories():
+    first, second = b"x = 1\n", b"y = 2\n"
+    alice, bob = upload_key("alice", "main.py"), upload_key("bob", "main.py")
+    memory_manager.save_review(alice, review(4.0), hashlib.sha256(first).hexdigest())
+    memory_manager.save_review(bob, review(9.0), hashlib.sha256(second).hexdigest())
+
+    assert memory_manager.load_past_reviews(alice) == [review(4.0)]
+    assert memory_manager.load_past_reviews(bob) == [review(9.0)]
+    assert memory_manager.load_trend(alice)["runs"] == 1
+    assert memory_manager.load_reviews_by_hash(hashlib.sha256(second).hexdigest()) == [review(9.0)]
+    # Nothing is stored under the server's path for that name.
+    assert memory_manager.load_past_reviews("main.py") == []
+
+
+def test_later_uploads_extend_the_same_history():
+    key = upload_key("alice", "main.py")
+    memory_manager.save_review(key, review(4.0), "a")
+    memory_manager.save_review(key, review(6.0), "b")
+    assert memory_manager.load_past_reviews(key) == [review(4.0), review(6.0)]
+    assert memory_manager.load_trend(key)["runs"] == 2
@@ -0,0 +1,75 @@
+# test_parse_diff.py
+from tools.parse_diff import changed_lines, line_window, map_old_line, parse_diff, reconstruct_original
+
+OLD = "a\nb\nc\nd\ne\nf\n"
+NEW = "a\nB\nc\nd\ne\nf\ng\n"
+DIFF = """\
+diff --git a/m.py b/m.py
+--- a/m.py
++++ b/m.py
+@@ -1,3 +1,3 @@
+ a
+-b
++B
+ c
+@@ -6 +6,2 @@
+ f
++g
+"""
+
+
+def test_parse_diff():
+    parsed = parse_diff(DIFF)
+    assert parsed["changed_files"] == ["m.py"]
+    hunks = parsed["hunks"]["m.py"]
+    assert [(h["old_start"], h["old_count"], h["new_start"], h["new_count"]) for h in hunks] == [(1, 3, 1, 3), (6, 1, 6, 2)]
+    assert [h["added"] for h in hunks] == [[2], [7]]
+
+
+def test_header_like_lines_inside_a_hunk_are_content():
+    diff = "--- a/m.py\n+++ b/m.py\n@@ -1,2 +1,2 @@\n--- x\n+++ y\n keep\n"
+    hunk = parse_diff(diff)["hunks"]["m.py"][0]
+    assert hunk["lines"] == ["--- x", "+++ y", " keep"]
+    assert hunk["added"] == [1]
+
+
+def test_deleted_file_has_no_hunks():
+    diff = "--- a/gone.py\n+++ /dev/null\n@@ -1 +0,0 @@\n-x\n"
+    assert parse_diff(diff) == {"changed_files": [], "hunks": {}}
+
+
+def test_changed_lines_and_window():
+    hunks = parse_diff(DIFF)["hunks"]["m.py"]
+    assert changed_lines(hunks) == {2, 7}
+    assert line_window({2, 7}, 1) == [(1, 3), (6, 8)]
+    assert line_window({2, 4}, 1) == [(1, 5)]
+
+
+def test_pure_deletion_marks_the_next_line():
+    diff = "--- a/m.py\n+++ b/m.py\n@@ -2,2 +1 @@\n-b\n c\n"
+    assert changed_lines(parse_diff(diff)["hunks"]["m.py"]) == {1}
+
+
+def test_map_old_line():
+    hunks = parse_diff(DIFF)["hunks"]["m.py"]
+    assert map_old_line(hunks, 4) == 4
+    assert map_old_line(hunks, 2) is None
+    # Context lines inside a hunk keep their place.
+    assert map_old_line(hunks, 1) == 1
+    assert map_old_line(hunks, 3) == 3
+    assert map_old_line(hunks, 6) == 6
+    shifted = parse_diff("--- a/m.py\n+++ b/m.py\n@@ -1,3 +1,4 @@\n a\n+x\n+y\n-b\n c\n")["hunks"]["m.py"]
+    assert [map_old_line(shifted, line) for line in (1, 2, 3, 4)] == [1, None, 4, 5]
+    insert = parse_diff("--- a/m.py\n+++ b/m.py\n@@ -1,0 +2,2 @@\n+x\n+y\n")["hunks"]["m.py"]
+    assert map_old_line(insert, 1) == 1
+    assert map_old_line(insert, 2) == 4
+
+
+def test_reconstruct_original():
+    hunks = parse_diff(DIFF)["hunks"]["m.py"]
+    assert reconstruct_original(NEW, hunks) == OLD
+
+
+def test_reconstruct_without_trailing_newline():
+    diff = "--- a/m.py\n+++ b/m.py\n@@ -1 +1 @@\n-x\n\\ No newline at end of file\n+y\n"
+    assert reconstruct_original("y\n", parse_diff(diff)["hunks"]["m.py"]) == "x"
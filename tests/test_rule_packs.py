@@ -0,0 +1,108 @@
+# test_rule_packs.py
+import ast
+
+import pytest
+
+from services.ast_analysis import analyze_source
+from services.rule_packs import PackMatcher, PackRule, RulePackError, load_pack_file, load_packs
+
+RULES = [
+    PackRule(pack="test", id="eval", issue="eval() usage", level="HIGH", calls=("eval",)),
+    PackRule(pack="test", id="shell", issue="shell=True", level="HIGH", calls=("subprocess.*",), kwargs=(("shell", True),)),
+    PackRule(pack="test", id="telnet", issue="telnetlib import", level="HIGH", imports=("telnetlib",)),
+    PackRule(pack="test", id="random", issue="random module", level="LOW", calls=("random.*",)),
+]
+
+
+def matched(matcher: PackMatcher, code: str, imports=None) -> list:
+    node = ast.parse(code).body[0]
+    node = node.value if isinstance(node, ast.Expr) else node
+    return [r.id for r in matcher.match(node, imports or {})]
+
+
+def test_calls_by_qualified_name():
+    matcher = PackMatcher(RULES, min_level="LOW")
+    assert matched(matcher, "eval(x)") == ["eval"]
+    assert matched(matcher, "sp.run(x, shell=True)", {"sp": "subprocess"}) == ["shell"]
+    assert matched(matcher, "sp.run(x, shell=False)", {"sp": "subprocess"}) == []
+    assert matched(matcher, "sp.run(x)", {"sp": "subprocess"}) == []
+    assert matched(matcher, "random.choice(x)") == ["random"]
+    assert matched(matcher, "obj.eval(x)") == []
+
+
+def test_imports_cover_submodules():
+    matcher = PackMatcher(RULES)
+    assert matched(matcher, "import telnetlib") == ["telnet"]
+    assert matched(matcher, "import telnetlib.sub") == ["telnet"]
+    assert matched(matcher, "from telnetlib import Telnet") == ["telnet"]
+    assert matched(matcher, "from . import telnetlib") == []
+
+
+def test_min_level():
+    assert [r.id for r in PackMatcher(RULES, min_level="MEDIUM").rules] == ["eval", "shell", "telnet"]
+    assert len(PackMatcher(RULES, min_level="LOW").rules) == 4
+
+
+def test_earlier_pack_wins_for_unconditional_patterns():
+    later = PackRule(pack="other", id="B307", issue="eval (B307)", level="MEDIUM", calls=("eval",))
+    matcher = PackMatcher(RULES + [later])
+    assert matched(matcher, "eval(x)") == ["eval"]
+
+
+def test_fingerprint_follows_the_rules():
+    assert PackMatcher(RULES).fingerprint == PackMatcher(list(RULES)).fingerprint
+    assert PackMatcher(RULES).fingerprint != PackMatcher(RULES[:2]).fingerprint
+
+
+def test_load_pack_file(tmp_path):
+    path = tmp_path / "team.toml"
+    path.write_text(
+        'name = "team"\n'
+        "[[rules]]\n"
+        'issue = "yaml.load"\n'
+        'level = "high"\n'
+        'calls = ["yaml.load"]\n'
+        'kwargs = { Loader = "unsafe" }\n'
+    )
+    (rule,) = load_pack_file(str(path))
+    assert (rule.pack, rule.id, rule.level, rule.calls, rule.kwargs) == (
+        "team", "yaml.load", "HIGH", ("yaml.load",), (("Loader", "unsafe"),)
+    )
+    assert load_packs([str(tmp_path)]) == [rule]
+
+
+@pytest.mark.parametrize("rule", [
+    'level = "HIGH"\ncalls = ["eval"]\n',
+    'issue = "x"\n',
+    'issue = "x"\ncalls = ["eval"]\nlevel = "SEVERE"\n',
+])
+def test_invalid_rules(tmp_path, rule):
+    path = tmp_path / "bad.toml"
+    path.write_text("[[rules]]\n" + rule)
+    with pytest.raises(RulePackError):
+        load_pack_file(str(path))
+
+
+def test_builtin_pack_in_the_analyzer():
+    found = analyze_source("import subprocess as sp\nsp.run(cmd, shell=True)\neval(data)\n")["security"]
+    assert {(issue["issue"], issue["line"]) for issue in found} >= {
+        ("subprocess with shell=True", 2),
+        ("eval() usage", 3),
+    }
+
+
+def test_aliases_resolve_outside_the_changed_lines():
+    source = (
+        "import pickle as pk\n"
+        "from subprocess import Popen\n"
+        "\n"
+        "\n"
+        "def load(x, c):\n"
+        "    data = pk.loads(x)\n"
+        "    if data:\n"
+        "        pass\n"
+        "    Popen(c, shell=True)\n"
+    )
+    full = analyze_source(source)["security"]
+    assert {issue["line"] for issue in full} >= {6, 9}
+    assert analyze_source(source, ranges=[(6, 6), (9, 9)])["security"] == [i for i in full if i["line"] in (6, 9)]
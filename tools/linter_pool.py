@@ -0,0 +1,235 @@
+"""
+Warm linter workers.
+
+Spawning `pylint` / `flake8` per review pays interpreter startup, plugin
+discovery and astroid's bootstrap every time. Here both linters are
+imported once per worker process and files are fed to the workers through
+the executor's call queue.
+
+LINTER_POOL_WORKERS=0 lints in the calling process instead, which is what
+batch workers use since they are already long-lived.
+
+Each worker is a single-process executor of its own, and calls go to the
+least busy one. The `*_async` variants await it from the event loop instead
+of blocking it, bound concurrent lint calls with a semaphore, and enforce a
+per-call timeout. A call that times out or is cancelled while its worker is
+already linting kills that worker only; calls queued behind it on the same
+worker retry once on its replacement, the other workers carry on.
+"""
+import asyncio
+import io
+import multiprocessing
+import os
+import sys
+import threading
+import weakref
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Tuple
+
+from services.metrics import timed
+
+POOL_WORKERS = int(os.getenv("LINTER_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Workers are recycled periodically so astroid's caches cannot grow forever.
+TASKS_PER_WORKER = int(os.getenv("LINTER_POOL_MAX_TASKS", "200"))
+LINT_TIMEOUT = float(os.getenv("LINTER_TIMEOUT", "60"))
+# Lint calls in flight per event loop; queued calls wait without blocking it.
+MAX_CONCURRENT = int(os.getenv("LINTER_MAX_CONCURRENT", str(max(POOL_WORKERS, 1) * 2)))
+
+FLAKE8_FORMAT = "%(row)d:%(col)d:%(code)s:%(text)s"
+
+_SYSTEM_PREFIXES = tuple({sys.prefix, sys.base_prefix, sys.exec_prefix})
+
+_style_guide = None
+_locks = {"flake8": threading.Lock(), "pylint": threading.Lock()}
+
+_workers: List["_Worker"] = []
+_pool_lock = threading.Lock()
+
+_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+class LintTimeout(Exception):
+    """A linter did not finish within its timeout."""
+
+
+# --------------------------------------------------
+# WORKER SIDE
+# --------------------------------------------------
+
+def _get_style_guide():
+    global _style_guide
+    if _style_guide is None:
+        from flake8.api import legacy
+
+        _style_guide = legacy.get_style_guide(format=FLAKE8_FORMAT)
+    return _style_guide
+
+
+def _forget_user_modules() -> None:
+    """Drop cached ASTs of linted code, keep stdlib/site-packages warm."""
+    import astroid
+
+    cache = astroid.MANAGER.astroid_cache
+    for name, module in list(cache.items()):
+        filename = getattr(module, "file", None)
+        if filename and not filename.startswith(_SYSTEM_PREFIXES):
+            del cache[name]
+
+
+def _warm() -> None:
+    import pylint.lint  # noqa: F401  (astroid bootstrap happens on import)
+
+    _get_style_guide()
+
+
+def flake8_output(path: str) -> str:
+    """flake8 output for `path` in FLAKE8_FORMAT, one issue per line."""
+    style_guide = _get_style_guide()
+    buffer = io.StringIO()
+    style_guide._application.formatter.output_fd = buffer
+    style_guide.check_files([path])
+    return buffer.getvalue()
+
+
+def pylint_messages(path: str) -> List[Dict]:
+    """pylint messages for `path`, identical to `pylint -f json`."""
+    import json
+    from pylint.lint import Run
+    from pylint.reporters.json_reporter import JSONReporter
+
+    out = io.StringIO()
+    try:
+        Run([path], reporter=JSONReporter(out), exit=False)
+    finally:
+        _forget_user_modules()
+
+    output = out.getvalue().strip()
+    return json.loads(output) if output else []
+
+
+# --------------------------------------------------
+# CALLER SIDE
+# --------------------------------------------------
+
+class _Worker:
+    """One warm linter process, behind an executor of its own so it can be killed alone."""
+
+    def __init__(self):
+        self.executor = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm,
+            max_tasks_per_child=TASKS_PER_WORKER,
+        )
+        # Calls sent to this worker and not finished yet; guarded by _pool_lock.
+        self.pending = 0
+
+    def _finished(self, future: Future) -> None:
+        with _pool_lock:
+            self.pending -= 1
+
+    def stop(self, kill: bool = False) -> None:
+        if kill:
+            # Also the process stuck linting a file.
+            for process in list((getattr(self.executor, "_processes", None) or {}).values()):
+                process.kill()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def submit(fn, path: str) -> Tuple[_Worker, Future]:
+    """Sends `fn(path)` to the least busy worker; starts the workers on first use."""
+    with _pool_lock:
+        if not _workers:
+            _workers.extend(_Worker() for _ in range(POOL_WORKERS))
+        worker = min(_workers, key=lambda w: w.pending)
+        worker.pending += 1
+    future = worker.executor.submit(fn, path)
+    future.add_done_callback(worker._finished)
+    return worker, future
+
+
+def _replace(worker: _Worker, kill: bool = False) -> None:
+    """Swaps `worker` for a fresh one, unless that already happened."""
+    with _pool_lock:
+        if worker not in _workers:
+            return
+        _workers[_workers.index(worker)] = _Worker()
+    worker.stop(kill)
+
+
+def shutdown() -> None:
+    with _pool_lock:
+        workers = list(_workers)
+        _workers.clear()
+    for worker in workers:
+        worker.stop()
+
+
+def _run(linter: str, fn, path: str):
+    if POOL_WORKERS <= 0:
+        with _locks[linter]:
+            return fn(path)
+
+    worker, future = submit(fn, path)
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        # The worker died (OOM, segfault in a plugin, killed after a timeout);
+        # start a fresh one and try once more.
+        _replace(worker)
+        return submit(fn, path)[1].result()
+
+
+def run_flake8_warm(path: str) -> str:
+    with timed("flake8"):
+        return _run("flake8", flake8_output, path)
+
+
+def run_pylint_warm(path: str) -> List[Dict]:
+    with timed("pylint"):
+        return _run("pylint", pylint_messages, path)
+
+
+def _async_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if loop not in _slots:
+        _slots[loop] = asyncio.Semaphore(MAX_CONCURRENT)
+    return _slots[loop]
+
+
+async def _run_async(linter: str, fn, path: str, timeout: float):
+    async with _async_slots():
+        if POOL_WORKERS <= 0:
+            # In-process linting cannot be interrupted; a timeout only stops waiting.
+            try:
+                return await asyncio.wait_for(asyncio.to_thread(_run, linter, fn, path), timeout)
+            except asyncio.TimeoutError:
+                raise LintTimeout(f"{linter} timed out after {timeout:g}s on {path}")
+
+        for attempt in range(2):
+            worker, future = submit(fn, path)
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            except BrokenProcessPool:
+                if attempt:
+                    raise
+                _replace(worker)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                # Cancelling the wrapper drops a queued call; one that is
+                # already running has to be killed with its worker.
+                if not future.done():
+                    _replace(worker, kill=True)
+                if isinstance(e, asyncio.TimeoutError):
+                    raise LintTimeout(f"{linter} timed out after {timeout:g}s on {path}")
+                raise
+
+
+async def run_flake8_warm_async(path: str, timeout: float = LINT_TIMEOUT) -> str:
+    with timed("flake8"):
+        return await _run_async("flake8", flake8_output, path, timeout)
+
+
+async def run_pylint_warm_async(path: str, timeout: float = LINT_TIMEOUT) -> List[Dict]:
+    with timed("pylint"):
+        return await _run_async("pylint", pylint_messages, path, timeout)
@@ -1,8 +1,157 @@
 # tools/parse_diff.py
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
 def parse_diff(diff_text: str) -> dict:
+    """
+    Parse a unified diff.
+
+    Returns the changed file names plus, per file, its hunks: the old/new
+    line ranges, the new-side line numbers that were added, and the raw hunk
+    body (needed to rebuild the pre-image).
+    """
     files = []
+    hunks: Dict[str, List[dict]] = {}
+    current: Optional[List[dict]] = None
+    hunk: Optional[dict] = None
+    new_line = old_left = new_left = 0
+
     for line in diff_text.split("\n"):
-        if line.startswith("+++ b/"):
-            filepath = line.replace("+++ b/", "").strip()
-            files.append(filepath)
-    return {"changed_files": files}
+        # Hunk bodies are consumed by their line counts, so "--- "/"+++ "
+        # inside a hunk are treated as content, not headers.
+        if hunk is not None and (old_left or new_left):
+            marker = line[:1] or " "  # editors often strip the space of empty context lines
+            if marker in " +-":
+                hunk["lines"].append(marker + line[1:])
+                if marker == "+":
+                    hunk["added"].append(new_line)
+                    new_line += 1
+                    new_left -= 1
+                elif marker == "-":
+                    old_left -= 1
+                else:
+                    new_line += 1
+                    old_left -= 1
+                    new_left -= 1
+                continue
+
+        if line.startswith("\\") and hunk is not None:
+            # "\ No newline at end of file"
+            hunk["lines"].append(line)
+            continue
+
+        if line.startswith("+++ "):
+            hunk = None
+            if line.startswith("+++ b/"):
+                filepath = line.replace("+++ b/", "").strip()
+                files.append(filepath)
+                current = hunks.setdefault(filepath, [])
+            else:
+                # +++ /dev/null: the file was deleted
+                current = None
+            continue
+
+        match = HUNK_HEADER.match(line)
+        if match and current is not None:
+            old_start, old_count, new_start, new_count = match.groups()
+            hunk = {
+                "old_start": int(old_start),
+                "old_count": int(old_count) if old_count is not None else 1,
+                "new_start": int(new_start),
+                "new_count": int(new_count) if new_count is not None else 1,
+                "added": [],
+                "lines": [],
+            }
+            current.append(hunk)
+            new_line = hunk["new_start"]
+            old_left, new_left = hunk["old_count"], hunk["new_count"]
+            continue
+
+        hunk = None
+
+    return {"changed_files": files, "hunks": hunks}
+
+
+def changed_lines(hunks: List[dict]) -> Set[int]:
+    """New-side line numbers touched by the diff (pure deletions count the line after them)."""
+    lines: Set[int] = set()
+    for hunk in hunks:
+        lines.update(hunk["added"])
+        if not hunk["added"] and hunk["old_count"]:
+            lines.add(max(hunk["new_start"], 1))
+    return lines
+
+
+def line_window(lines: Set[int], context: int) -> List[Tuple[int, int]]:
+    """Merge changed lines, padded by `context` on each side, into inclusive ranges."""
+    ranges: List[Tuple[int, int]] = []
+    for line in sorted(lines):
+        start, end = max(1, line - context), line + context
+        if ranges and start <= ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def map_old_line(hunks: List[dict], old_line: int) -> Optional[int]:
+    """
+    New-side line number for a pre-image line that is still in the file,
+    unchanged or a hunk's context line, or None if the diff deleted it.
+    """
+    shift = 0
+    for hunk in hunks:
+        old_start = hunk["old_start"] if hunk["old_count"] else hunk["old_start"] + 1
+        old_end = old_start + hunk["old_count"]
+        if old_line < old_start:
+            break
+        if old_line < old_end:
+            old, new = old_start, hunk["new_start"]
+            for line in hunk["lines"]:
+                marker = line[:1]
+                if marker == "+":
+                    new += 1
+                elif marker == "-":
+                    if old == old_line:
+                        return None
+                    old += 1
+                elif marker == " ":
+                    if old == old_line:
+                        return new
+                    old += 1
+                    new += 1
+            return None
+        shift += hunk["new_count"] - hunk["old_count"]
+    return old_line + shift
+
+
+def _split_keepends(text: str) -> List[str]:
+    lines = [line + "\n" for line in text.split("\n")]
+    lines[-1] = lines[-1][:-1]
+    return lines if lines[-1] else lines[:-1]
+
+
+def reconstruct_original(new_text: str, hunks: List[dict]) -> str:
+    """Rebuild the pre-image of a file from its post-image and the diff hunks."""
+    new_lines = _split_keepends(new_text)
+    old_lines: List[str] = []
+    cursor = 1
+
+    for hunk in hunks:
+        # A zero-length side points at the line before the insertion.
+        start = hunk["new_start"] if hunk["new_count"] else hunk["new_start"] + 1
+        old_lines.extend(new_lines[cursor - 1:start - 1])
+
+        body = hunk["lines"]
+        for i, line in enumerate(body):
+            if line[0] in " -":
+                no_newline = i + 1 < len(body) and body[i + 1].startswith("\\")
+                old_lines.append(line[1:] + ("" if no_newline else "\n"))
+
+        cursor = start + hunk["new_count"]
+
+    old_lines.extend(new_lines[cursor - 1:])
+    return "".join(old_lines)
@@ -1,7 +1,8 @@
-import subprocess
 from dataclasses import dataclass
 from typing import List
 
+from tools.linter_pool import run_flake8_warm, run_flake8_warm_async
+
 
 @dataclass
 class LintIssue:
@@ -17,23 +18,22 @@ def run_flake8(path: str) -> List[LintIssue]:
     Run flake8 on the given file or directory and return structured issues.
     """
     # Format: line:col:code:message  (no file name here to avoid C: path issues)
-    result = subprocess.run(
-        [
-            "flake8",
-            "--format=%(row)d:%(col)d:%(code)s:%(text)s",
-            path,
-        ],
-        capture_output=True,
-        text=True,
-    )
+    return parse_flake8_output(run_flake8_warm(path), path)
+
+
+async def run_flake8_async(path: str) -> List[LintIssue]:
+    """`run_flake8` for async callers; does not block the event loop."""
+    return parse_flake8_output(await run_flake8_warm_async(path), path)
+
 
+def parse_flake8_output(output: str, path: str) -> List[LintIssue]:
     issues: List[LintIssue] = []
 
-    stdout = result.stdout.strip()
-    if not stdout:
+    output = output.strip()
+    if not output:
         return issues
 
-    for line in stdout.splitlines():
+    for line in output.splitlines():
         # Example: 10:5:E303:too many blank lines (2)
         parts = line.split(":", 3)
         if len(parts) != 4:
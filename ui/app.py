@@ -1,3 +1,5 @@
+import json
+
 import streamlit as st
 import requests
 from dotenv import load_dotenv
@@ -9,12 +11,55 @@ BACKEND_URL = os.getenv("BACKEND_URL")
 
 if not BACKEND_URL.endswith("/review"):
     BACKEND_URL = BACKEND_URL.rstrip("/") + "/review"
+STREAM_URL = BACKEND_URL + "/stream"
 
 st.title("AI Code Reviewer")
 
 uploaded_file = st.file_uploader("Upload a .py file", type=["py"])
+stream_results = st.checkbox("Show results as they arrive", value=True)
+
+
+def render_record(record):
+    kind = record.get("type")
+    stage = record.get("stage", "")
+
+    if kind == "cached":
+        st.info("Served from cache")
+        st.write(record.get("review", ""))
+    elif kind == "tool_result":
+        iteration = f" (iteration {record['iteration']})" if record.get("iteration", 1) > 1 else ""
+        with st.expander(f"{stage}{iteration}", expanded=False):
+            st.json(record.get("response", {}))
+    elif kind == "message":
+        if record.get("final"):
+            st.markdown(f"**{stage}**")
+        st.write(record.get("text", ""))
+    elif kind == "error":
+        st.error(record.get("detail", "Backend error"))
+
+
+if uploaded_file and stream_results:
+    files = {"file": uploaded_file}
+    try:
+        with st.spinner("Reviewing code..."):
+            with requests.post(STREAM_URL, files=files, stream=True) as resp:
+                if resp.status_code != 200:
+                    st.error("Backend error")
+                    st.write(resp.text)
+                    st.stop()
+                for line in resp.iter_lines():
+                    if not line:
+                        continue
+                    record = json.loads(line)
+                    if record.get("type") == "done":
+                        break
+                    render_record(record)
+    except requests.exceptions.RequestException as e:
+        st.error(f"Request failed: {e}")
+        st.stop()
+    st.success("Review completed!")
 
-if uploaded_file:
+elif uploaded_file:
     with st.spinner("Reviewing code..."):
         files = {"file": uploaded_file}
         try: